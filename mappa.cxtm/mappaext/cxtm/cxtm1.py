@@ -56,6 +56,8 @@ class CXTMTopicMapWriter(object):
         self._assocs = None
         self._assoc2roles = None
         self._tmc2id = None
+        self._topic2rank = None
+        self._assoc2rank = None
 
     def write(self, topicmap):
         """\
@@ -85,6 +87,8 @@ class CXTMTopicMapWriter(object):
         self._assocs = None
         self._assoc2roles = None
         self._tmc2id = None
+        self._topic2rank = None
+        self._assoc2rank = None
         self._iri2norm = None
 
     def _index(self, construct):
@@ -101,19 +105,32 @@ class CXTMTopicMapWriter(object):
         Creates an index for the topics and associations (with the roles) which
         belong to the ``topicmap``.
 
+        The sort keys of the topics and associations are computed once;
+        topics and associations with equal keys get the same rank.
+
         `topicmap`
             The topic map to create the index for.
         """
-        self._topics = sorted(topicmap.topics, self._cmp_topic)
+        topic_key = self._topic_key
+        self._topics, self._topic2rank = _sort_and_rank(topicmap.topics, topic_key)
         assoc2roles = {}
         self._tmc2id = {}
         tmc2id = self._tmc2id
         for i, topic in enum(self._topics):
             tmc2id[topic] = i
-        self._assocs = sorted(topicmap.associations, self._cmp_assoc)
-        for i, assoc in enum(self._assocs):
+        role_key = self._role_key_ignore_parent
+        assocs_roles = []
+        for assoc in topicmap.associations:
+            roles = [(role_key(role), role) for role in assoc.roles]
+            roles.sort(key=_first)
+            assocs_roles.append(((self._rank(assoc.type),
+                                  (len(roles), tuple([key for key, _ in roles])),
+                                  self._scope_key(assoc)), assoc, roles))
+        assocs_roles.sort(key=_first)
+        self._assocs, self._assoc2rank = _rank_sorted(assocs_roles)
+        for i, (_, assoc, roles) in enum(assocs_roles):
             tmc2id[assoc] = i
-            roles = sorted(assoc.roles, self._cmp_role_ignore_parent)
+            roles = [role for _, role in roles]
             assoc2roles[assoc] = roles
             for j, role in enum(roles):
                 tmc2id[role] = j
@@ -137,7 +154,7 @@ class CXTMTopicMapWriter(object):
         for pos, occ in enum(self._occs(topic)):
             write_occurrence(occ, pos)
         emptyElement = self._writer.emptyElement
-        for role in sorted(topic.roles_played, self._cmp_role):
+        for role in sorted(topic.roles_played, key=self._role_key):
             emptyElement(u'rolePlayed', {u'ref': u'association.%s.role.%s' % (index_of(role.parent), index_of(role))})
             newline()
         endElement(u'topic')
@@ -287,7 +304,7 @@ class CXTMTopicMapWriter(object):
         newline = self._writer.newline
         emptyElement = self._writer.emptyElement
         written = False
-        for i, theme in enumerate(sorted(scoped.scope, self._cmp_topic)):
+        for i, theme in enumerate(sorted(scoped.scope, key=self._rank)):
             if not i:
                 self._writer.startElement(u'scope')
                 newline()
@@ -302,13 +319,13 @@ class CXTMTopicMapWriter(object):
         """\
         Returns sorted occurrences from the `topic`.
         """
-        return sorted(topic.occurrences, self._cmp_occ)
+        return sorted(topic.occurrences, key=self._occ_key)
 
     def _names(self, topic):
         """\
         Returns sorted names from the `topic`.
         """
-        return sorted(topic.names, self._cmp_name)
+        return sorted(topic.names, key=self._name_key)
 
     def _roles(self, association):
         """\
@@ -320,7 +337,7 @@ class CXTMTopicMapWriter(object):
         """\
         Returns sorted variants from the `name`.
         """
-        return sorted(name.variants, self._cmp_variant)
+        return sorted(name.variants, key=self._variant_key)
 
     def _attributes(self, reifiable, pos):
         """\
@@ -408,54 +425,56 @@ class CXTMTopicMapWriter(object):
             iri = iri[:-1]
         return iri
 
-    def _cmp_topic(self, a, b):
+    def _rank(self, topic):
+        """\
+        Returns the rank of the `topic` within the canonical topic order.
+        """
+        return self._topic2rank[topic]
+
+    def _locators_key(self, locs):
+        """\
+        Returns the sort key of the locator collection `locs`: The size of
+        the collection and the sorted normalized locators.
+        """
+        normalize_iri = self._normalize_iri
+        return len(locs), tuple(sorted([normalize_iri(iri) for iri in locs]))
+
+    def _topic_key(self, topic):
         """\
         Canonical sort order:
         1. [subject identifiers]
         2. [subject locators]
         3. [item identifiers]
         """
-        if a == b:
-            return 0
-        cmp_locators = self._cmp_locators
-        return cmp_locators(a.sids, b.sids) \
-                or cmp_locators(a.slos, b.slos) \
-                or cmp_locators(a.iids, b.iids)
+        locators_key = self._locators_key
+        return locators_key(topic.sids), locators_key(topic.slos), locators_key(topic.iids)
 
-    def _cmp_role_ignore_parent(self, a, b):
+    def _scope_key(self, scoped):
         """\
-        Role comparator which ignores the parent association.
+        Returns the sort key of the scope of the `scoped` construct: The
+        number of themes and the sorted ranks of the themes.
         """
-        if a == b:
-            return 0
-        return self._cmp_topic(a.player, b.player) or self._cmp_topic(a.type, b.type)
+        rank = self._rank
+        scope = scoped.scope
+        return len(scope), tuple(sorted([rank(theme) for theme in scope]))
 
-    def _cmp_role(self, a, b):
+    def _role_key_ignore_parent(self, role):
         """\
-        Canonical sort order:
-        1. [player]
-        2. [type]
-        3. [parent]
+        Role sort key which ignores the parent association.
         """
-        if a == b:
-            return 0
-        return self._cmp_role_ignore_parent(a, b) or self._cmp_assoc(a.parent, b.parent)
+        rank = self._rank
+        return rank(role.player), rank(role.type)
 
-    def _cmp_assoc(self, a, b):
+    def _role_key(self, role):
         """\
         Canonical sort order:
-        1. [type]
-        2. [roles]
-        3. [scope]
-        4. [parent]
+        1. [player]
+        2. [type]
+        3. [parent]
         """
-        if a == b:
-            return 0
-        return self._cmp_topic(a.type, b.type) \
-                or self._cmp_roles(a.roles, b.roles) \
-                or self._cmp_scope(a, b)
+        return self._role_key_ignore_parent(role), self._assoc2rank[role.parent]
 
-    def _cmp_occ(self, a, b):
+    def _occ_key(self, occ):
         """\
         Canonical sort order:
         1. [value]
@@ -464,14 +483,9 @@ class CXTMTopicMapWriter(object):
         4. [scope]
         5. [parent]
         """
-        if a == b:
-            return 0
-        return cmp(a.value, b.value) \
-                or cmp(a.datatype, b.datatype) \
-                or self._cmp_topic(a.type, b.type) \
-                or self._cmp_scope(a, b)
+        return occ.value, occ.datatype, self._rank(occ.type), self._scope_key(occ)
 
-    def _cmp_name(self, a, b):
+    def _name_key(self, name):
         """\
         Canonical sort order:
         1. [value]
@@ -479,12 +493,9 @@ class CXTMTopicMapWriter(object):
         3. [scope]
         4. [parent]
         """
-        if a == b:
-            return 0
-        return cmp(a.value, b.value) or self._cmp_topic(a.type, b.type) \
-                or self._cmp_scope(a, b)
+        return name.value, self._rank(name.type), self._scope_key(name)
 
-    def _cmp_variant(self, a, b):
+    def _variant_key(self, variant):
         """\
         Canonical sort order:
         1. [value]
@@ -492,56 +503,41 @@ class CXTMTopicMapWriter(object):
         3. [scope]
         4. [parent]
         """
-        if a == b:
-            return 0
-        return cmp(a.value, b.value) or cmp(a.datatype, b.datatype) \
-                or self._cmp_scope(a, b)
+        return variant.value, variant.datatype, self._scope_key(variant)
 
-    def _cmp_size(self, a, b):
-        """\
-        Compares the size of ``a`` and ``b``.
-        """
-        return len(a) - len(b)
 
-    def _cmp_set_content(self, a, b, comparator=cmp):
-        """\
-        Compares the content of ``a`` and ``b``.
+def _first(tpl):
+    return tpl[0]
 
-        Both must have the same size.
-        """
-        coll_a = sorted(a, comparator)
-        coll_b = sorted(b, comparator)
-        for i in xrange(len(a)):
-            res = comparator(coll_a[i], coll_b[i])
-            if res:
-                return res
-        return 0
 
-    def _cmp_locators(self, a, b):
-        """\
-        Compares the locator collection ``a`` and ``b``.
-        """
-        normalize_iri = self._normalize_iri
-        return self._cmp_size(a, b) \
-                or self._cmp_set_content([normalize_iri(iri) for iri in a],
-                                         [normalize_iri(iri) for iri in b])
+def _sort_and_rank(iterable, key):
+    """\
+    Sorts the items of the `iterable` by `key` and returns the sorted items
+    and a ``dict`` which maps each item to its rank.
+    """
+    return _rank_sorted(sorted([(key(item), item) for item in iterable], key=_first))
 
-    def _cmp_roles(self, a, b):
-        """\
-        Compares the collections `a` and `b`. Both collections must consist
-        of roles.
-        """
-        return self._cmp_size(a, b) \
-                or self._cmp_set_content(a, b, self._cmp_role_ignore_parent)
 
-    def _cmp_scope(self, a, b):
-        """\
-        Compares the scope of the scoped constructs `a` and `b`.
-        """
-        scope_a = list(a.scope)
-        scope_b = list(b.scope)
-        return self._cmp_size(scope_a, scope_b) \
-                or self._cmp_set_content(scope_a, scope_b, self._cmp_topic)
+def _rank_sorted(keyed_items):
+    """\
+    Returns the items and a ``dict`` which maps each item to its rank.
+
+    `keyed_items`
+        A sorted list of tuples where the first item is the sort key and
+        the second item is the item. Items with equal keys get the same rank.
+    """
+    items = []
+    item2rank = {}
+    rank = 0
+    prev_key = object()
+    for tpl in keyed_items:
+        key, item = tpl[0], tpl[1]
+        if key != prev_key:
+            rank += 1
+            prev_key = key
+        items.append(item)
+        item2rank[item] = rank
+    return items, item2rank
 
 
 class CXTMWriter(object):
@@ -17,7 +17,8 @@ from mappaext.jtm import jtmwriter
 
 
 def create_writer(out, base, version=1.1, prettify=False,
-                  export_iids=True, omit_loners=False, prefixes=None, **kw):
+                  export_iids=True, omit_loners=False, prefixes=None, 
+                  processes=1, **kw):
     """\
     
     """
@@ -27,4 +28,5 @@ def create_writer(out, base, version=1.1, prettify=False,
     writer.prettify = prettify
     writer.export_iids = export_iids
     writer.omit_loners = omit_loners
+    writer.processes = processes
     return writer
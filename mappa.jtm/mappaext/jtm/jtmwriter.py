@@ -13,9 +13,12 @@ a `JSON Topic Maps (JTM) <http://www.cerny-online.com/jtm/>`_ representation.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+import io
+from functools import partial
 from tm.voc import XSD
 from mio.jtm.json import JSONWriter
 from mappa._internal.it import one_of, no
+from mappa._internal.parallel import map_chunks
 from mappa.utils import is_default_name, is_default_name_type
 
 
@@ -24,7 +27,7 @@ class JTMTopicMapWriter(object):
     Writer for JSON Topic Maps (JTM).
     """
     __slots__ = ['_writer', '_base', 'prettify', 'export_iids',
-                 'omit_loners', 'version', 'prefixes']
+                 'omit_loners', 'version', 'prefixes', 'processes']
 
     def __init__(self, out, base, version=1.0, prefixes=None):
         if not out:
@@ -37,6 +40,7 @@ class JTMTopicMapWriter(object):
         self.export_iids = True
         self.version = version
         self.omit_loners = False
+        self.processes = 1
         self.prefixes = {}
         if prefixes:
             for ident, iri in prefixes.iteritems():
@@ -66,12 +70,48 @@ class JTMTopicMapWriter(object):
         writer.key_value(u'item_type', u'topicmap')
         self._write_iids(topicmap)
         self._write_reifier(topicmap)
-        write_if_available = self._write_if_available
-        write_if_available(u'topics', topicmap.topics, self._write_topic)
-        write_if_available(u'associations', topicmap.associations, self._write_association)
+        if self.processes == 1:
+            write_if_available = self._write_if_available
+            write_if_available(u'topics', topicmap.topics, self._write_topic)
+            write_if_available(u'associations', topicmap.associations, self._write_association)
+        else:
+            write_parallel = self._write_parallel
+            write_parallel(u'topics', list(topicmap.topics), self._write_topic)
+            write_parallel(u'associations', list(topicmap.associations), self._write_association)
         writer.end_object()
         writer.end()
 
+    def _write_parallel(self, key, constructs, func):
+        """\
+        Serializes the ``constructs`` by worker processes using ``func`` iff
+        ``constructs`` is not empty.
+        """
+        if not constructs:
+            return
+        writer = self._writer
+        writer.key(key)
+        writer.start_array()
+        for fragment in map_chunks(partial(self._serialize_chunk, func), constructs, self.processes):
+            writer.fragment(fragment)
+        writer.end_array()
+
+    def _serialize_chunk(self, func, constructs):
+        """\
+        Returns the serialization of the ``constructs`` as string.
+        """
+        writer = self._writer
+        out = io.BytesIO()
+        self._writer = JSONWriter(out)
+        try:
+            self._writer.prettify = self.prettify
+            # Topics and associations are items of an array of the topic map object
+            self._writer.start(2)
+            for construct in constructs:
+                func(construct)
+        finally:
+            self._writer = writer
+        return out.getvalue().decode('utf-8')
+
     def _write_prefixes(self):
         if self.prefixes:
             writer = self._writer
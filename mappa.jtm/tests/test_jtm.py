@@ -13,8 +13,10 @@
 :license:      BSD license
 """
 import io
-from nose.tools import ok_
+from nose.tools import ok_, eq_
 from tm.voc import XSD
+import mappa
+from mappa._internal import parallel
 from mappaext.cxtm.cxtm_test import create_writer_cxtm_cases
 from mio.jtm import create_deserializer
 from mappaext.jtm import create_writer
@@ -88,6 +90,42 @@ def test_add_xsd_prefix_invalid():
         pass
 
 
+def _create_map(base):
+    tm = mappa.connect().create(base)
+    types = [tm.create_topic(sid=u'http://www.example.org/type-%d' % i) for i in range(3)]
+    for i in xrange(40):
+        topic = tm.create_topic(sid=u'http://www.example.org/topic-%d' % i)
+        topic.add_type(types[i % 3])
+        name = topic.create_name(types[0], u'Topic %d' % i, types[1:i % 3])
+        name.create_variant(u'topic-%d' % i, [types[2]])
+        topic.create_occurrence(types[1], (u'%d' % i, XSD.integer))
+        assoc = tm.create_association(types[2], roles=[(types[0], topic), (types[1], tm.create_topic())])
+        if i % 5 == 0:
+            assoc.reifier = tm.create_topic()
+    return tm
+
+
+def test_parallel_writer():
+    def check(version, prettify):
+        chunk_size = parallel.CHUNK_SIZE
+        # Several chunks per worker
+        parallel.CHUNK_SIZE = 7
+        try:
+            outputs = []
+            for processes in (1, 2):
+                out = io.BytesIO()
+                create_writer(out, base, version=version, prettify=prettify, processes=processes).write(tm)
+                outputs.append(out.getvalue())
+        finally:
+            parallel.CHUNK_SIZE = chunk_size
+        eq_(outputs[0], outputs[1])
+    base = u'http://www.example.org/map'
+    tm = _create_map(base)
+    for version in (1.0, 1.1):
+        for prettify in (False, True):
+            yield check, version, prettify
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
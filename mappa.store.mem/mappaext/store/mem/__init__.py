@@ -38,28 +38,21 @@ Memory backend.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-import cPickle as pickle
 from .model import Connection
 
 __all__ = ['create_connection']
 
 def create_connection(**kw):
-    persistent = kw.get('persistent', False)
-    if persistent:
-        try:
-            return load_system(kw.get('file'))
-        except IOError:
-            pass
+    """\
+    Returns a new connection.
+
+    If ``persistent`` is ``True``, the topic maps are loaded from the
+    snapshot ``file`` and its journal and all modifications are appended
+    to the journal on commit.
+    """
     return Connection(**kw)
 
 def load_system(file_name):
     if not file_name:
         raise ValueError('No file specified')
-    tmsys = None
-    f = open(file_name)
-    try:
-        f.seek(0)
-        tmsys = pickle.load(f)
-    finally:
-        f.close()
-    return tmsys
+    return Connection(file=file_name, persistent=True)
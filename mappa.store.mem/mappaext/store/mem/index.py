@@ -38,10 +38,14 @@
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-from collections import defaultdict
-from mappa.utils import is_association, is_role, is_occurrence, is_name, is_literal
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from operator import attrgetter, itemgetter
+from mappa.utils import is_topic, is_association, is_role, is_occurrence, is_name, is_literal, \
+    has_scope
+from mappa._internal import kind
 from mappa.backend.events import *
-from mappa import XSD, TMDM, Literal
+from mappa import XSD, TMDM, ANY, Literal
 
 class IndexManager(object):
 
@@ -49,10 +53,232 @@ class IndexManager(object):
         self.type_instance = TypeInstanceIndex(dispatcher)
         self.scoped = ScopedIndex(dispatcher)
         self.literal = LiteralIndex(dispatcher)
+        self.type_hierarchy = TypeHierarchyIndex(dispatcher, self.type_instance)
+        self.role_player = RolePlayerIndex(dispatcher)
+        self.range = RangeIndex(dispatcher)
+        self.statistics = Statistics(dispatcher, self)
+
+    def _indexes(self):
+        return self.type_instance, self.scoped, self.literal, self.type_hierarchy, \
+               self.role_player, self.range
+
+    def subscribe(self, dispatcher):
+        for idx in self._indexes():
+            idx.subscribe(dispatcher)
+
+    def unsubscribe(self, dispatcher):
+        for idx in self._indexes():
+            idx.unsubscribe(dispatcher)
+
+    def rebuild(self, topicmap):
+        """\
+        Discards the content of the indexes and indexes the `topicmap` 
+        in one pass.
+        """
+        dispatcher = EventDispatcher()
+        for idx in self._indexes():
+            idx.clear()
+            idx.subscribe(dispatcher)
+        for evt in construct_events(topicmap):
+            dispatcher.dispatch(evt)
+
+
+class Statistics(object):
+    """\
+    Provides the number of constructs per type, theme, datatype and value.
+
+    The counts are taken from the indexes, so they are always up to date and
+    each count is computed in O(1) (counts without a type in O(number of types)).
+    """
+    def __init__(self, topicmap, indexes):
+        self._tm = topicmap
+        self._indexes = indexes
+
+    def topic_count(self, type=ANY):
+        """\
+        Returns the number of topics or, if `type` is provided, the number of
+        direct instances of `type`.
+        """
+        if type is ANY:
+            return len(self._tm.topics)
+        return _count(self._indexes.type_instance._topics_by_type(), type)
+
+    def association_count(self, type=ANY):
+        if type is ANY:
+            return len(self._tm.associations)
+        return _count(self._indexes.type_instance._type2assoc, type)
+
+    def role_count(self, type=ANY):
+        return _count(self._indexes.type_instance._type2role, type)
+
+    def occurrence_count(self, type=ANY):
+        return _count(self._indexes.type_instance._type2occ, type)
+
+    def name_count(self, type=ANY):
+        return _count(self._indexes.type_instance._type2name, type)
+
+    def variant_count(self):
+        return _count(self._indexes.literal._lit2var, ANY)
+
+    def theme_count(self, theme):
+        """\
+        Returns the number of associations, occurrences, names and variants 
+        which have `theme` in their scope.
+        """
+        idx = self._indexes.scoped
+        return sum(_count(dct, theme) for dct in (idx._scope2assoc, idx._scope2occ, 
+                                                  idx._scope2name, idx._scope2var))
+
+    def datatype_count(self, datatype):
+        """\
+        Returns the number of occurrences, names and variants with the 
+        provided `datatype`.
+        """
+        return self._indexes.literal._datatype2count.get(datatype, 0)
+
+    def value_count(self, value, datatype=XSD.string):
+        """\
+        Returns the number of occurrences, names and variants with the 
+        provided `value` and `datatype`.
+        """
+        literal = Literal(value, datatype)
+        idx = self._indexes.literal
+        return len(idx.occurrences(literal)) + len(idx.names(literal)) + len(idx.variants(literal))
+
+def _count(dct, key):
+    if key is ANY:
+        return sum(len(postings) for postings in dct.itervalues())
+    return len(dct.get(key, ()))
 
 
 class Index(object):
-    pass
+
+    def __init__(self, dispatcher):
+        self.clear()
+        self.subscribe(dispatcher)
+
+    def clear(self):
+        """\
+        Removes all entries from the index.
+        """
+        raise NotImplementedError()
+
+    def subscribe(self, dispatcher):
+        for event_type, handler in self._event_handlers():
+            dispatcher.subscribe(event_type, handler)
+
+    def unsubscribe(self, dispatcher):
+        for event_type, handler in self._event_handlers():
+            dispatcher.unsubscribe(event_type, handler)
+
+    def _event_handlers(self):
+        """\
+        Returns an iterable of ``(event type, handler)`` tuples.
+        """
+        raise NotImplementedError()
+
+
+# Max. number of constructs of postings which are stored as tuple
+_MAX_TUPLE_POSTINGS = 8
+
+# Marks a removed construct in the list of `_Postings`
+_REMOVED = object()
+
+class _Postings(object):
+    """\
+    Insertion ordered set of Topic Maps constructs.
+
+    Postings with up to `_MAX_TUPLE_POSTINGS` distinct constructs are stored
+    as tuples (c.f. `_add_posting`), this class is used for larger postings
+    or if a construct is added more than once.
+
+    Adding and removing a construct is O(1) (amortized). The postings remember
+    how often a construct was added, the construct is removed if `discard` was
+    called as often as `add`.
+    """
+    __slots__ = ('_items', '_pos', '_counts', '_removed')
+
+    def __init__(self, constructs=()):
+        self._items = list(constructs)
+        # construct -> index of the construct in `_items`
+        self._pos = dict((construct, i) for i, construct in enumerate(self._items))
+        # construct -> count, only for constructs which were added more than once
+        self._counts = None
+        self._removed = 0
+
+    def add(self, construct):
+        pos = self._pos
+        if construct in pos:
+            counts = self._counts
+            if counts is None:
+                counts = self._counts = {}
+            counts[construct] = counts.get(construct, 1) + 1
+        else:
+            pos[construct] = len(self._items)
+            self._items.append(construct)
+
+    def discard(self, construct):
+        pos = self._pos
+        idx = pos.get(construct)
+        if idx is None:
+            return
+        counts = self._counts
+        if counts:
+            cnt = counts.get(construct)
+            if cnt is not None:
+                if cnt == 2:
+                    del counts[construct]
+                else:
+                    counts[construct] = cnt - 1
+                return
+        del pos[construct]
+        self._items[idx] = _REMOVED
+        self._removed += 1
+        if self._removed > len(pos):
+            self._items = [item for item in self._items if item is not _REMOVED]
+            self._pos = dict((construct, i) for i, construct in enumerate(self._items))
+            self._removed = 0
+
+    def __iter__(self):
+        if not self._removed:
+            return iter(self._items)
+        return (item for item in self._items if item is not _REMOVED)
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, construct):
+        return construct in self._pos
+
+def _add_posting(dct, key, construct):
+    postings = dct.get(key)
+    if postings is None:
+        dct[key] = (construct,)
+    elif postings.__class__ is tuple:
+        if construct in postings or len(postings) >= _MAX_TUPLE_POSTINGS:
+            postings = dct[key] = _Postings(postings)
+            postings.add(construct)
+        else:
+            dct[key] = postings + (construct,)
+    else:
+        postings.add(construct)
+
+def _remove_posting(dct, key, construct):
+    postings = dct.get(key)
+    if postings is None:
+        return
+    if postings.__class__ is tuple:
+        if construct in postings:
+            if len(postings) == 1:
+                del dct[key]
+            else:
+                dct[key] = tuple([c for c in postings if c != construct])
+        return
+    postings.discard(construct)
+    if not postings:
+        del dct[key]
+    elif len(postings) <= _MAX_TUPLE_POSTINGS // 2 and not postings._counts:
+        dct[key] = tuple(postings)
 
 def as_literal(lit):
     if not is_literal(lit):
@@ -61,21 +287,21 @@ def as_literal(lit):
 
 class LiteralIndex(Index):
     
-    def __init__(self, dispatcher):
-        super(LiteralIndex, self).__init__()
+    def clear(self):
         self._lit2occ = {}
         self._lit2name = {}
         self._lit2var = {}
-        self.subscribe(dispatcher)
-
-    def subscribe(self, dispatcher):
-        dispatcher.subscribe(SetValue, self._set_value)
-        dispatcher.subscribe(AddOccurrence, self._add_occ)
-        dispatcher.subscribe(RemoveOccurrence, self._remove_occ)
-        dispatcher.subscribe(AddName, self._add_name)
-        dispatcher.subscribe(RemoveName, self._remove_name)
-        dispatcher.subscribe(AddVariant, self._add_var)
-        dispatcher.subscribe(RemoveVariant, self._remove_var)
+        # datatype -> number of indexed literals
+        self._datatype2count = {}
+
+    def _event_handlers(self):
+        return ((SetValue, self._set_value),
+                (AddOccurrence, self._add_occ),
+                (RemoveOccurrence, self._remove_occ),
+                (AddName, self._add_name),
+                (RemoveName, self._remove_name),
+                (AddVariant, self._add_var),
+                (RemoveVariant, self._remove_var))
 
     def _set_value(self, evt):
         source = evt.source
@@ -85,26 +311,26 @@ class LiteralIndex(Index):
             dct = self._lit2name
         else:
             dct = self._lit2var
-        _unregister_literal(dct, source, evt.old)
-        _register_literal(dct, source, evt.new)
+        _unregister_literal(dct, source, evt.old, self._datatype2count)
+        _register_literal(dct, source, evt.new, self._datatype2count)
 
     def _add_occ(self, evt):
-        _register_literal(self._lit2occ, evt.new, evt.new.literal)
+        _register_literal(self._lit2occ, evt.new, evt.new.literal, self._datatype2count)
 
     def _remove_occ(self, evt):
-        _unregister_literal(self._lit2occ, evt.old, evt.old.literal)
+        _unregister_literal(self._lit2occ, evt.old, evt.old.literal, self._datatype2count)
 
     def _add_name(self, evt):
-        _register_literal(self._lit2name, evt.new, evt.new.literal)
+        _register_literal(self._lit2name, evt.new, evt.new.literal, self._datatype2count)
 
     def _remove_name(self, evt):
-        _unregister_literal(self._lit2name, evt.old, evt.old.literal)
+        _unregister_literal(self._lit2name, evt.old, evt.old.literal, self._datatype2count)
 
     def _add_var(self, evt):
-        _register_literal(self._lit2var, evt.new, evt.new.literal)
+        _register_literal(self._lit2var, evt.new, evt.new.literal, self._datatype2count)
 
     def _remove_var(self, evt):
-        _unregister_literal(self._lit2var, evt.old, evt.old.literal)
+        _unregister_literal(self._lit2var, evt.old, evt.old.literal, self._datatype2count)
 
     def occurrences(self, lit):
         return self._lit2occ.get(as_literal(lit)) or ()
@@ -116,78 +342,275 @@ class LiteralIndex(Index):
         return self._lit2var.get(as_literal(lit)) or ()
 
 
-def _register_literal(dct, construct, literal):
-    if literal not in dct:
-        dct[literal] = []
-    dct[literal].append(construct)
+def _register_literal(dct, construct, literal, counts):
+    _add_posting(dct, literal, construct)
+    datatype = literal.datatype
+    counts[datatype] = counts.get(datatype, 0) + 1
+
+def _unregister_literal(dct, construct, literal, counts):
+    postings = dct.get(literal)
+    if postings is None or construct not in postings:
+        return
+    _remove_posting(dct, literal, construct)
+    datatype = literal.datatype
+    cnt = counts[datatype] - 1
+    if cnt:
+        counts[datatype] = cnt
+    else:
+        del counts[datatype]
+
+# Datatypes of the occurrence values which are indexed by the `RangeIndex`
+RANGE_DATATYPES = frozenset([XSD.integer, XSD.decimal, XSD.float, XSD.double,
+                             XSD.date, XSD.dateTime])
+
+class RangeIndex(Index):
+    """\
+    Indexes the occurrences with a numeric or date value (c.f.
+    `RANGE_DATATYPES`) by their type and the Python value of their literal
+    and provides range scans.
+
+    The values are sorted lazily: Modifications are collected and merged
+    into the sorted values on the next lookup.
+    """
+    def clear(self):
+        # (datatype, type) -> _SortedPostings
+        self._sorted = {}
+
+    def _event_handlers(self):
+        return ((SetValue, self._set_value),
+                (SetType, self._set_type),
+                (AddOccurrence, self._add_occ),
+                (RemoveOccurrence, self._remove_occ))
+
+    def _set_value(self, evt):
+        src = evt.source
+        if is_occurrence(src):
+            self._unregister(src, evt.old, src.type)
+            self._register(src, evt.new, src.type)
+
+    def _set_type(self, evt):
+        src = evt.source
+        if is_occurrence(src):
+            self._unregister(src, src.literal, evt.old)
+            self._register(src, src.literal, evt.new)
+
+    def _add_occ(self, evt):
+        occ = evt.new
+        self._register(occ, occ.literal, occ.type)
+
+    def _remove_occ(self, evt):
+        occ = evt.old
+        self._unregister(occ, occ.literal, occ.type)
+
+    def _register(self, occ, literal, type):
+        value = _range_value(literal)
+        if value is not None:
+            key = literal.datatype, type
+            postings = self._sorted.get(key)
+            if postings is None:
+                postings = self._sorted[key] = _SortedPostings()
+            postings.add(value, occ)
+
+    def _unregister(self, occ, literal, type):
+        value = _range_value(literal)
+        if value is not None:
+            postings = self._sorted.get((literal.datatype, type))
+            if postings is not None:
+                postings.discard(value, occ)
+
+    def occurrences(self, datatype, lower=None, upper=None, types=ANY,
+                    include_lower=True, include_upper=True):
+        """\
+        Returns a list of occurrences with the provided `datatype` and a value
+        within the provided range, ordered by their values.
+
+        `datatype`
+            One of the `RANGE_DATATYPES`.
+        `lower`
+            The lower bound, either a Python value, a string in the lexical
+            representation of the `datatype`, a ``Literal`` or ``None``
+            (unbounded).
+        `upper`
+            The upper bound (c.f. `lower`).
+        `types`
+            An iterable of occurrence types or ``ANY``.
+        `include_lower`
+            Indicates if occurrences with the `lower` value are included.
+        `include_upper`
+            Indicates if occurrences with the `upper` value are included.
+        """
+        if datatype not in RANGE_DATATYPES:
+            raise ValueError('Range lookups are not supported for datatype "%s"' % datatype)
+        lower, upper = _range_bound(lower, datatype), _range_bound(upper, datatype)
+        if types is ANY:
+            sorted_postings = [postings for (dt, _), postings in self._sorted.iteritems() if dt == datatype]
+        else:
+            sorted_postings = filter(None, (self._sorted.get((datatype, type)) for type in types))
+        entries = list(chain.from_iterable(postings.range(lower, upper, include_lower, include_upper)
+                                           for postings in sorted_postings))
+        if len(sorted_postings) > 1:
+            entries.sort(key=itemgetter(0))
+        return list(chain.from_iterable(postings for _, postings in entries))
+
+
+class _SortedPostings(object):
+    """\
+    Maps values to sets of constructs and keeps the values sorted.
+
+    New values are appended to a list of pending values which are merged into
+    the sorted values by the next `range` call. Values without postings are
+    kept until they outnumber the values with postings.
+    """
+    __slots__ = ('_postings', '_values', '_pending', '_empty')
+
+    def __init__(self):
+        self._postings = {}
+        self._values = []
+        self._pending = []
+        self._empty = 0
+
+    def add(self, value, construct):
+        postings = self._postings.get(value)
+        if postings is None:
+            postings = self._postings[value] = set()
+            self._pending.append(value)
+        elif not postings:
+            self._empty -= 1
+        postings.add(construct)
+
+    def discard(self, value, construct):
+        postings = self._postings.get(value)
+        if postings:
+            postings.discard(construct)
+            if not postings:
+                self._empty += 1
+
+    def _sorted_values(self):
+        if self._empty * 2 > len(self._postings):
+            self._postings = dict((value, postings) for value, postings in self._postings.iteritems() if postings)
+            self._values = sorted(self._postings)
+            self._pending = []
+            self._empty = 0
+        elif self._pending:
+            # The values are sorted, Timsort merges the pending values in
+            # O(n + k log k)
+            self._values.extend(self._pending)
+            self._values.sort()
+            self._pending = []
+        return self._values
+
+    def range(self, lower, upper, include_lower, include_upper):
+        """\
+        Returns a list of ``(value, constructs)`` tuples with the values in
+        the provided range.
+        """
+        values = self._sorted_values()
+        start, end = 0, len(values)
+        if lower is not None:
+            start = (bisect_left if include_lower else bisect_right)(values, lower)
+        if upper is not None:
+            end = (bisect_right if include_upper else bisect_left)(values, upper)
+        postings = self._postings
+        return [(value, postings[value]) for value in values[start:end] if postings[value]]
+
+def _range_value(literal):
+    """\
+    Returns the Python value of `literal` or ``None`` if the literal is
+    not indexed by the `RangeIndex`.
+    """
+    if literal.datatype not in RANGE_DATATYPES:
+        return None
+    try:
+        value = literal.__pyvalue__()
+    except (TypeError, ValueError, ArithmeticError):
+        return None
+    if value != value:
+        # NaN is not ordered
+        return None
+    return value
+
+def _range_bound(value, datatype):
+    if value is None:
+        return None
+    if isinstance(value, basestring):
+        value = Literal(value, datatype)
+    if is_literal(value):
+        value = value.__pyvalue__()
+    return value
 
-def _unregister_literal(dct, construct, literal):
-    l = dct.get(literal)
-    if l and construct in l:
-        l.remove(construct)
 
 class ScopedIndex(Index):
 
-    def __init__(self, dispatcher):
-        super(ScopedIndex, self).__init__()
+    def clear(self):
         self._scope2assoc = {}
         self._scope2occ = {}
         self._scope2name = {}
         self._scope2var = {}
-        self.subscribe(dispatcher)
-
-    def subscribe(self, dispatcher):
-        dispatcher.subscribe(AddAssociation, self._add_assoc)
-        dispatcher.subscribe(RemoveAssociation, self._remove_assoc)
-        dispatcher.subscribe(AddOccurrence, self._add_occ)
-        dispatcher.subscribe(RemoveOccurrence, self._remove_occ)
-        dispatcher.subscribe(AddName, self._add_name)
-        dispatcher.subscribe(RemoveName, self._remove_name)
-        dispatcher.subscribe(AddVariant, self._add_var)
-        dispatcher.subscribe(RemoveVariant, self._remove_var)
-        dispatcher.subscribe(SetScope, self._set_scope)
+        # frozenset(scope) -> scoped constructs
+        self._exact2assoc = {}
+        self._exact2occ = {}
+        self._exact2name = {}
+        self._exact2var = {}
+
+    def _event_handlers(self):
+        return ((AddAssociation, self._add_assoc),
+                (RemoveAssociation, self._remove_assoc),
+                (AddOccurrence, self._add_occ),
+                (RemoveOccurrence, self._remove_occ),
+                (AddName, self._add_name),
+                (RemoveName, self._remove_name),
+                (AddVariant, self._add_var),
+                (RemoveVariant, self._remove_var),
+                (SetScope, self._set_scope))
 
     def _set_scope(self, evt):
         src = evt.source
         old_scope = evt.old
         new_scope = evt.new
         if is_association(src):
-            dct = self._scope2assoc
+            dct, exact_dct = self._scope2assoc, self._exact2assoc
         elif is_occurrence(src):
-            dct = self._scope2occ
+            dct, exact_dct = self._scope2occ, self._exact2occ
         elif is_name(src):
-            dct = self._scope2name
+            dct, exact_dct = self._scope2name, self._exact2name
+            # The scope of the variants includes the scope of the name
+            for var in src.variants:
+                _unregister_scope(self._scope2var, self._exact2var, var, _variant_scope(old_scope, var.scope))
+                _register_scope(self._scope2var, self._exact2var, var, _variant_scope(new_scope, var._scope))
         else:
-            dct = self._scope2var
-        _unregister_scope(dct, src, old_scope)
-        _register_scope(dct, src, new_scope)
+            dct, exact_dct = self._scope2var, self._exact2var
+            if src.parent is not None:
+                old_scope = _variant_scope(src.parent.scope, old_scope)
+                new_scope = _variant_scope(src.parent.scope, new_scope)
+        _unregister_scope(dct, exact_dct, src, old_scope)
+        _register_scope(dct, exact_dct, src, new_scope)
 
     def _add_assoc(self, evt):
-        _register_scope(self._scope2assoc, evt.new, evt.new.scope)
+        _register_scope(self._scope2assoc, self._exact2assoc, evt.new, evt.new.scope)
 
     def _remove_assoc(self, evt):
-        _unregister_scope(self._scope2assoc, evt.old, evt.old.scope)
+        _unregister_scope(self._scope2assoc, self._exact2assoc, evt.old, evt.old.scope)
 
     def _add_occ(self, evt):
-        _register_scope(self._scope2occ, evt.new, evt.new.scope)
+        _register_scope(self._scope2occ, self._exact2occ, evt.new, evt.new.scope)
 
     def _remove_occ(self, evt):
-        _unregister_scope(self._scope2occ, evt.old, evt.old.scope)
+        _unregister_scope(self._scope2occ, self._exact2occ, evt.old, evt.old.scope)
 
     def _add_name(self, evt):
-        _register_scope(self._scope2name, evt.new, evt.new.scope)
+        _register_scope(self._scope2name, self._exact2name, evt.new, evt.new.scope)
 
     def _remove_name(self, evt):
-        _unregister_scope(self._scope2name, evt.old, evt.old.scope)
+        _unregister_scope(self._scope2name, self._exact2name, evt.old, evt.old.scope)
 
     def _add_var(self, evt):
-        _register_scope(self._scope2var, evt.new, evt.new.scope)
+        _register_scope(self._scope2var, self._exact2var, evt.new, _variant_scope(evt.source.scope, evt.new.scope))
 
     def _remove_var(self, evt):
-        _unregister_scope(self._scope2var, evt.old, evt.old.scope)
+        _unregister_scope(self._scope2var, self._exact2var, evt.old, _variant_scope(evt.source.scope, evt.old.scope))
 
     def associations(self, scope, exact=True):
-        return _filter(self._scope2assoc, scope, exact)
+        return _filter(self._scope2assoc, self._exact2assoc, scope, exact)
 
     def associations_by_theme(self, theme):
         return self._scope2assoc.get(theme, ())
@@ -196,7 +619,7 @@ class ScopedIndex(Index):
         return self._scope2assoc.keys()
 
     def occurrences(self, scope, exact=True):
-        return _filter(self._scope2occ, scope, exact)
+        return _filter(self._scope2occ, self._exact2occ, scope, exact)
 
     def occurrences_by_theme(self, theme):
         return self._scope2occ.get(theme, ())
@@ -205,7 +628,7 @@ class ScopedIndex(Index):
         return self._scope2occ.keys()
 
     def names(self, scope, exact=True):
-        return _filter(self._scope2name, scope, exact)
+        return _filter(self._scope2name, self._exact2name, scope, exact)
 
     def names_by_theme(self, theme):
         return self._scope2name.get(theme, ())
@@ -214,7 +637,7 @@ class ScopedIndex(Index):
         return self._scope2name.keys()
 
     def variants(self, scope, exact=True):
-        return _filter(self._scope2var, scope, exact)
+        return _filter(self._scope2var, self._exact2var, scope, exact)
 
     def variants_by_theme(self, theme):
         return self._scope2var.get(theme, ())
@@ -222,49 +645,110 @@ class ScopedIndex(Index):
     def variant_themes(self):
         return self._scope2var.keys()
 
-def _register_scope(dct, scoped, scope):
+def _variant_scope(name_scope, scope):
+    """\
+    Returns the scope of a variant, including the scope of the parent name.
+    """
+    return frozenset(scope).union(name_scope)
+
+def _register_scope(dct, exact_dct, scoped, scope):
     for theme in scope:
-        if theme not in dct:
-            dct[theme] = []
-        dct[theme].append(scoped)
+        _add_posting(dct, theme, scoped)
+    _add_posting(exact_dct, frozenset(scope), scoped)
  
-def _unregister_scope(dct, scoped, scope):
+def _unregister_scope(dct, exact_dct, scoped, scope):
     for theme in scope:
-        l = dct.get(theme)
-        if l and scoped in l:
-            l.remove(scoped)
-
-def _filter(dct, scope, exact):
-    raise NotImplementedError()
+        _remove_posting(dct, theme, scoped)
+    _remove_posting(exact_dct, frozenset(scope), scoped)
+
+def _filter(dct, exact_dct, scope, exact):
+    """\
+    Returns the scoped constructs which have exactly the provided `scope`
+    or, if `exact` is ``False``, the scoped constructs with a scope which is
+    a superset of the provided `scope`.
+
+    `dct`
+        The theme -> scoped constructs mapping.
+    `exact_dct`
+        The ``frozenset(scope)`` -> scoped constructs mapping.
+    `scope`
+        Either a topic, an iterable of topics, or ``ANY``.
+    `exact`
+        Indicates if the scope should be exactly matched.
+    """
+    if scope is ANY:
+        return list(chain(*exact_dct.values()))
+    if is_topic(scope):
+        scope = (scope,)
+    scope = frozenset(scope)
+    if exact:
+        return exact_dct.get(scope) or ()
+    if not scope:
+        return list(chain(*exact_dct.values()))
+    postings = sorted([dct.get(theme) or () for theme in scope], key=len)
+    smallest = postings[0]
+    if not smallest:
+        return ()
+    others = postings[1:]
+    return [scoped for scoped in smallest if all(scoped in p for p in others)]
 
 class TypeInstanceIndex(Index):
-
+    """\
+    Indexes the typed constructs by their type and the topics by their types
+    and instances.
+
+    The topic -> types and type -> instances mappings are derived from the
+    unscoped, binary ``tmdm:type-instance`` associations. The index remembers
+    the ``(instance, type)`` pair each association contributes and replaces
+    it whenever a role, role player, type or the scope of the association
+    changes, so it does not depend on the order in which the roles are added.
+    """
     def __init__(self, dispatcher):
-        super(TypeInstanceIndex, self).__init__()
-        self._type2topic = defaultdict(list)
-        self._type2assoc = defaultdict(list)
-        self._type2role = defaultdict(list)
-        self._type2occ = defaultdict(list)
-        self._type2name = defaultdict(list)
-        self.subscribe(dispatcher)
-
-    def subscribe(self, dispatcher):
-        dispatcher.subscribe(SetType, self._set_type)
-        dispatcher.subscribe(AddAssociation, self._add_assoc)
-        dispatcher.subscribe(RemoveAssociation, self._remove_assoc)
-        dispatcher.subscribe(AddRole, self._add_role)
-        dispatcher.subscribe(RemoveRole, self._remove_role)
-        dispatcher.subscribe(AddOccurrence, self._add_occ)
-        dispatcher.subscribe(RemoveOccurrence, self._remove_occ)
-        dispatcher.subscribe(AddName, self._add_name)
-        dispatcher.subscribe(RemoveName, self._remove_name)
+        self._tm = dispatcher
+        super(TypeInstanceIndex, self).__init__(dispatcher)
+
+    def clear(self):
+        self._type2assoc = {}
+        self._type2role = {}
+        self._type2occ = {}
+        self._type2name = {}
+        self._clear_topics()
+
+    def _clear_topics(self):
+        self._type2topic = {}
+        self._topic2type = {}
+        # type-instance association -> (instance, type)
+        self._assoc2pair = {}
+        self._stale_topics = False
+
+    def _event_handlers(self):
+        return ((SetType, self._set_type),
+                (SetScope, self._set_scope),
+                (SetPlayer, self._set_player),
+                (AddAssociation, self._add_assoc),
+                (RemoveAssociation, self._remove_assoc),
+                (AddRole, self._add_role),
+                (RemoveRole, self._remove_role),
+                (AddOccurrence, self._add_occ),
+                (RemoveOccurrence, self._remove_occ),
+                (AddName, self._add_name),
+                (RemoveName, self._remove_name),
+                (AddSubjectIdentifier, self._sid_changed),
+                (RemoveSubjectIdentifier, self._sid_changed))
  
     def _set_type(self, evt):
         src = evt.source
         if is_association(src):
             dct = self._type2assoc
+            if self._tracks(src, evt.new, src.scope):
+                self._update(src, tuple(src.roles), evt.new, src.scope)
         elif is_role(src):
             dct = self._type2role
+            assoc = src.parent
+            if assoc is not None and self._tracks(assoc, assoc.type, assoc.scope):
+                new_type = evt.new
+                type_of = lambda role: new_type if role is src else role.type
+                self._update(assoc, tuple(assoc.roles), assoc.type, assoc.scope, type_of=type_of)
         elif is_occurrence(src):
             dct = self._type2occ
         elif is_name(src):
@@ -274,6 +758,24 @@ class TypeInstanceIndex(Index):
         _unregister_type(dct, src, evt.old)
         _register_type(dct, src, evt.new)
 
+    def _set_scope(self, evt):
+        src = evt.source
+        if is_association(src) and self._tracks(src, src.type, evt.new):
+            self._update(src, tuple(src.roles), src.type, evt.new)
+
+    def _set_player(self, evt):
+        src = evt.source
+        assoc = src.parent
+        if assoc is not None and self._tracks(assoc, assoc.type, assoc.scope):
+            new_player = evt.new
+            player_of = lambda role: new_player if role is src else role.player
+            self._update(assoc, tuple(assoc.roles), assoc.type, assoc.scope, player_of=player_of)
+
+    def _sid_changed(self, evt):
+        if (evt.new or evt.old) in _TYPE_INSTANCE_SIDS:
+            # The sid is not yet added / still available, rebuild lazily
+            self._stale_topics = True
+
     def _add_assoc(self, evt):
         _register_type(self._type2assoc, evt.new, evt.new.type)
 
@@ -281,28 +783,64 @@ class TypeInstanceIndex(Index):
         _unregister_type(self._type2assoc, evt.old, evt.old.type)
  
     def _add_role(self, evt):
-        def find_type(assoc):
-            for t, p in assoc.roles:
-                if TMDM.type in t.sids:
-                    return p
-        role, type = evt.new, evt.new.type
-        _register_type(self._type2role, role, type)
-        #TODO: Use a dedicated add_type-event. Assert that assoc.type is tmdm:type_instance
-        #FIXME: Who says that the tmdm:type role is already available?
-        if TMDM.instance in type.sids:
-            _register_type(self._type2topic, role.player, find_type(evt.source))
+        assoc, role = evt.source, evt.new
+        _register_type(self._type2role, role, role.type)
+        if self._tracks(assoc, assoc.type, assoc.scope):
+            roles = tuple(assoc.roles)
+            if role not in roles:
+                roles += (role,)
+            self._update(assoc, roles, assoc.type, assoc.scope)
 
     def _remove_role(self, evt):
-        def find_type(assoc):
-            for t, p in assoc.roles:
-                if TMDM.type in t.sids:
-                    return p
-        role, type = evt.old, evt.old.type
-        _unregister_type(self._type2role, role, type)
-        #TODO: Use a dedicated remove_type-event. Assert that assoc.type is tmdm:type_instance
-        #FIXME: Who says that the tmdm:type role is still available?
-        if TMDM.instance in type.sids:
-            _unregister_type(self._type2topic, role.player, find_type(evt.source))
+        assoc, role = evt.source, evt.old
+        _unregister_type(self._type2role, role, role.type)
+        if self._tracks(assoc, assoc.type, assoc.scope):
+            self._update(assoc, tuple(r for r in assoc.roles if r is not role), assoc.type, assoc.scope)
+
+    def _tracks(self, assoc, type, scope):
+        """\
+        Returns if `assoc` is or was a ``tmdm:type-instance`` association.
+        """
+        return assoc in self._assoc2pair or _is_type_instance(type, scope)
+
+    def _update(self, assoc, roles, type, scope,
+                player_of=attrgetter('player'), type_of=attrgetter('type')):
+        """\
+        Replaces the ``(instance, type)`` pair of the `assoc` by the pair
+        which is represented by the provided `roles`, `type` and `scope`.
+        """
+        old = self._assoc2pair.pop(assoc, None)
+        new = None
+        if len(roles) == 2 and _is_type_instance(type, scope):
+            role1, role2 = roles
+            sids1, sids2 = type_of(role1).sids, type_of(role2).sids
+            if TMDM.instance in sids1 and TMDM.type in sids2:
+                new = player_of(role1), player_of(role2)
+            elif TMDM.type in sids1 and TMDM.instance in sids2:
+                new = player_of(role2), player_of(role1)
+        if new:
+            self._assoc2pair[assoc] = new
+        if old == new:
+            return
+        if old:
+            instance, typ = old
+            _unregister_type(self._type2topic, instance, typ)
+            _remove_posting(self._topic2type, instance, typ)
+        if new:
+            instance, typ = new
+            _register_type(self._type2topic, instance, typ)
+            _add_posting(self._topic2type, instance, typ)
+
+    def _topics_by_type(self):
+        """\
+        Returns the type -> instances mapping.
+        """
+        if self._stale_topics:
+            self._clear_topics()
+            type_instance = self._tm.topic_by_sid(TMDM.type_instance)
+            for assoc in self._type2assoc.get(type_instance) or ():
+                self._update(assoc, tuple(assoc.roles), assoc.type, assoc.scope)
+        return self._type2topic
 
     def _add_occ(self, evt):
         _register_type(self._type2occ, evt.new, evt.new.type)
@@ -317,39 +855,401 @@ class TypeInstanceIndex(Index):
         _unregister_type(self._type2name, evt.old, evt.old.type)
 
     def topics(self, type):
-        return self._type2topic[type]
+        return self._topics_by_type().get(type, ())
 
     def topic_types(self):
-        return self._type2topic.keys()
+        return self._topics_by_type().keys()
+
+    def types(self, topic):
+        """\
+        Returns the types of `topic`.
+        """
+        self._topics_by_type()
+        return self._topic2type.get(topic, ())
 
     def associations(self, type):
-        return self._type2assoc[type]
+        return self._type2assoc.get(type, ())
 
     def association_types(self):
         return self._type2assoc.keys()
 
     def roles(self, type):
-        return self._type2role[type]
+        return self._type2role.get(type, ())
 
     def role_types(self):
         return self._type2role.keys()
 
     def occurrences(self, type):
-        return self._type2occ[type]
+        return self._type2occ.get(type, ())
 
     def occurrence_types(self):
         return self._type2occ.keys()
 
     def names(self, type):
-        return self._type2name[type]
+        return self._type2name.get(type, ())
 
     def name_types(self):
         return self._type2name.keys()
 
+_TYPE_INSTANCE_SIDS = frozenset([TMDM.type_instance, TMDM.type, TMDM.instance])
+
+def _is_type_instance(type, scope):
+    return not scope and type is not None and TMDM.type_instance in type.sids
+
 def _register_type(dct, typed, type):
-    dct[type].append(typed)
+    _add_posting(dct, type, typed)
 
 def _unregister_type(dct, typed, type):
-    l = dct.get(type)
-    if l and typed in l:
-        l.remove(typed)
+    _remove_posting(dct, type, typed)
+
+
+class TypeHierarchyIndex(Index):
+    """\
+    Provides the transitive closure of the ``tmdm:supertype-subtype``
+    relationships.
+
+    The supertype -> subtype edges are collected from the
+    ``tmdm:supertype-subtype`` associations when the index is queried for the
+    first time and the closures are computed on demand per topic. Any change
+    to a ``tmdm:supertype-subtype`` association invalidates the edges and the
+    closures, a change to a ``tmdm:type-instance`` association invalidates the
+    instances only. Cycles in the hierarchy are tolerated.
+    """
+    def __init__(self, dispatcher, type_instance):
+        """\
+
+        `dispatcher`
+            The topic map.
+        `type_instance`
+            The `TypeInstanceIndex` of the topic map.
+        """
+        self._tm = dispatcher
+        self._type_instance = type_instance
+        super(TypeHierarchyIndex, self).__init__(dispatcher)
+
+    def clear(self):
+        self._stale = True
+        # subtype -> direct supertypes, supertype -> direct subtypes
+        self._sub2super = {}
+        self._super2sub = {}
+        # topic -> frozenset of (transitive) supertypes / subtypes / instances
+        self._supertypes = {}
+        self._subtypes = {}
+        self._instances = {}
+
+    def _event_handlers(self):
+        return ((AddRole, self._role_changed),
+                (RemoveRole, self._role_changed),
+                (SetPlayer, self._player_changed),
+                (SetType, self._set_type),
+                (SetScope, self._set_scope),
+                (AddSubjectIdentifier, self._sid_changed),
+                (RemoveSubjectIdentifier, self._sid_changed))
+
+    def _role_changed(self, evt):
+        self._assoc_changed(evt.source)
+
+    def _player_changed(self, evt):
+        self._assoc_changed(evt.source.parent)
+
+    def _set_type(self, evt):
+        src = evt.source
+        if is_association(src):
+            self._type_changed(evt.old)
+            self._type_changed(evt.new)
+        elif is_role(src):
+            self._assoc_changed(src.parent)
+
+    def _set_scope(self, evt):
+        if is_association(evt.source):
+            self._assoc_changed(evt.source)
+
+    def _sid_changed(self, evt):
+        sid = evt.new or evt.old
+        if sid in _HIERARCHY_SIDS:
+            if not self._stale:
+                self.clear()
+        elif sid in _TYPE_INSTANCE_SIDS:
+            self._instances = {}
+
+    def _assoc_changed(self, assoc):
+        if assoc is not None:
+            self._type_changed(assoc.type)
+
+    def _type_changed(self, type):
+        if type is None:
+            return
+        sids = type.sids
+        if TMDM.supertype_subtype in sids:
+            if not self._stale:
+                self.clear()
+        elif TMDM.type_instance in sids and self._instances:
+            self._instances = {}
+
+    def _edges(self):
+        if self._stale:
+            sub2super, super2sub = {}, {}
+            ss_type = self._tm.topic_by_sid(TMDM.supertype_subtype)
+            for assoc in self._type_instance.associations(ss_type) if ss_type else ():
+                supertypes, subtypes = [], []
+                for role in assoc.roles:
+                    sids = role.type.sids
+                    if TMDM.supertype in sids:
+                        supertypes.append(role.player)
+                    elif TMDM.subtype in sids:
+                        subtypes.append(role.player)
+                for sub in subtypes:
+                    for sup in supertypes:
+                        sub2super.setdefault(sub, set()).add(sup)
+                        super2sub.setdefault(sup, set()).add(sub)
+            self._sub2super, self._super2sub = sub2super, super2sub
+            self._stale = False
+        return self._sub2super, self._super2sub
+
+    def supertypes(self, type):
+        """\
+        Returns the direct and indirect supertypes of `type`.
+        """
+        res = self._supertypes.get(type)
+        if res is None:
+            res = self._supertypes[type] = _closure(type, self._edges()[0])
+        return res
+
+    def subtypes(self, type):
+        """\
+        Returns the direct and indirect subtypes of `type`.
+        """
+        res = self._subtypes.get(type)
+        if res is None:
+            res = self._subtypes[type] = _closure(type, self._edges()[1])
+        return res
+
+    def instances(self, type):
+        """\
+        Returns the topics which are instances of `type` or of one of its
+        subtypes.
+        """
+        res = self._instances.get(type)
+        if res is None:
+            topics = self._type_instance.topics
+            res = frozenset(chain(topics(type), chain.from_iterable(topics(sub) for sub in self.subtypes(type))))
+            self._instances[type] = res
+        return res
+
+    def is_subtype(self, subtype, supertype):
+        """\
+        Returns if `subtype` is a direct or indirect subtype of `supertype`.
+        """
+        return supertype in self.supertypes(subtype)
+
+_HIERARCHY_SIDS = frozenset([TMDM.supertype_subtype, TMDM.supertype, TMDM.subtype])
+
+def _closure(topic, edges):
+    """\
+    Returns the topics which are reachable from `topic`. The `topic` itself
+    is only part of the result if it is part of a cycle.
+    """
+    seen = set()
+    todo = list(edges.get(topic, ()))
+    while todo:
+        t = todo.pop()
+        if t not in seen:
+            seen.add(t)
+            todo.extend(edges.get(t, ()))
+    return frozenset(seen)
+
+
+class RolePlayerIndex(Index):
+    """\
+    Indexes the roles by ``(player, role type, association type)``.
+
+    The index remembers the ``(role type, association type)`` pairs of the
+    roles each topic plays, so lookups by player, role type and association
+    type are proportional to the number of matching roles.
+    """
+    def clear(self):
+        # (player, role type, association type) -> roles
+        self._roles = {}
+        # player -> (role type, association type) pairs
+        self._keys = {}
+
+    def _event_handlers(self):
+        return ((AddRole, self._add_role),
+                (RemoveRole, self._remove_role),
+                (SetPlayer, self._set_player),
+                (SetType, self._set_type))
+
+    def _add_role(self, evt):
+        role = evt.new
+        self._register(role, role.player, role.type, evt.source.type)
+
+    def _remove_role(self, evt):
+        role = evt.old
+        self._unregister(role, role.player, role.type, evt.source.type)
+
+    def _set_player(self, evt):
+        role = evt.source
+        assoc = role.parent
+        if assoc is None:
+            return
+        self._unregister(role, evt.old, role.type, assoc.type)
+        self._register(role, evt.new, role.type, assoc.type)
+
+    def _set_type(self, evt):
+        src = evt.source
+        if is_role(src):
+            assoc = src.parent
+            if assoc is None:
+                return
+            self._unregister(src, src.player, evt.old, assoc.type)
+            self._register(src, src.player, evt.new, assoc.type)
+        elif is_association(src):
+            for role in src.roles:
+                self._unregister(role, role.player, role.type, evt.old)
+                self._register(role, role.player, role.type, evt.new)
+
+    def _register(self, role, player, type, assoc_type):
+        _add_posting(self._roles, (player, type, assoc_type), role)
+        _add_posting(self._keys, player, (type, assoc_type))
+
+    def _unregister(self, role, player, type, assoc_type):
+        _remove_posting(self._roles, (player, type, assoc_type), role)
+        _remove_posting(self._keys, player, (type, assoc_type))
+
+    def roles(self, player, type=ANY, assoc_type=ANY, scope=ANY, exact=True):
+        """\
+        Returns the roles played by `player`.
+
+        `type`
+            The role type or ``ANY``.
+        `assoc_type`
+            The type of the parent association or ``ANY``.
+        `scope`
+            The scope of the parent association or ``ANY``.
+        `exact`
+            Indicates if the scope should be exactly matched.
+        """
+        if type is not ANY and assoc_type is not ANY:
+            keys = ((type, assoc_type),)
+        else:
+            keys = [(typ, assoc_typ) for typ, assoc_typ in self._keys.get(player, ())
+                    if (type is ANY or typ == type)
+                        and (assoc_type is ANY or assoc_typ == assoc_type)]
+        roles = chain.from_iterable(self._roles.get((player, typ, assoc_typ), ())
+                                    for typ, assoc_typ in keys)
+        if scope is ANY:
+            return list(roles)
+        return [role for role in roles if has_scope(role.parent, scope, exact)]
+
+
+class SignatureIndex(Index):
+    """\
+    Maps the signatures of the associations of the topic map, the
+    occurrences and names of a topic and the variants of a name to the
+    constructs.
+
+    Added and modified constructs are (re-)indexed on the next lookup and
+    the entries are verified on lookup, so outdated entries are harmless.
+    The index notices if a construct which is (re-)indexed is equal to an
+    indexed construct or if a (re-)indexed association has equal roles
+    (`duplicates`).
+    """
+    def clear(self):
+        # kind -> {(parent, signature): construct}
+        self._sigs = dict((k, {}) for k in (kind.ASSOCIATION, kind.OCCURRENCE, kind.NAME, kind.VARIANT))
+        self._dirty = []
+        self.duplicates = False
+
+    def _event_handlers(self):
+        return ((AddTopic, self._add_topic),
+                (AddAssociation, self._add),
+                (AddOccurrence, self._add),
+                (AddName, self._add),
+                (AddVariant, self._add),
+                (RemoveAssociation, self._remove),
+                (RemoveOccurrence, self._remove),
+                (RemoveName, self._remove),
+                (RemoveVariant, self._remove),
+                (AddRole, self._roles_changed),
+                (RemoveRole, self._roles_changed),
+                (SetPlayer, self._changed),
+                (SetType, self._changed),
+                (SetScope, self._changed),
+                (SetValue, self._changed))
+
+    def _add_topic(self, evt):
+        for child in chain(evt.new.occurrences, evt.new.names):
+            self._touch(child)
+
+    def _add(self, evt):
+        self._touch(evt.new)
+
+    def _remove(self, evt):
+        tmc = evt.old
+        sig = tmc._sig
+        if sig is None:
+            return
+        dct = self._sigs[tmc._kind]
+        key = evt.source, sig
+        if dct.get(key) is tmc:
+            del dct[key]
+
+    def _roles_changed(self, evt):
+        self._touch(evt.source)
+
+    def _changed(self, evt):
+        src = evt.source
+        if is_topic(src):
+            return
+        if is_role(src):
+            src = src.parent
+            if src is None:
+                return
+        self._touch(src)
+
+    def _touch(self, tmc):
+        self._dirty.append(tmc)
+        if is_name(tmc):
+            # The signature of a variant includes the scope of the name
+            self._dirty.extend(tmc.variants)
+
+    def flush(self):
+        """\
+        Indexes the added and modified constructs.
+        """
+        dirty, self._dirty = self._dirty, []
+        for tmc in dirty:
+            if not tmc._is_attached():
+                continue
+            key = tmc._parent, tmc.__sig__()
+            dct = self._sigs[tmc._kind]
+            existing = dct.get(key)
+            if existing is None or existing is tmc or not _is_indexed_as(existing, key):
+                dct[key] = tmc
+            else:
+                self.duplicates = True
+            if tmc._kind == kind.ASSOCIATION and _has_duplicate_roles(tmc):
+                self.duplicates = True
+
+    def get(self, kind, parent, sig):
+        """\
+        Returns the construct of the provided `kind` with the signature `sig`
+        which is a child of `parent` or ``None``.
+        """
+        if self._dirty:
+            self.flush()
+        dct = self._sigs[kind]
+        key = parent, sig
+        tmc = dct.get(key)
+        if tmc is not None and not _is_indexed_as(tmc, key):
+            del dct[key]
+            tmc = None
+        return tmc
+
+def _has_duplicate_roles(assoc):
+    roles = assoc.roles
+    return len(roles) > 1 and len(set([role.__sig__() for role in roles])) < len(roles)
+
+def _is_indexed_as(tmc, key):
+    parent, sig = key
+    return tmc._parent is parent and tmc._is_attached() and tmc.__sig__() == sig
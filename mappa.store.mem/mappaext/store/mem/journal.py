@@ -0,0 +1,601 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2011 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#
+#     * Redistributions in binary form must reproduce the above
+#       copyright notice, this list of conditions and the following
+#       disclaimer in the documentation and/or other materials provided
+#       with the distribution.
+#
+#     * Neither the name of the project nor the names of the contributors 
+#       may be used to endorse or promote products derived from this 
+#       software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""\
+Append-only journal persistence.
+
+Each modification of a topic map is translated into a compact record which
+references the Topic Maps constructs by their identifiers. A commit appends
+the pending records to the journal file, so the cost of a commit depends on
+the number of changes and not on the size of the topic maps.
+
+Periodically, the journal is compacted into a snapshot which contains the
+minimal sequence of records to recreate the topic maps. Loading a system
+replays the snapshot and the tail of the journal which was written after the
+snapshot.
+
+The snapshot and the journal carry a generation number. A journal which
+does not belong to the generation of the snapshot was already compacted into
+the snapshot (i.e. the process died while the snapshot was written) and
+is ignored.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+import os
+import cPickle as pickle
+from mappa import Literal
+from mappa.utils import is_name
+from mappa.backend.events import *
+
+__all__ = ['Journal', 'SNAPSHOT_INTERVAL']
+
+#: Number of journaled records after which a snapshot is written
+SNAPSHOT_INTERVAL = 100000
+
+#: Number of records per pickle in a snapshot
+_BATCH_SIZE = 1000
+
+_SNAPSHOT = 'snapshot'
+_JOURNAL = 'journal'
+
+
+class Journal(object):
+    """\
+    Records the modifications of the topic maps of a connection.
+    """
+    def __init__(self, conn, file, snapshot_interval=SNAPSHOT_INTERVAL):
+        """\
+
+        `conn`
+            The connection.
+        `file`
+            The name of the snapshot file. The journal is written to a file
+            with the same name and the extension ``.journal``.
+        `snapshot_interval`
+            The number of journaled records after which the journal is
+            compacted into a snapshot.
+        """
+        self._conn = conn
+        self._snapshot_file = file
+        self._journal_file = file + '.journal'
+        self.snapshot_interval = snapshot_interval
+        self._generation = 0
+        self._count = 0
+        self._pending = []
+        self._tm = None
+        self._out = None
+        self._handlers = self._event_handlers()
+
+    def load(self):
+        """\
+        Replays the snapshot and the journal into the connection and opens
+        the journal for writing.
+        """
+        replayer = _Replayer(self._conn)
+        try:
+            if os.path.exists(self._snapshot_file):
+                f = open(self._snapshot_file, 'rb')
+                try:
+                    self._generation = _read_header(f, _SNAPSHOT)
+                    while True:
+                        try:
+                            records = pickle.load(f)
+                        except EOFError:
+                            break
+                        replayer.replay(records)
+                finally:
+                    f.close()
+            if os.path.exists(self._journal_file):
+                self._count = self._replay_journal(replayer)
+        finally:
+            replayer.close()
+        if self._out is None:
+            self._new_journal()
+        for tm in self._conn._iri2tm.itervalues():
+            self.attach(tm)
+
+    def _replay_journal(self, replayer):
+        """\
+        Replays the journal and returns the number of replayed records.
+
+        An incomplete commit at the end of the journal is discarded.
+        """
+        count = 0
+        f = open(self._journal_file, 'r+b')
+        try:
+            if _read_header(f, _JOURNAL) != self._generation:
+                f.close()
+                return 0
+            pos = f.tell()
+            while True:
+                try:
+                    records = pickle.load(f)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, KeyError,
+                        IndexError, AttributeError, TypeError, MemoryError):
+                    break
+                replayer.replay(records)
+                count += len(records)
+                pos = f.tell()
+            f.seek(pos)
+            f.truncate()
+        except:
+            f.close()
+            raise
+        self._out = f
+        return count
+
+    def _new_journal(self):
+        """\
+        Replaces the journal by an empty journal of the current generation.
+        """
+        if self._out is not None:
+            self._out.close()
+        tmp = self._journal_file + '.tmp'
+        out = open(tmp, 'wb')
+        pickle.dump((_JOURNAL, self._generation), out, 2)
+        _sync(out)
+        out.close()
+        _replace(tmp, self._journal_file)
+        self._out = open(self._journal_file, 'ab')
+        self._count = 0
+
+    def attach(self, tm):
+        """\
+        Records the modifications of the topic map `tm`.
+        """
+        for event_type, handler in self._handlers:
+            tm.subscribe(event_type, handler)
+
+    def detach(self, tm):
+        """\
+        Stops recording the modifications of the topic map `tm`.
+        """
+        for event_type, handler in self._handlers:
+            tm.unsubscribe(event_type, handler)
+
+    def created(self, tm):
+        """\
+        Records the creation of the topic map `tm`.
+        """
+        self._tm = tm
+        self._pending.append(('+tm', tm.iri, tm.id, tm.allocate_id.prefix))
+        self.attach(tm)
+
+    def removed(self, tm):
+        """\
+        Records the removal of the topic map `tm`.
+        """
+        self.detach(tm)
+        if self._tm is tm:
+            self._tm = None
+        self._pending.append(('-tm', tm.iri))
+
+    def commit(self):
+        """\
+        Appends the pending records to the journal. If the journal exceeds
+        the `snapshot_interval`, a snapshot is written.
+        """
+        if self._pending:
+            if self._count + len(self._pending) >= self.snapshot_interval:
+                return self.snapshot()
+            pickle.dump(self._pending, self._out, 2)
+            _sync(self._out)
+            self._count += len(self._pending)
+            self._pending = []
+
+    def snapshot(self):
+        """\
+        Writes a snapshot of all topic maps and starts a new journal.
+
+        Pending records are part of the snapshot.
+        """
+        self._generation += 1
+        tmp = self._snapshot_file + '.tmp'
+        out = open(tmp, 'wb')
+        try:
+            pickle.dump((_SNAPSHOT, self._generation), out, 2)
+            batch = []
+            for tm in self._conn._iri2tm.itervalues():
+                for record in _snapshot_records(tm):
+                    batch.append(record)
+                    if len(batch) == _BATCH_SIZE:
+                        pickle.dump(batch, out, 2)
+                        batch = []
+            if batch:
+                pickle.dump(batch, out, 2)
+            _sync(out)
+        finally:
+            out.close()
+        _replace(tmp, self._snapshot_file)
+        self._new_journal()
+        self._pending = []
+        self._tm = None
+
+    def close(self):
+        """\
+        Closes the journal. Pending records are discarded.
+        """
+        for tm in self._conn._iri2tm.itervalues():
+            self.detach(tm)
+        self._pending = []
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def _append(self, tmc, record):
+        """\
+        Appends the `record` which belongs to the topic map of `tmc`.
+        """
+        tm = tmc.tm
+        if tm is not self._tm:
+            self._tm = tm
+            self._pending.append(('@', tm.iri))
+        self._pending.append(record)
+
+    def _event_handlers(self):
+        return ((AddTopic, self._add_topic),
+                (RemoveTopic, self._remove_child('-t')),
+                (AddAssociation, self._add_association),
+                (RemoveAssociation, self._remove_child('-a')),
+                (AddRole, self._add_child(_role_records)),
+                (RemoveRole, self._remove_child('-r')),
+                (AddOccurrence, self._add_child(_occurrence_records)),
+                (RemoveOccurrence, self._remove_child('-o')),
+                (AddName, self._add_child(_name_records)),
+                (RemoveName, self._remove_child('-n')),
+                (AddVariant, self._add_child(_variant_records)),
+                (RemoveVariant, self._remove_child('-v')),
+                (AddItemIdentifier, self._identity('+ii')),
+                (RemoveItemIdentifier, self._identity('-ii')),
+                (AddSubjectIdentifier, self._identity('+si')),
+                (RemoveSubjectIdentifier, self._identity('-si')),
+                (AddSubjectLocator, self._identity('+sl')),
+                (RemoveSubjectLocator, self._identity('-sl')),
+                (SetType, self._set_topic('type')),
+                (SetReifier, self._set_topic('reifier')),
+                (SetPlayer, self._set_topic('player')),
+                (SetScope, self._set_scope),
+                (SetValue, self._set_value))
+
+    def _add_topic(self, evt):
+        topic = evt.new
+        self._append(topic, _topic_record(topic))
+        for record in _characteristics_records(topic):
+            self._pending.append(record)
+
+    def _add_association(self, evt):
+        assoc = evt.new
+        self._append(assoc, _association_record(assoc))
+        for role in assoc.roles:
+            self._pending.extend(_role_records(assoc, role))
+
+    def _add_child(self, records):
+        def handler(evt):
+            # Children of a construct which is about to be added are
+            # recorded together with their parent
+            if not evt.source._is_attached():
+                return
+            parent = evt.source
+            for record in records(parent, evt.new):
+                self._append(parent, record)
+        return handler
+
+    def _remove_child(self, op):
+        def handler(evt):
+            self._append(evt.source, (op, evt.old.id))
+        return handler
+
+    def _identity(self, op):
+        def handler(evt):
+            tmc = evt.source
+            self._append(tmc, (op, tmc.id, evt.new or evt.old))
+        return handler
+
+    def _set_topic(self, op):
+        def handler(evt):
+            tmc = evt.source
+            self._append(tmc, (op, tmc.id, _id(evt.new)))
+        return handler
+
+    def _set_scope(self, evt):
+        tmc = evt.source
+        self._append(tmc, ('scope', tmc.id, _ids(evt.new)))
+
+    def _set_value(self, evt):
+        tmc = evt.source
+        value, datatype = evt.new
+        self._append(tmc, ('value', tmc.id, value, datatype))
+
+
+def _id(tmc):
+    return tmc.id if tmc is not None else None
+
+
+def _ids(topics):
+    return tuple(topic.id for topic in topics)
+
+
+def _topic_record(topic):
+    return ('t', topic.id, tuple(topic.sids), tuple(topic.slos), tuple(topic.iids))
+
+
+def _association_record(assoc):
+    return ('a', assoc.id, assoc.type.id, _ids(assoc.scope),
+            _id(assoc.reifier), tuple(assoc.iids))
+
+
+def _role_records(assoc, role):
+    yield ('r', assoc.id, role.id, role.type.id, role.player.id,
+           _id(role.reifier), tuple(role.iids))
+
+
+def _occurrence_records(topic, occ):
+    value, datatype = occ.literal
+    yield ('o', topic.id, occ.id, occ.type.id, value, datatype,
+           _ids(occ.scope), _id(occ.reifier), tuple(occ.iids))
+
+
+def _name_records(topic, name):
+    yield ('n', topic.id, name.id, name.type.id, name.value,
+           _ids(name.scope), _id(name.reifier), tuple(name.iids))
+    for var in name.variants:
+        for record in _variant_records(name, var):
+            yield record
+
+
+def _variant_records(name, var):
+    value, datatype = var.literal
+    # The scope of a variant includes the scope of the name
+    yield ('v', name.id, var.id, value, datatype, _ids(var._scope),
+           _id(var.reifier), tuple(var.iids))
+
+
+def _characteristics_records(topic):
+    for occ in topic.occurrences:
+        for record in _occurrence_records(topic, occ):
+            yield record
+    for name in topic.names:
+        for record in _name_records(topic, name):
+            yield record
+
+
+def _snapshot_records(tm):
+    """\
+    Returns an iterable of records which recreate the topic map `tm`.
+    """
+    yield ('+tm', tm.iri, tm.id, tm.allocate_id.prefix)
+    yield ('ids', tm.allocate_id())
+    # Topics first since all other records refer to them
+    for topic in tm.topics:
+        yield _topic_record(topic)
+    for topic in tm.topics:
+        for record in _characteristics_records(topic):
+            yield record
+    for assoc in tm.associations:
+        yield _association_record(assoc)
+        for role in assoc.roles:
+            for record in _role_records(assoc, role):
+                yield record
+    for iid in tm.iids:
+        yield ('+ii', tm.id, iid)
+    if tm.reifier:
+        yield ('reifier', tm.id, tm.reifier.id)
+
+
+class _Replayer(object):
+    """\
+    Applies records to the topic maps of a connection.
+
+    The topic maps are kept in bulk mode while the records are replayed.
+    """
+    def __init__(self, conn):
+        self._conn = conn
+        self._tm = None
+        # Identifiers are unique per topic map only
+        self._constructs = None
+        self._iri2constructs = {}
+        self._bulk = []
+        self._ops = {
+            '@': self._use,
+            'ids': lambda ident: self._tm.allocate_id.reserve(ident),
+            '+tm': self._create_tm,
+            '-tm': self._remove_tm,
+            't': self._topic,
+            'a': self._association,
+            'r': self._role,
+            'o': self._occurrence,
+            'n': self._name,
+            'v': self._variant,
+            '-t': lambda ident: self._tm.remove_topic(self._get(ident)),
+            '-a': lambda ident: self._tm.remove_association(self._get(ident)),
+            '-r': lambda ident: self._remove(ident, 'remove_role'),
+            '-o': lambda ident: self._remove(ident, 'remove_occurrence'),
+            '-n': lambda ident: self._remove(ident, 'remove_name'),
+            '-v': lambda ident: self._remove(ident, 'remove_variant'),
+            '+ii': lambda ident, iri: self._get(ident).add_iid(iri),
+            '-ii': lambda ident, iri: self._get(ident).remove_iid(iri),
+            '+si': lambda ident, iri: self._get(ident).add_sid(iri),
+            '-si': lambda ident, iri: self._get(ident).remove_sid(iri),
+            '+sl': lambda ident, iri: self._get(ident).add_slo(iri),
+            '-sl': lambda ident, iri: self._get(ident).remove_slo(iri),
+            'type': self._set('type'),
+            'reifier': self._set('reifier'),
+            'player': self._set('player'),
+            'scope': self._set_scope,
+            'value': self._set_value,
+        }
+
+    def replay(self, records):
+        ops = self._ops
+        for record in records:
+            ops[record[0]](*record[1:])
+
+    def close(self):
+        """\
+        Ends the bulk mode of the topic maps and ensures that the topic
+        maps do not reuse the replayed identifiers.
+        """
+        for tm in self._bulk:
+            tm._end_bulk()
+        self._bulk = []
+        for iri, constructs in self._iri2constructs.iteritems():
+            tm = self._conn.get(iri)
+            if tm is not None and constructs:
+                tm.allocate_id.reserve(max(constructs))
+
+    def _get(self, ident):
+        return self._constructs[ident] if ident is not None else None
+
+    def _register(self, tmc, ident):
+        old = self._constructs.get(ident)
+        if old is not None and getattr(old, 'reifier', None) is not None:
+            # A detached construct is added again (i.e. moved to another
+            # parent), release its reifier for the replacement
+            old.reifier = None
+        tmc.id = ident
+        self._constructs[ident] = tmc
+        return tmc
+
+    def _use(self, iri):
+        self._tm = self._conn.get(iri)
+        self._constructs = self._iri2constructs[iri]
+
+    def _create_tm(self, iri, ident, prefix):
+        self._constructs = self._iri2constructs[iri] = {}
+        tm = self._register(self._conn._create(iri), ident)
+        # Keeps the generated identifiers stable across restarts
+        tm.allocate_id.prefix = prefix
+        tm._begin_bulk()
+        self._bulk.append(tm)
+        self._tm = tm
+
+    def _remove_tm(self, iri):
+        tm = self._conn.get(iri)
+        if tm in self._bulk:
+            self._bulk.remove(tm)
+            tm._end_bulk()
+        self._conn._remove(iri)
+        del self._iri2constructs[iri]
+        if self._tm is tm:
+            self._tm = None
+            self._constructs = None
+
+    def _topic(self, ident, sids, slos, iids):
+        tm = self._tm
+        topic = self._register(tm.builder.create_topic(), ident)
+        tm.add_topic(topic)
+        for sid in sids:
+            topic.add_sid(sid)
+        for slo in slos:
+            topic.add_slo(slo)
+        for iid in iids:
+            topic.add_iid(iid)
+
+    def _association(self, ident, type, scope, reifier, iids):
+        tm = self._tm
+        assoc = tm.builder.create_association(self._get(type), self._scope(scope))
+        self._add(tm.add_association, assoc, ident, reifier, iids)
+
+    def _role(self, parent, ident, type, player, reifier, iids):
+        role = self._tm.builder.create_role(self._get(type), self._get(player))
+        self._add(self._get(parent).add_role, role, ident, reifier, iids)
+
+    def _occurrence(self, parent, ident, type, value, datatype, scope, reifier, iids):
+        occ = self._tm.builder.create_occurrence(self._get(type), Literal(value, datatype), self._scope(scope))
+        self._add(self._get(parent).add_occurrence, occ, ident, reifier, iids)
+
+    def _name(self, parent, ident, type, value, scope, reifier, iids):
+        name = self._tm.builder.create_name(self._get(type), Literal(value), self._scope(scope))
+        self._add(self._get(parent).add_name, name, ident, reifier, iids)
+
+    def _variant(self, parent, ident, value, datatype, scope, reifier, iids):
+        var = self._tm.builder.create_variant(Literal(value, datatype), self._scope(scope))
+        self._add(self._get(parent).add_variant, var, ident, reifier, iids)
+
+    def _add(self, add, tmc, ident, reifier, iids):
+        add(self._register(tmc, ident))
+        if reifier is not None:
+            tmc.reifier = self._get(reifier)
+        for iid in iids:
+            tmc.add_iid(iid)
+
+    def _remove(self, ident, method):
+        tmc = self._get(ident)
+        getattr(tmc.parent, method)(tmc)
+
+    def _scope(self, ids):
+        return [self._get(ident) for ident in ids]
+
+    def _set(self, attr):
+        def setter(ident, value):
+            setattr(self._get(ident), attr, self._get(value))
+        return setter
+
+    def _set_scope(self, ident, scope):
+        tmc = self._get(ident)
+        tmc.scope = self._scope(scope)
+
+    def _set_value(self, ident, value, datatype):
+        tmc = self._get(ident)
+        if is_name(tmc):
+            tmc.value = value
+        else:
+            tmc.value = Literal(value, datatype)
+
+
+def _read_header(f, kind):
+    """\
+    Reads the header of a snapshot or journal and returns the generation.
+    """
+    header = pickle.load(f)
+    if header[0] != kind:
+        raise IOError('Expected a %s, got "%r"' % (kind, header[0]))
+    return header[1]
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _replace(src, dst):
+    try:
+        os.rename(src, dst)
+    except OSError:
+        # Windows does not replace existing files
+        os.remove(dst)
+        os.rename(src, dst)
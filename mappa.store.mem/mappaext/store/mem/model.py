@@ -38,32 +38,58 @@ Memory backend.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-import cPickle as pickle
-from mappa import UCS
-from mappa._internal.utils import random_id
+from contextlib import contextmanager
+from mappa import UCS, TMDM, ANY, Literal
+from mappa._internal import kind
+from mappa._internal.utils import IdAllocator
+from mappa._internal.dupremoval import remove_duplicates
+from mappa._internal.siggen import make_association_signature, \
+    make_occurrence_signature, make_name_signature, make_variant_signature
+from mappa._internal.implhelper import topic_types, topic_instances
+from mappa._internal.filter import filter_roles
 from mappa.backend.stub import *
 from mappa.utils import is_topic
 from mappa.backend.identityman import IdentityManager
-from .index import IndexManager
+from .index import IndexManager, SignatureIndex
+from .journal import Journal, SNAPSHOT_INTERVAL
 
 #pylint: disable-msg=W0622
 
 class Connection(object):
 
-    def __init__(self, file=None, persistent=False, **kw):
+    def __init__(self, file=None, persistent=False, snapshot_interval=SNAPSHOT_INTERVAL,
+                 suppress_duplicates=False, **kw):
         self._iri2tm = {}
         self._persistent = persistent
+        self._suppress_duplicates = suppress_duplicates
         self._file = file
+        self._journal = None
         self.closed = False
+        if persistent:
+            if not file:
+                raise ValueError('No file specified')
+            self._journal = Journal(self, file, snapshot_interval)
+            self._journal.load()
 
     def create(self, iri):
         if self._iri2tm.get(iri):
             raise ValueError('A topic map with the specified IRI "%s" exists' % iri)
-        tm = TopicMap(locator=iri)
+        tm = self._create(iri)
+        if self._journal:
+            self._journal.created(tm)
+        return tm
+
+    def _create(self, iri):
+        tm = TopicMap(locator=iri, suppress_duplicates=self._suppress_duplicates)
         self._iri2tm[iri] = tm
         return tm
 
     def remove(self, iri):
+        if self._journal:
+            self._journal.removed(self._iri2tm[iri])
+        self._remove(iri)
+
+    def _remove(self, iri):
         del self._iri2tm[iri]
 
     def get(self, iri):
@@ -73,10 +99,20 @@ class Connection(object):
         return iri in self._iri2tm
 
     def commit(self):
-        if self._persistent:
-            out = open(self._file, 'wb')
-            pickle.dump(self, out)
-            out.close()
+        """\
+        Appends the changes since the last commit to the journal iff the
+        connection is persistent.
+        """
+        if self._journal:
+            self._journal.commit()
+
+    def snapshot(self):
+        """\
+        Writes a snapshot of all topic maps and truncates the journal iff
+        the connection is persistent.
+        """
+        if self._journal:
+            self._journal.snapshot()
 
     def abort(self):
         pass
@@ -85,6 +121,9 @@ class Connection(object):
         self.closed = True
         if commit:
             self.commit()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
         self._iri2tm = None
 
     iris = property(lambda self: self._iri2tm.keys())
@@ -114,19 +153,54 @@ class TopicMapsConstructBuilder(object):
         return Variant(self.tm, value, scope)
 
 
+#: Shared empty collection, replaced on first write
+_EMPTY = frozenset()
+
+
 class TMCMixin(object):
-    
-    def __init__(self):
-        self.id = random_id()
+    """\
+    Stores the collections of a construct compactly: An empty collection is
+    represented by a shared empty ``frozenset``, up to two items are kept in
+    a tuple and larger collections are kept in a ``set``.
+    """
+    __slots__ = ('id',)
+
+    def __init__(self, tm):
+        self.id = tm.allocate_id()
 
     def _create_iids(self): 
-        return set()
+        return _EMPTY
+
+    @staticmethod
+    def _add_to(collection, item):
+        if isinstance(collection, set):
+            collection.add(item)
+            return collection
+        if item in collection:
+            return collection
+        if not collection:
+            return (item,)
+        if len(collection) < 2:
+            return collection + (item,)
+        collection = set(collection)
+        collection.add(item)
+        return collection
+
+    @staticmethod
+    def _remove_from(collection, item):
+        if isinstance(collection, set):
+            collection.remove(item)
+            return collection
+        if item not in collection:
+            raise KeyError(item)
+        return tuple(e for e in collection if e != item) or _EMPTY
 
 
 class ScopedMixin(TMCMixin):
+    __slots__ = ()
 
-    def __init__(self):
-        TMCMixin.__init__(self)
+    def __init__(self, tm):
+        TMCMixin.__init__(self, tm)
 
     def _create_scope(self, scope):
         if not scope:
@@ -135,12 +209,98 @@ class ScopedMixin(TMCMixin):
 
 class TopicMap(TopicMapStub, TMCMixin):
 
-    def __init__(self, locator):
-        TMCMixin.__init__(self)
+    def __init__(self, locator, suppress_duplicates=False):
+        """\
+
+        `locator`
+            The storage address of the topic map.
+        `suppress_duplicates`
+            Indicates if the ``create_*`` methods should return an existing
+            equal association, occurrence, name or variant instead of
+            creating a duplicate.
+        """
+        # Identifiers are unique within a topic map
+        self.allocate_id = IdAllocator()
+        TMCMixin.__init__(self, self)
         TopicMapStub.__init__(self, locator)
         self._idman = IdentityManager(self)
         self.builder = TopicMapsConstructBuilder(self)
-        self.index = IndexManager(self)
+        self._index = IndexManager(self)
+        # Maintained in any case since merging topics looks up equal constructs
+        self._signatures = SignatureIndex(self)
+        self._suppress_duplicates = suppress_duplicates
+        self._bulk = 0
+        self._stale_index = False
+
+    @contextmanager
+    def bulk(self):
+        """\
+        Suspends the maintenance of the indexes while the topic map is 
+        modified, i.e. while a topic map is deserialized::
+
+            with tm.bulk():
+                # Add lots of topics and associations
+
+        The identities and indexes are rebuilt in one pass at the end of the
+        block. Item identifiers, subject identifiers and subject locators are
+        tracked within the block and removed constructs release their
+        identities, so topic lookups and identity violations work as usual.
+
+        Within the block, `construct_by_id` does not know the constructs which 
+        were created in the block. Accessing `index` rebuilds the indexes
+        immediately and keeps them up to date for the rest of the block.
+        """
+        self._begin_bulk()
+        try:
+            yield self
+        finally:
+            self._end_bulk()
+
+    def _begin_bulk(self):
+        self._bulk += 1
+        if self._bulk > 1:
+            return
+        # Removed constructs release their identities within the block
+        self._event_multiplier.unsubscribe_additions(self)
+        self._idman.unsubscribe_constructs(self)
+        self._index.unsubscribe(self)
+        self._stale_index = True
+
+    def _end_bulk(self):
+        self._bulk -= 1
+        if self._bulk:
+            return
+        self._idman.subscribe_constructs(self)
+        self._idman.rebuild(self)
+        self._get_index()
+
+    def _get_index(self):
+        if self._stale_index:
+            self._index.rebuild(self)
+            self._index.subscribe(self)
+            self._event_multiplier.subscribe_additions(self)
+            self._stale_index = False
+        return self._index
+
+    def create_association(self, type, scope=(), roles=()):
+        if self._suppress_duplicates and roles:
+            roles = tuple(roles)
+            existing = self._signatures.get(kind.ASSOCIATION, self, make_association_signature(type, scope, roles))
+            if existing is not None:
+                return existing
+        return TopicMapStub.create_association(self, type, scope, roles)
+
+    def _remove_duplicates(self):
+        sigs = self._signatures
+        sigs.flush()
+        if not sigs.duplicates:
+            return
+        remove_duplicates(self)
+        sigs.flush()
+        sigs.duplicates = False
+
+    def _identities(self):
+        return self._idman.identities()
 
     def construct_by_iid(self, iid):
         return self._idman.construct_by_iid(iid)
@@ -148,7 +308,7 @@ class TopicMap(TopicMapStub, TMCMixin):
     def construct_by_id(self, ident):
         if self.id == ident:
             return self
-        return self._idman.construct_by_id(ident)
+        return self._idman.construct_by_id(ident) or self._forwarded(ident)
 
     def topic_by_iid(self, iid):
         tmc = self.construct_by_iid(iid)
@@ -171,67 +331,125 @@ class TopicMap(TopicMapStub, TMCMixin):
     def _create_associations(self): 
         return set()
 
+    index = property(_get_index)
+
 
 class Topic(TMCMixin, TopicStub):
+    __slots__ = ('_tm', '_parent', 'iids', '_reified', 'sids', 'slos',
+                 'roles_played', 'occurrences', 'names')
 
     def __init__(self, tm):
-        TMCMixin.__init__(self)
+        TMCMixin.__init__(self, tm)
         TopicStub.__init__(self, tm)
 
     def _create_sids(self): 
-        return set()
+        return _EMPTY
 
     def _create_slos(self): 
-        return set()
+        return _EMPTY
 
     def _create_roles_played(self): 
-        return set()
+        return _EMPTY
 
     def _create_occurrences(self): 
-        return set()
+        return _EMPTY
 
     def _create_names(self): 
-        return set()
+        return _EMPTY
+
+    def create_occurrence(self, type, value, scope=()):
+        tm = self._tm
+        if tm._suppress_duplicates:
+            existing = tm._signatures.get(kind.OCCURRENCE, self, make_occurrence_signature(type, Literal(value), scope))
+            if existing is not None:
+                return existing
+        return TopicStub.create_occurrence(self, type, value, scope)
+
+    def create_name(self, type, value, scope=()):
+        tm = self._tm
+        if tm._suppress_duplicates:
+            if not type:
+                type = tm.create_topic(sid=TMDM.topic_name)
+            existing = tm._signatures.get(kind.NAME, self, make_name_signature(type, Literal(value).value, scope))
+            if existing is not None:
+                return existing
+        return TopicStub.create_name(self, type, value, scope)
+
+    def _get_types(self):
+        tm = self._tm
+        if tm._stale_index:
+            # Do not rebuild the indexes within a bulk block
+            return topic_types(self)
+        return tm.index.type_instance.types(self)
+
+    def _get_instances(self):
+        tm = self._tm
+        if tm._stale_index:
+            return topic_instances(self)
+        return tm.index.type_instance.topics(self)
+
+    def roles_by(self, type, assoc_type=ANY, scope=ANY, exact=True):
+        tm = self._tm
+        if tm._stale_index:
+            return filter_roles(type, assoc_type, scope, exact, self.roles_played)
+        return tm.index.role_player.roles(self, type, assoc_type, scope, exact)
+
+    types = property(_get_types)
+    instances = property(_get_instances)
 
 
 class Association(AssociationStub, ScopedMixin):
+    __slots__ = ('_tm', '_parent', 'iids', '_scope', '_type', '_reifier', 'roles', '_sig')
 
     def __init__(self, tm, type, scope):
-        ScopedMixin.__init__(self)
+        ScopedMixin.__init__(self, tm)
         AssociationStub.__init__(self, tm, type, scope)
 
     def _create_roles(self): 
-        return set()
+        return _EMPTY
 
 
 class Role(RoleStub, TMCMixin):
+    __slots__ = ('_tm', '_parent', 'iids', '_type', '_reifier', '_player')
 
     def __init__(self, tm, type, player):
-        TMCMixin.__init__(self)
+        TMCMixin.__init__(self, tm)
         RoleStub.__init__(self, tm, type, player)
 
 
 class Occurrence(OccurrenceStub, ScopedMixin):
-    
+    __slots__ = ('_tm', '_parent', 'iids', '_scope', '_type', '_reifier', '_literal', '_sig')
+
     def __init__(self, tm, type, value, scope):
-        ScopedMixin.__init__(self)
+        ScopedMixin.__init__(self, tm)
         OccurrenceStub.__init__(self, tm, type, value, scope)
 
 
 class Name(NameStub, ScopedMixin):
+    __slots__ = ('_tm', '_parent', 'iids', '_scope', '_type', '_reifier', '_literal',
+                 'variants', '_sig')
 
     def __init__(self, tm, type, value, scope):
-        ScopedMixin.__init__(self)
+        ScopedMixin.__init__(self, tm)
         NameStub.__init__(self, tm, type, value, scope)
 
+    def create_variant(self, value, scope):
+        tm = self._tm
+        if tm._suppress_duplicates and scope:
+            existing = tm._signatures.get(kind.VARIANT, self, make_variant_signature(Literal(value), set(scope).union(self.scope)))
+            if existing is not None:
+                return existing
+        return NameStub.create_variant(self, value, scope)
+
     def _create_variants(self): 
-        return set()
+        return _EMPTY
 
 
 class Variant(VariantStub, ScopedMixin):
+    __slots__ = ('_tm', '_parent', 'iids', '_scope', '_reifier', '_literal', '_sig')
 
     def __init__(self, tm, value, scope):
-        ScopedMixin.__init__(self)
+        ScopedMixin.__init__(self, tm)
         VariantStub.__init__(self, tm, value, scope)
 
 
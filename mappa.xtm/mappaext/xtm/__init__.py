@@ -16,7 +16,7 @@ from __future__ import absolute_import
 from . import xtm1, xtm2
 
 
-def create_writer(out, base, version=None, prettify=False, export_iids=True, **kw):
+def create_writer(out, base, version=None, prettify=False, export_iids=True, compress=False, processes=1, **kw):
     """\
     
     """
@@ -30,4 +30,7 @@ def create_writer(out, base, version=None, prettify=False, export_iids=True, **k
     writer = cls(out, base, version=version)
     writer.prettify = prettify
     writer.export_iids = export_iids
+    writer.compress = compress
+    if cls is xtm2.XTM2TopicMapWriter:
+        writer.processes = processes
     return writer
@@ -39,13 +39,14 @@ class XTM10TopicMapWriter(object):
         self._encoding = encoding
         self.export_iids = True
         self.prettify = False
+        self.compress = False
         self._base = base
 
     def write(self, topicmap):
         """\
         Serializes the specified ``topicmap``.
         """
-        self._writer = XMLWriter(self._out, self._encoding)
+        self._writer = XMLWriter(self._out, self._encoding, compress=self.compress)
         writer = self._writer
         writer.prettify = self.prettify
         writer.startDocument()
@@ -15,12 +15,14 @@ and `XML Topic Maps (XTM) 2.1 <http://www.isotopicmaps.org/sam/sam-xtm/2009-11-1
 :license:      BSD license
 """
 import io
+from functools import partial
 from xml.sax import make_parser
 from xml.sax.xmlreader import InputSource
 import xml.sax.handler as sax_handler
 from tm.xmlutils import XMLWriter, xmlwriter_as_contenthandler
 from mappa import XSD
 from mappa._internal.it import one_of, no
+from mappa._internal.parallel import map_chunks
 from mappa._internal.utils import topic_id
 from mappa.utils import is_default_name, is_default_name_type
 
@@ -61,6 +63,8 @@ class XTM2TopicMapWriter(object):
         self._base = base
         self.export_iids = True
         self.prettify = False
+        self.compress = False
+        self.processes = 1
         if self._version == 2.0:
             self._reifier = self._reifier_xtm20
             self._write_topic_ref = self._write_topic_ref_xtm20
@@ -74,7 +78,7 @@ class XTM2TopicMapWriter(object):
         """\
         Serializes the specified ``topicmap``.
         """
-        self._writer = XMLWriter(self._out, self._encoding)
+        self._writer = XMLWriter(self._out, self._encoding, compress=self.compress)
         writer = self._writer
         writer.prettify = self.prettify
         writer.startDocument()
@@ -84,15 +88,53 @@ class XTM2TopicMapWriter(object):
         writer.startElement(u'topicMap', attrs)
         self._write_reifier(topicmap)
         self._write_iids(topicmap)
-        write_topic = self._write_topic
-        for topic in topicmap.topics:
-            write_topic(topic)
-        write_assoc = self._write_association
-        for assoc in topicmap.associations:
-            write_assoc(assoc)
+        if self.processes == 1:
+            write_topic = self._write_topic
+            for topic in topicmap.topics:
+                write_topic(topic)
+            write_assoc = self._write_association
+            for assoc in topicmap.associations:
+                write_assoc(assoc)
+        else:
+            self._write_parallel(topicmap)
         writer.endElement(u'topicMap')
         writer.endDocument()
 
+    def _write_parallel(self, topicmap):
+        """\
+        Serializes the topics and associations by worker processes and 
+        writes the fragments in order.
+        """
+        write_fragment = self._writer.writeFragment
+        for fragment in map_chunks(partial(self._serialize_chunk, self._write_topic),
+                                   list(topicmap.topics), self.processes):
+            write_fragment(fragment)
+        for fragment in map_chunks(partial(self._serialize_chunk, self._write_association),
+                                   list(topicmap.associations), self.processes):
+            write_fragment(fragment)
+
+    def _serialize_chunk(self, write, constructs):
+        """\
+        Returns the serialization of the `constructs` as string.
+
+        `write`
+            The method which serializes a construct.
+        `constructs`
+            A list of topics or associations.
+        """
+        writer = self._writer
+        out = io.BytesIO()
+        self._writer = XMLWriter(out, prettify=self.prettify)
+        try:
+            # Topics and associations are children of the topicMap element
+            self._writer.startFragment(1)
+            for construct in constructs:
+                write(construct)
+            self._writer.flush()
+        finally:
+            self._writer = writer
+        return out.getvalue().decode('utf-8')
+
     def _write_topic(self, topic):
         """\
         Serializes a topic and its characteristics.
@@ -12,6 +12,11 @@ Tests against the XTM writers.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+import io
+from nose.tools import eq_
+import mappa
+from mappa import XSD
+from mappa._internal import parallel
 from mappaext.cxtm.cxtm_test import create_writer_cxtm_cases
 from mio.xtm import create_deserializer
 from mappaext import xtm
@@ -110,6 +115,42 @@ def test_xtm_21_writer():
         yield test
 
 
+def _create_map(base):
+    tm = mappa.connect().create(base)
+    types = [tm.create_topic(sid=u'http://www.example.org/type-%d' % i) for i in range(3)]
+    for i in xrange(40):
+        topic = tm.create_topic(sid=u'http://www.example.org/topic-%d' % i)
+        topic.add_type(types[i % 3])
+        name = topic.create_name(types[0], u'Topic %d' % i, types[1:i % 3])
+        name.create_variant(u'topic-%d' % i, [types[2]])
+        topic.create_occurrence(types[1], (u'%d' % i, XSD.integer))
+        assoc = tm.create_association(types[2], roles=[(types[0], topic), (types[1], tm.create_topic())])
+        if i % 5 == 0:
+            assoc.reifier = tm.create_topic()
+    return tm
+
+
+def test_parallel_writer():
+    def check(version, prettify):
+        chunk_size = parallel.CHUNK_SIZE
+        # Several chunks per worker
+        parallel.CHUNK_SIZE = 7
+        try:
+            outputs = []
+            for processes in (1, 2):
+                out = io.BytesIO()
+                xtm.create_writer(out, base, version=version, prettify=prettify, processes=processes).write(tm)
+                outputs.append(out.getvalue())
+        finally:
+            parallel.CHUNK_SIZE = chunk_size
+        eq_(outputs[0], outputs[1])
+    base = u'http://www.example.org/map'
+    tm = _create_map(base)
+    for version in (2.0, 2.1):
+        for prettify in (False, True):
+            yield check, version, prettify
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
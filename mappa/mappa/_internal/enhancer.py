@@ -18,6 +18,7 @@ These enhancers are used to avoid unncessary subclassing.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
+from __future__ import with_statement
 from itertools import ifilter, imap
 from mappa import TMDM, UCS, ANY
 from mappa.utils import is_binary, is_construct, is_scoped, is_topicmap, \
@@ -64,6 +65,17 @@ def enhance_connection(cls):
         if version == '1.0' or deser.version == '1.0':
             from mappa.xtm1utils import convert_to_tmdm
             convert_to_tmdm(tm)
+    def _parse(deser, src, tm, bulk, deferred):
+        from mappa.miohandler import MappaMapHandler, DeferredMappaMapHandler
+        if deferred:
+            deser.handler = DeferredMappaMapHandler(tm)
+        else:
+            deser.handler = MappaMapHandler(tm)
+        if bulk and hasattr(tm, 'bulk'):
+            with tm.bulk():
+                deser.parse(src)
+        else:
+            deser.parse(src)
     if not hasattr(cls, '__getitem__'):
         def _get_tm(self, key):
             tm = self.get(key)
@@ -78,8 +90,7 @@ def enhance_connection(cls):
     if not hasattr(cls, 'load'):
         import tm
         from tm import mio
-        from mappa.miohandler import MappaMapHandler
-        def _load(conn, source, into, base=None, format=None, **kw):
+        def _load(conn, source, into, base=None, format=None, bulk=False, deferred=False, **kw):
             extension = None
             src = None
             if hasattr(source, 'read'):
@@ -93,22 +104,19 @@ def enhance_connection(cls):
             if not deser:
                 raise IOError('No deserializer found for "%s"' % format)
             tmap = conn.get(into) or conn.create(into)
-            deser.handler = MappaMapHandler(tmap)
-            deser.parse(src)
+            _parse(deser, src, tmap, bulk, deferred)
             _post_process_loading(tmap, format, kw.get('version'), deser)
         cls.load = _load
     if not hasattr(cls, 'loads'):
         import tm
         from tm import mio
-        from mappa.miohandler import MappaMapHandler
-        def _loads(conn, source, into, base=None, format='ctm', **kw):
+        def _loads(conn, source, into, base=None, format='ctm', bulk=False, deferred=False, **kw):
             src = tm.Source(data=source, iri=base or into)
             deser = mio.create_deserializer(format, **kw)
             if not deser:
                 raise IOError('No deserializer found for "%s"' % format)
             tmap = conn.get(into) or conn.create(into)
-            deser.handler = MappaMapHandler(tmap)
-            deser.parse(src)
+            _parse(deser, src, tmap, bulk, deferred)
             _post_process_loading(tmap, format, kw.get('version'), deser)
         cls.loads = _loads
     if not hasattr(cls, 'write'):
@@ -149,7 +157,7 @@ def enhance_topicmap(cls):
         cls.construct = construct_by_identity
     if not hasattr(cls, 'merge'):
         def _merge(tm, other):
-            mergeutils. merge_topicmaps(other, tm)
+            return mergeutils.merge_topicmaps(other, tm)
         cls.merge = _merge
 
 
@@ -228,7 +236,7 @@ def enhance_topic(cls):
         cls.played_types = property(_played_types)
     if not hasattr(cls, 'merge'):
         def _merge(topic, other):
-            mergeutils.merge_topics(other, topic)
+            return mergeutils.merge_topics(other, topic)
         cls.merge = _merge
     if not hasattr(cls, '__iter__'):
         # Necessary, otherwise Python utilizes __getitem__ which results in errors
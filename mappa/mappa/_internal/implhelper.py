@@ -16,7 +16,7 @@ from itertools import ifilter, imap
 from mappa import TMDM, UCS
 from mappa.utils import is_binary, involved_associations
 from mappa.predicates import parent
-from .utils import is_slo, is_uri, make_locator, strip_slo_prefix, random_id
+from .utils import is_slo, is_uri, make_locator, strip_slo_prefix, id_allocator
 
 def get_topic(tm, key):
     """\
@@ -51,12 +51,13 @@ def create_topic_by_identity(tm, *identity, **kw):
     """\
 
     """
-    def random_iid():
-        return make_locator(tm.iri, str(random_id()))
+    def auto_iid():
+        return make_locator(tm.iri, 'id-%s-%d' % (allocate_id.prefix, allocate_id()))
     if not identity and not kw: # Automatically assigned topic iid
-        iid = random_iid()
-        while tm.topic_by_iid(iid) or tm.topic_by_sid(iid):
-            iid = random_iid()
+        allocate_id = id_allocator(tm)
+        iid = auto_iid()
+        while tm.construct_by_iid(iid) or tm.topic_by_sid(iid):
+            iid = auto_iid()
         return tm.create_topic_by_iid(iid)
     topic = topic_by_identity(tm, *identity, **kw)
     if topic:
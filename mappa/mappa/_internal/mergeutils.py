@@ -17,83 +17,298 @@ This module provides functions to merge topic maps and topics.
 :license:      BSD License
 """
 from mappa import ModelConstraintViolation
-from mappa.predicates import parent
+from mappa.utils import is_topic
+from mappa._internal import kind
 from mappa._internal.constraints import check_same_topicmap
+from mappa._internal.siggen import make_association_signature, \
+    make_occurrence_signature, make_name_signature, make_variant_signature
+
+class MergeStatistics(object):
+    """\
+    Provides the number of Topic Maps constructs which were processed by
+    `merge_topicmaps`.
+    """
+    __slots__ = ['topics_merged', 'topics_copied', 'topics_unified',
+                 'copied', 'skipped']
+
+    def __init__(self):
+        # Number of source topics which are equal to a topic in the target
+        self.topics_merged = 0
+        # Number of source topics which were copied into the target
+        self.topics_copied = 0
+        # Number of target topics which were merged into another target topic
+        self.topics_unified = 0
+        # Number of copied associations, occurrences, names and variants
+        self.copied = 0
+        # Number of associations, occurrences, names and variants which
+        # existed in the target
+        self.skipped = 0
+
+    def __repr__(self):
+        return '<MergeStatistics topics_merged=%d topics_copied=%d topics_unified=%d copied=%d skipped=%d>' \
+                % (self.topics_merged, self.topics_copied, self.topics_unified, self.copied, self.skipped)
+
 
 def merge_topicmaps(source, target):
     """\
-    Merges the `source´ topic map with the `target` topic map.
+    Merges the `source´ topic map with the `target` topic map and returns
+    a `MergeStatistics` instance.
     
     The `source` stays unmodified, only `target` will be modified.
+
+    Associations, occurrences, names and variants are only created in the
+    `target` if no equal construct exists.
     
     `source`
         A topic map instance.
     `target`
         A topic map instance.
     """
-    def add_merge(source, target):
+    stats = MergeStatistics()
+    if source == target:
+        return stats
+    merger = _TopicMapMerger(source, target, stats)
+    merger.merge()
+    return stats
+
+
+class _TopicMapMerger(object):
+    """\
+    Copies the content of a source topic map into a target topic map.
+    """
+    def __init__(self, source, target, stats):
+        self.source = source
+        self.target = target
+        self.stats = stats
+        # Mapping source.topic -> target.topic
+        self.mergemap = {}
+        # Target topics which existed before the merge
+        self.existing = set()
+
+    def merge(self):
+        source, target, mergemap, stats = self.source, self.target, self.mergemap, self.stats
+        for topic, equal in _equal_topics(source, target):
+            existing = mergemap.get(topic)
+            if existing is None:
+                mergemap[topic] = equal
+                stats.topics_merged += 1
+            else:
+                existing = self.topic(topic)
+                if existing != equal:
+                    # The source topic is equal to several topics of the
+                    # target, merge them
+                    merge_topics(equal, existing)
+                    stats.topics_unified += 1
+        matched = tuple(mergemap)
+        self.existing.update(mergemap.itervalues())
+        for topic in source.topics:
+            if topic not in mergemap:
+                self.copy_topic(topic)
+        for source_topic in matched:
+            target_topic = self.topic(source_topic)
+            _copy_identities(source_topic.sids, source_topic.slos, source_topic.iids, target_topic)
+            self.copy_characteristics(source_topic, target_topic)
+        self.copy_associations()
+
+    def topic(self, topic):
         """\
-        Makes `source` equal with `target`.
-        
-        If `source` is already equal with some other topic, the other topic
-        is merged with the `target` topic.
+        Returns the equivalent of the source `topic` in the target topic map.
+
+        The topic is copied into the target if it has no equivalent.
         """
-        existing = mergemap.get(source)
-        if existing:
-            if existing != target:
-                # The source topic is equals to another topic in the target topic map
-                # Merge the topics in the target topic map.
-                merge_topics(target, existing)
+        target_topic = self.mergemap.get(topic)
+        if target_topic is None:
+            return self.copy_topic(topic)
+        if not target_topic._is_attached():
+            target_topic = self.target._forwarded(target_topic.id)
+            self.mergemap[topic] = target_topic
+        return target_topic
+
+    def scope(self, scoped):
+        return [self.topic(theme) for theme in scoped.scope]
+
+    def copy_topic(self, topic):
+        """\
+        Copies the `topic` to the target topic map and returns the
+        topic in the target topic map.
+        """
+        topicmap = self.target
+        sids = tuple(topic.sids)
+        slos = tuple(topic.slos)
+        iids = tuple(topic.iids)
+        target = None
+        if sids:
+            target = topicmap.create_topic(sid=sids[0])
+            sids = sids[1:]
+        if not target and slos:
+            target = topicmap.create_topic(slo=slos[0])
+            slos = slos[1:]
+        if not target and iids:
+            target = topicmap.create_topic(iid=iids[0])
+            iids = iids[1:]
+        assert(target)
+        self.mergemap[topic] = target
+        self.stats.topics_copied += 1
+        _copy_identities(sids, slos, iids, target)
+        self.copy_characteristics(topic, target)
+        return target
+
+    def copy_characteristics(self, topic, target):
+        """\
+        Copies the occurrences and names from `topic` to the `target` topic.
+        """
+        tm, stats = self.target, self.stats
+        is_new = target not in self.existing
+        occs = tuple(topic.occurrences)
+        if occs:
+            find_equal = _equality_finder(tm, kind.OCCURRENCE, target, () if is_new else target.occurrences)
+            for occ in occs:
+                typ, scope = self.topic(occ.type), self.scope(occ)
+                literal = occ.literal
+                target_occ = find_equal(make_occurrence_signature(typ, literal, scope))
+                if target_occ is None:
+                    target_occ = target.create_occurrence(typ, literal, scope)
+                    stats.copied += 1
+                else:
+                    stats.skipped += 1
+                self.copy_reifier(occ, target_occ)
+                _copy_iids(occ.iids, target_occ)
+        names = tuple(topic.names)
+        if names:
+            find_equal = _equality_finder(tm, kind.NAME, target, () if is_new else target.names)
+            for name in names:
+                typ, scope = self.topic(name.type), self.scope(name)
+                target_name = find_equal(make_name_signature(typ, name.value, scope))
+                if target_name is None:
+                    target_name = target.create_name(typ, name.value, scope)
+                    stats.copied += 1
+                else:
+                    stats.skipped += 1
+                self.copy_reifier(name, target_name)
+                _copy_iids(name.iids, target_name)
+                self.copy_variants(name, target_name, scope)
+
+    def copy_variants(self, name, target_name, name_scope):
+        """\
+        Copies the variants from `name` to `target_name`.
+        """
+        variants = tuple(name.variants)
+        if not variants:
+            return
+        stats = self.stats
+        find_equal = _equality_finder(self.target, kind.VARIANT, target_name, target_name.variants)
+        for var in variants:
+            scope = self.scope(var)
+            literal = var.literal
+            target_var = find_equal(make_variant_signature(literal, name_scope + scope))
+            if target_var is None:
+                target_var = target_name.create_variant(literal, scope)
+                stats.copied += 1
+            else:
+                stats.skipped += 1
+            self.copy_reifier(var, target_var)
+            _copy_iids(var.iids, target_var)
+
+    def copy_associations(self):
+        """\
+        Copies all associations from the source topic map to the target topic map.
+        """
+        tm, stats, get_topic = self.target, self.stats, self.topic
+        sigs = tm._signatures
+        if sigs is not None:
+            find_equal = lambda sig: sigs.get(kind.ASSOCIATION, tm, sig)
         else:
-            # Remember the equality
-            mergemap[source] = target
-    if source == target:
-        return
-    # Mapping source.topic -> target.topic
-    mergemap = {}
+            assoc_sigs = _signatures(tm.associations)
+            find_equal = assoc_sigs.get
+        for assoc in self.source.associations:
+            #TODO: Role iids, role reifier. Arrrg. :(
+            typ, scope = get_topic(assoc.type), self.scope(assoc)
+            roles = [(get_topic(r_type), get_topic(player)) for r_type, player in assoc]
+            sig = make_association_signature(typ, scope, roles)
+            target_assoc = find_equal(sig)
+            if target_assoc is None:
+                target_assoc = tm.create_association(typ, scope, roles)
+                stats.copied += 1
+                if sigs is None:
+                    assoc_sigs[sig] = target_assoc
+            else:
+                stats.skipped += 1
+            self.copy_reifier(assoc, target_assoc)
+            _copy_iids(assoc.iids, target_assoc)
+
+    def copy_reifier(self, reifiable, target):
+        """\
+        Copies the reifier of `reifiable` to the `target` construct iff
+        `reifiable` has a reifier.
+        """
+        reifier = reifiable.reifier
+        if not reifier:
+            return
+        reifier = self.topic(reifier)
+        existing = target.reifier
+        if not existing:
+            target.reifier = reifier
+        elif existing != reifier:
+            merge_topics(reifier, existing)
+            self.stats.topics_unified += 1
+
+
+def _equal_topics(source, target):
+    """\
+    Returns an iterable of ``(source topic, target topic)`` tuples where the
+    target topic is equal to the source topic.
+    """
+    source_maps, target_maps = source._identities(), target._identities()
+    if source_maps is None or target_maps is None:
+        return _equal_topics_by_lookup(source, target)
+    return _equal_topics_by_identities(source_maps, target_maps)
+
+def _equal_topics_by_identities(source_maps, target_maps):
+    """\
+    Returns the equal topics by comparing the identity dicts of the source
+    and the target.
+    """
+    iid2tmc, sid2topic, slo2topic = source_maps
+    target_iid2tmc, target_sid2topic, target_slo2topic = target_maps
+    for slo, topic in slo2topic.iteritems():
+        existing = target_slo2topic.get(slo)
+        if existing is not None:
+            yield topic, existing
+    for sid, topic in sid2topic.iteritems():
+        existing = target_sid2topic.get(sid)
+        if existing is None:
+            existing = target_iid2tmc.get(sid)
+            if existing is not None and not is_topic(existing):
+                existing = None
+        if existing is not None:
+            yield topic, existing
+    for iid, topic in iid2tmc.iteritems():
+        if not is_topic(topic):
+            continue
+        existing = target_iid2tmc.get(iid)
+        if existing is None or not is_topic(existing):
+            existing = target_sid2topic.get(iid)
+        if existing is not None:
+            yield topic, existing
+
+def _equal_topics_by_lookup(source, target):
+    """\
+    Returns the equal topics by looking up each identity of the source
+    topics in the target.
+    """
     for topic in source.topics:
         for slo in topic.slos:
             existing = target.topic(slo=slo)
             if existing:
-                add_merge(topic, existing)
+                yield topic, existing
         for sid in topic.sids:
             existing = target.topic(sid=sid) or target.topic(iid=sid)
             if existing:
-                add_merge(topic, existing)
+                yield topic, existing
         for iid in topic.iids:
             existing = target.topic(iid=iid) or target.topic(sid=iid)
             if existing:
-                add_merge(topic, existing)
-    for topic in source.topics:
-        if not topic in mergemap:
-            _copy_topic(topic, target, mergemap)
-    for source_topic, target_topic in mergemap.iteritems():
-        _copy_identities(source_topic.sids, source_topic.slos, source_topic.iids, target_topic)
-        _copy_characteristics(source_topic, target_topic, mergemap)
-    _copy_associations(source, target, mergemap)
-
-def _copy_topic(topic, topicmap, mergemap):
-    """\
-    Copies the `topic` to the topic map `topicmap` and returns the
-    topic in the target `topicmap`.
-    """
-    sids = tuple(topic.sids)
-    slos = tuple(topic.slos)
-    iids = tuple(topic.iids)
-    target = None
-    if sids:
-        target = topicmap.create_topic(sid=sids[0])
-        sids = sids[1:]
-    if not target and slos:
-        target = topicmap.create_topic(slo=slos[0])
-        slos = slos[1:]
-    if not target and iids:
-        target = topicmap.create_topic(iid=iids[0])
-        iids = iids[1:]
-    assert(target)
-    _copy_identities(sids, slos, iids, target)
-    _copy_characteristics(topic, target, mergemap)
-    return target
+                yield topic, existing
 
 def _copy_identities(sids, slos, iids, target):
     """\
@@ -129,104 +344,24 @@ def _copy_iids(iids, target):
     for iid in iids:
         add_iid(iid)
 
-def _copy_characteristics(topic, target, mergemap):
-    """\
-    Copies the occurrences and names from `topic` to the `target` topic.
-    
-    `topic`
-        A topic instance to take the occurrences and names from.
-    `target`
-        A topic instance to add the occurrences and names to.
-    `mergemap`
-        The ``source.topic`` -> ``target.topic`` map.
-    """
-    def get_topic(topic):
-        return mergemap.get(topic) or _copy_topic(topic, tm, mergemap)
-    def get_scope(scoped):
-        return [get_topic(theme) for theme in scoped.scope]
-    tm = target.tm
-    # target.occ.sig -> target.occ
-    sigs = _signatures(target.occurrences)
-    for occ in topic.occurrences:
-        target_occ = target.create_occurrence(get_topic(occ.type), occ.literal, get_scope(occ))
-        existing = sigs.get(target_occ.__sig__())
-        if existing:
-            target.remove_occurrence(target_occ)
-            target_occ = existing
-        target_occ.reifier = _copy_reifier(occ, tm, mergemap)
-        _copy_iids(occ.iids, target_occ)
-    # target.name.sig -> target.name
-    sigs = _signatures(target.names)
-    for name in topic.names:
-        typ = get_topic(name.type)
-        target_name = target.create_name(typ, name.value, get_scope(name))
-        existing = sigs.get(target_name.__sig__())
-        if existing:
-            target.remove_name(target_name)
-            target_name = existing
-        target_name.reifier = _copy_reifier(name, tm, mergemap)
-        _copy_iids(name.iids, target_name)
-        vsigs = _signatures(target.variants)
-        for var in name.variants:
-            target_var = target.create_variant(var.literal, get_scope(var))
-            existing = vsigs.get(target_var.__sig__())
-            if existing:
-                target_name.remove_variant(target_var)
-                target_var = existing
-            target_var.reifier = _copy_reifier(var, tm, mergemap)
-            _copy_iids(var.iids, target_var)
-
-def _copy_associations(source, target, mergemap):
-    """\
-    Copies all associations from the `source´ topic map to the `target` topic map.
-    
-    `source`
-        A topic map instance (source of the associations).
-    `target`
-        A topic map instance (target for the associations).
-    `mergemap`
-        The ``source.topic`` -> ``target.topic`` map.
-    """
-    def get_topic(topic):
-        return mergemap.get(topic) or _copy_topic(topic, target, mergemap)
-    sigs = _signatures(target.associations)
-    for assoc in source.associations:
-        target_assoc = target.create_association(get_topic(assoc.type), [get_topic(theme) for theme in assoc.scope])
-        for r_type, player in assoc:
-            #TODO: Role iids, role reifier. Arrrg. :(
-            target_assoc.create_role(get_topic(r_type), get_topic(player))
-        existing = sigs.get(target_assoc.__sig__())
-        if existing:
-            target.remove_association(target_assoc)
-            target_assoc = existing
-        target_assoc.reifier = _copy_reifier(assoc, target, mergemap)
-        _copy_iids(assoc.iids, target_assoc)
-
-def _copy_reifier(reifiable, tm, mergemap):
-    """\
-    Copies the reifier of `reifiable` to the topic map `tm` iff it is not ``None``.
-    
-    If `reifiable` has a reifier, the equivalent topic in the target `tm` is
-    returned, otherwise ``None`` is returned.
-    """
-    reifier = reifiable.reifier
-    if reifier:
-        return mergemap.get(reifier, None) or _copy_topic(reifier, tm, mergemap)
-    return None
-
 
 def merge_topics(source, target):
     """\
-    Merges the `source` topic with the `target` topic.
+    Merges the `source` topic with the `target` topic and returns the `target`.
     The `source` topic will be removed. This function does not create
     duplicate characteristics.
+
+    If the backend provides a signature index (``_signatures``), the costs
+    depend on the characteristics of the `source` topic and not on the
+    number of characteristics of the `target` topic.
     """
     if source == target:
-        return
+        return target
     check_same_topicmap(source, target)
     if source.reified and target.reified:
         assert source.reified != target.reified # Should be enforced by the model
         raise ModelConstraintViolation('The topics cannot be merged. They reify different Topic Maps constructs')
+    tm = target.tm
     move_itemidentifiers(source, target)
     if source.reified:
         reified = source.reified
@@ -240,55 +375,80 @@ def merge_topics(source, target):
         target.add_slo(loc) 
     # Replace the `source` with `target` as type and theme
     _replace_topics(source, target)
-    # Collecting occurrence signatures
-    sigs = _signatures(target.occurrences)
-    for occ in tuple(source.occurrences):
-        existing = sigs.get(occ.__sig__())
-        if existing:
-            handle_existing(occ, existing)
-            occ.remove()
-            try:
-                occ.__dict__ = existing.__dict__
-            except AttributeError: 
-                pass
-        else:
-            source.remove_occurrence(occ)
-            target.add_occurrence(occ)
-    # Collecting name signatures
-    sigs = _signatures(target.names)
-    for name in tuple(source.names):
-        existing = sigs.get(name.__sig__())
-        if existing:
-            handle_existing(name, existing)
-            move_variants(name, existing)
-            name.remove()
-            try:
-                name.__dict__ = existing.__dict__
-            except AttributeError:
-                pass
-        else:
-            source.remove_name(name)
-            target.add_name(name)
-    # Collecting association signatures
-    sigs = _signatures(map(parent, target.roles_played))
+    occs = tuple(source.occurrences)
+    if occs:
+        find_equal = _equality_finder(tm, kind.OCCURRENCE, target, target.occurrences)
+        for occ in occs:
+            existing = find_equal(occ.__sig__())
+            if existing:
+                handle_existing(occ, existing)
+                occ.remove()
+                tm._forward(occ, existing)
+            else:
+                source.remove_occurrence(occ)
+                target.add_occurrence(occ)
+    names = tuple(source.names)
+    if names:
+        find_equal = _equality_finder(tm, kind.NAME, target, target.names)
+        for name in names:
+            existing = find_equal(name.__sig__())
+            if existing:
+                handle_existing(name, existing)
+                move_variants(name, existing)
+                name.remove()
+                tm._forward(name, existing)
+            else:
+                source.remove_name(name)
+                target.add_name(name)
     # Note: Reifiers and and item identifiers are ignored at roles
     #TODO: Issue a warning that reifiers and iids are ignored?
+    assocs, seen = [], set()
     for role in tuple(source.roles_played):
         role.player = target
-        existing = sigs.get(role.parent.__sig__())
+        assoc = role.parent
+        if assoc is not None and assoc not in seen:
+            seen.add(assoc)
+            assocs.append(assoc)
+    for assoc in assocs:
+        existing = _equal_association(assoc)
         if existing:
-            assoc = role.parent
             handle_existing(assoc, existing)
             assoc.remove()
-            try:
-                assoc.__dict__ = existing.__dict__
-            except AttributeError:
-                pass
+            tm._forward(assoc, existing)
     source.remove()
-    try:
-        source.__dict__ = target.__dict__
-    except AttributeError:
-        pass
+    tm._forward(source, target)
+    return target
+
+def _equality_finder(tm, kind, parent, children):
+    """\
+    Returns a function which returns the child of `parent` with the
+    provided signature or ``None``.
+
+    If the topic map does not maintain a signature index, the signatures of
+    the `children` are collected.
+    """
+    sigs = tm._signatures
+    if sigs is not None:
+        return lambda sig: sigs.get(kind, parent, sig)
+    return _signatures(children).get
+
+def _equal_association(assoc):
+    """\
+    Returns an association which is equal to `assoc` or ``None``.
+
+    Only the associations of the player with the fewest roles are inspected.
+    """
+    roles = tuple(assoc.roles)
+    if not roles:
+        return None
+    player = min((role.player for role in roles), key=lambda p: len(p.roles_played))
+    sig = assoc.__sig__()
+    for role in player.roles_played:
+        candidate = role.parent
+        if candidate is not None and candidate is not assoc \
+                and candidate._is_attached() and candidate.__sig__() == sig:
+            return candidate
+    return None
 
 
 def _signatures(iterable):
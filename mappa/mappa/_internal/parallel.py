@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Utility functions to process Topic Maps constructs in worker processes.
+
+.. Warning::
+
+    This module does not belong to the public API.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+import os
+
+__all__ = ['map_chunks']
+
+# Number of items which are processed by a worker at once
+CHUNK_SIZE = 2000
+
+# The function and the items of the running `map_chunks` call. The worker
+# processes are forked and inherit the function and the items, so neither the
+# function nor the items must be pickable.
+_task = None
+
+
+def _call(bounds):
+    func, items = _task
+    start, end = bounds
+    return func(items[start:end])
+
+
+def map_chunks(func, items, processes=None, chunk_size=None):
+    """\
+    Returns a list of the results of ``func(chunk)`` for each chunk of the
+    `items` (in the order of the chunks).
+
+    The chunks are processed by a pool of forked worker processes which
+    share the `items` and all objects reachable by `func` with the calling
+    process (copy-on-write). The results must be pickable. If the platform
+    does not support ``fork`` or if the `items` fit into one chunk, the
+    chunks are processed by the calling process.
+
+    `func`
+        A function which accepts a list of items.
+    `items`
+        A list.
+    `processes`
+        The number of worker processes, by default the number of CPUs.
+    `chunk_size`
+        The max. number of items per chunk (default: `CHUNK_SIZE`).
+    """
+    global _task
+    chunk_size = chunk_size or CHUNK_SIZE
+    bounds = [(i, min(i + chunk_size, len(items))) for i in xrange(0, len(items), chunk_size)]
+    if len(bounds) < 2 or not hasattr(os, 'fork'):
+        return [func(items[start:end]) for start, end in bounds]
+    if _task is not None:
+        raise RuntimeError('map_chunks is not reentrant')
+    import multiprocessing
+    _task = func, items
+    try:
+        pool = multiprocessing.Pool(processes)
+        try:
+            return pool.map(_call, bounds, 1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _task = None
@@ -6,29 +6,77 @@
 # BSD license.
 #
 """\
+Signatures of Topic Maps constructs.
 
+Two constructs of the same kind are equal according to the TMDM iff their
+signatures are equal. The signatures are flat tuples of topic identifiers
+and literals.
 
 :author:       Lars Heuer (heuer[at]semagia.com)
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-from mappa.predicates import cid
+
+def cached(signature):
+    """\
+    Returns a function which caches the result of the `signature` function
+    in the ``_sig`` attribute of the construct.
+
+    The owner of the attribute is responsible to set it to ``None`` if a
+    property which is part of the signature changes.
+    """
+    def cached_signature(tmc):
+        sig = tmc._sig
+        if sig is None:
+            sig = tmc._sig = signature(tmc)
+        return sig
+    cached_signature.__doc__ = signature.__doc__
+    return cached_signature
 
 def scoped_signature(scoped):
-    return tuple(sorted(map(cid, scoped.scope)))
+    return scope_signature(scoped.scope)
+
+def scope_signature(scope):
+    return tuple(sorted(set([theme.id for theme in scope])))
 
 def association_signature(assoc):
-    return (assoc.type.id, tuple(sorted([role_signature(r) for r in assoc.roles])), scoped_signature(assoc))
+    return make_association_signature(assoc.type, assoc.scope,
+                                      [(role.type, role.player) for role in assoc.roles])
+
+def make_association_signature(type, scope, roles):
+    """\
+    Returns the signature of an association with the provided `type`,
+    `scope` and `roles` (an iterable of ``(type, player)`` tuples).
+    """
+    # The number of themes separates the scope from the roles
+    scope = scope_signature(scope)
+    sig = [type.id, len(scope)]
+    sig.extend(scope)
+    for role_sig in sorted([(typ.id, player.id) for typ, player in roles]):
+        sig.extend(role_sig)
+    return tuple(sig)
 
 def role_signature(role):
     return role.type.id, role.player.id
 
 def occurrence_signature(occ):
-    return (occ.type.id, occ.value, occ.datatype, scoped_signature(occ))
+    return make_occurrence_signature(occ.type, occ.literal, occ.scope)
+
+def make_occurrence_signature(type, literal, scope):
+    return (type.id, literal.value, literal.datatype) + scope_signature(scope)
 
 def name_signature(name):
-    return (name.type.id, name.value, scoped_signature(name))
+    return make_name_signature(name.type, name.value, name.scope)
+
+def make_name_signature(type, value, scope):
+    return (type.id, value) + scope_signature(scope)
 
 def variant_signature(variant):
-    return (variant.value, variant.datatype, scoped_signature(variant))
+    return make_variant_signature(variant.literal, variant.scope)
 
+def make_variant_signature(literal, scope):
+    """\
+    Returns the signature of a variant with the provided `literal` and
+    `scope`. The `scope` must include the scope of the parent name.
+    """
+    return (literal.value, literal.datatype) + scope_signature(scope)
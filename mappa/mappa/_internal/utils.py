@@ -12,12 +12,45 @@ Mappa's internal utilities.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-from itertools import chain
+from itertools import chain, count
 from uuid import uuid4
 from tm.xmlutils import is_ncname
 
-def random_id():
-    return uuid4().int
+class IdAllocator(object):
+    """\
+    Allocates monotonically increasing integer identifiers.
+
+    Calling an instance returns the next identifier. The identifiers are
+    unique per allocator only, identifiers which must be unique across
+    topic maps (i.e. item identifiers) should include the random `prefix`.
+    """
+    __slots__ = ['_next', 'prefix']
+
+    def __init__(self, start=1):
+        self._next = count(start).next
+        self.prefix = uuid4().hex
+
+    def __call__(self):
+        return self._next()
+
+    def reserve(self, ident):
+        """\
+        Ensures that the identifiers returned afterwards are greater than
+        `ident`.
+        """
+        start = self._next()
+        if start <= ident:
+            start = ident + 1
+        self._next = count(start).next
+
+#: Fallback for backends which do not provide ``allocate_id``
+_allocate_id = IdAllocator()
+
+def id_allocator(tm):
+    """\
+    Returns the identifier allocator of the topic map `tm`.
+    """
+    return getattr(tm, 'allocate_id', None) or _allocate_id
 
 def topic_id(base, topic):
     """\
@@ -36,7 +69,7 @@ def topic_id(base, topic):
         ident = topic.id
     if ident and is_ncname(unicode(ident)):
         return ident
-    return 't-%s' % topic.id
+    return 't-%s-%s' % (id_allocator(topic.tm).prefix, topic.id)
 
 def is_slo(string):
     """\
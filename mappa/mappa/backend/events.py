@@ -30,6 +30,12 @@ class EventDispatcher(object):
         """
         self._handlers[event_type].add(handler)
 
+    def unsubscribe(self, event_type, handler):
+        """\
+        Removes the `handler` from the handlers of the `event_type`.
+        """
+        self._handlers[event_type].discard(handler)
+
     def dispatch(self, event):
         """\
         Dispatches the specified `event` to the subscribed handlers.
@@ -53,12 +59,39 @@ class EventMultiplier(object):
 
     def subscribe(self, dispatcher):
         # Subscribe to every Topic Maps construct which has children
-        dispatcher.subscribe(AddTopic, self._add_topic)
-        dispatcher.subscribe(RemoveTopic, self._remove_topic)
-        dispatcher.subscribe(AddAssociation, self._add_assoc)
-        dispatcher.subscribe(RemoveAssociation, self._remove_assoc)
-        dispatcher.subscribe(AddName, self._add_name)
-        dispatcher.subscribe(RemoveName, self._remove_name)
+        self.subscribe_additions(dispatcher)
+        for event_type, handler in self._removal_handlers():
+            dispatcher.subscribe(event_type, handler)
+
+    def unsubscribe(self, dispatcher):
+        self.unsubscribe_additions(dispatcher)
+        for event_type, handler in self._removal_handlers():
+            dispatcher.unsubscribe(event_type, handler)
+
+    def subscribe_additions(self, dispatcher):
+        """\
+        Subscribes only the handlers which generate `Add*` events.
+        """
+        for event_type, handler in self._addition_handlers():
+            dispatcher.subscribe(event_type, handler)
+
+    def unsubscribe_additions(self, dispatcher):
+        """\
+        Unsubscribes the handlers which generate `Add*` events, the handlers
+        which generate `Remove*` events stay subscribed.
+        """
+        for event_type, handler in self._addition_handlers():
+            dispatcher.unsubscribe(event_type, handler)
+
+    def _addition_handlers(self):
+        return ((AddTopic, self._add_topic),
+                (AddAssociation, self._add_assoc),
+                (AddName, self._add_name))
+
+    def _removal_handlers(self):
+        return ((RemoveTopic, self._remove_topic),
+                (RemoveAssociation, self._remove_assoc),
+                (RemoveName, self._remove_name))
 
     def _add_topic(self, evt):
         """\
@@ -125,6 +158,30 @@ class EventMultiplier(object):
             dispatcher.dispatch(RemoveVariant(name, var))
 
 
+def construct_events(topicmap):
+    """\
+    Returns an iterable of ``Add*`` events which describe the topics, 
+    associations and their children of the `topicmap` as if the topic map 
+    was created from scratch.
+
+    Useful to (re-)build indexes in one pass.
+    """
+    for iid in topicmap.iids:
+        yield AddItemIdentifier(topicmap, iid)
+    for topic in topicmap.topics:
+        yield AddTopic(topicmap, topic)
+        for occ in topic.occurrences:
+            yield AddOccurrence(topic, occ)
+        for name in topic.names:
+            yield AddName(topic, name)
+            for var in name.variants:
+                yield AddVariant(name, var)
+    for assoc in topicmap.associations:
+        yield AddAssociation(topicmap, assoc)
+        for role in assoc.roles:
+            yield AddRole(assoc, role)
+
+
 class Event(tuple):
     """\
     Base class for all events. This class is not meant to be used directly.
@@ -175,3 +232,4 @@ class SetType(ChangeEvent): pass
 class SetReifier(ChangeEvent): pass
 class SetScope(ChangeEvent): pass
 class SetValue(ChangeEvent): pass
+class SetPlayer(ChangeEvent): pass
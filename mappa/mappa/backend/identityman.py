@@ -28,11 +28,14 @@ class IdentityManager(object):
         The `dispatcher` is a `mappa.backend.event.EventDispatcher` instance, 
         (a topic map in most cases) used to subscribe the handlers of this class.
         """
+        self._clear()
+        self.subscribe(dispatcher)
+
+    def _clear(self):
         self._iid2tmc = {}
         self._sid2topic = {}
         self._slo2topic = {}
         self._id2tmc = {}
-        self.subscribe(dispatcher)
 
     def subscribe(self, dispatcher):
         """\
@@ -41,19 +44,9 @@ class IdentityManager(object):
         The `dispatcher` is a `mappa.backend.event.EventDispatcher` instance, 
         (a topic map in most cases) used to subscribe the handlers of this class.
         """
-        dispatcher.subscribe(AddTopic, self.add_topic)
-        dispatcher.subscribe(AddAssociation, self.add_tmc)
-        dispatcher.subscribe(AddRole, self.add_tmc)
-        dispatcher.subscribe(AddOccurrence, self.add_tmc)
-        dispatcher.subscribe(AddName, self.add_tmc)
-        dispatcher.subscribe(AddVariant, self.add_tmc)
-        dispatcher.subscribe(RemoveTopic, self.remove_topic)
-        dispatcher.subscribe(RemoveAssociation, self.remove_tmc)
-        dispatcher.subscribe(RemoveRole, self.remove_tmc)
-        dispatcher.subscribe(RemoveOccurrence, self.remove_tmc)
-        dispatcher.subscribe(RemoveName, self.remove_tmc)
-        dispatcher.subscribe(RemoveVariant, self.remove_tmc)
-        
+        self.subscribe_constructs(dispatcher)
+        for event_type, handler in self._removal_handlers():
+            dispatcher.subscribe(event_type, handler)
         dispatcher.subscribe(AddItemIdentifier, self.add_iid)
         dispatcher.subscribe(AddSubjectIdentifier, self.add_sid)
         dispatcher.subscribe(AddSubjectLocator, self.add_slo)
@@ -63,6 +56,58 @@ class IdentityManager(object):
         #TODO: Move this into the reifiable Topic Maps construct _set_reifier?
         dispatcher.subscribe(SetReifier, self._set_reifier)
 
+    def subscribe_constructs(self, dispatcher):
+        """\
+        Subscribes only the handlers which keep track of added Topic Maps
+        constructs.
+        """
+        for event_type, handler in self._construct_handlers():
+            dispatcher.subscribe(event_type, handler)
+
+    def unsubscribe_constructs(self, dispatcher):
+        """\
+        Unsubscribes the handlers which keep track of added Topic Maps
+        constructs.
+        
+        The handlers for removed constructs, item identifiers, subject
+        identifiers and subject locators stay subscribed, so removed
+        constructs release their identities. `rebuild` must be called to
+        bring the instance into a consistent state if the handlers are
+        subscribed again.
+        """
+        for event_type, handler in self._construct_handlers():
+            dispatcher.unsubscribe(event_type, handler)
+
+    def _construct_handlers(self):
+        return ((AddTopic, self.add_topic),
+                (AddAssociation, self.add_tmc),
+                (AddRole, self.add_tmc),
+                (AddOccurrence, self.add_tmc),
+                (AddName, self.add_tmc),
+                (AddVariant, self.add_tmc))
+
+    def _removal_handlers(self):
+        return ((RemoveTopic, self.remove_topic),
+                (RemoveAssociation, self.remove_tmc),
+                (RemoveRole, self.remove_tmc),
+                (RemoveOccurrence, self.remove_tmc),
+                (RemoveName, self.remove_tmc),
+                (RemoveVariant, self.remove_tmc))
+
+    def rebuild(self, topicmap):
+        """\
+        Discards the identities and registers all identities of the 
+        `topicmap` in one pass.
+        
+        Raises an `IdentityViolation` if two Topic Maps constructs share an
+        identity.
+        """
+        self._clear()
+        dispatcher = EventDispatcher()
+        self.subscribe(dispatcher)
+        for evt in construct_events(topicmap):
+            dispatcher.dispatch(evt)
+
     def _set_reifier(self, evt):
         check_reification_allowed(evt.source, evt.new)
 
@@ -83,16 +128,16 @@ class IdentityManager(object):
     def remove_tmc(self, evt):
         tmc = evt.old
         for iid in tmc.iids:
-            self._remove_iid(iid)
-        del self._id2tmc[tmc.id]
+            _release(self._iid2tmc, iid, tmc)
+        _release(self._id2tmc, tmc.id, tmc)
 
     def remove_topic(self, evt):
         self.remove_tmc(evt)
         topic = evt.old
         for sid in topic.sids:
-            self._remove_sid(sid)
+            _release(self._sid2topic, sid, topic)
         for slo in topic.slos:
-            self._remove_slo(slo)
+            _release(self._slo2topic, slo, topic)
 
     def add_iid(self, evt):
         self._add_iid(evt.source, evt.new, is_topic(evt.source))
@@ -129,22 +174,22 @@ class IdentityManager(object):
         self._slo2topic[slo] = topic
 
     def remove_iid(self, evt):
-        self._remove_iid(evt.old)
-
-    def _remove_iid(self, iid):
-        del self._iid2tmc[iid]
+        _release(self._iid2tmc, evt.old, evt.source)
 
     def remove_sid(self, evt):
-        self._remove_sid(evt.old)
-
-    def _remove_sid(self, sid):
-        del self._sid2topic[sid]
+        _release(self._sid2topic, evt.old, evt.source)
 
     def remove_slo(self, evt):
-        self._remove_slo(evt.old)
+        _release(self._slo2topic, evt.old, evt.source)
+
+    def identities(self):
+        """\
+        Returns a tuple of dicts ``(item identifier -> construct, 
+        subject identifier -> topic, subject locator -> topic)``.
 
-    def _remove_slo(self, slo):
-        del self._slo2topic[slo]
+        The keys are normalized IRIs, the dicts must not be modified.
+        """
+        return self._iid2tmc, self._sid2topic, self._slo2topic
 
     def construct_by_id(self, id):
         return self._id2tmc.get(id)
@@ -157,3 +202,14 @@ class IdentityManager(object):
 
     def topic_by_slo(self, slo):
         return self._slo2topic.get(irilib.normalize(slo))
+
+
+def _release(dct, key, tmc):
+    """\
+    Removes the `key` from `dct` iff it is mapped to `tmc`.
+
+    While the handlers for added constructs are unsubscribed, the identities
+    of constructs which were added in the meantime are unknown.
+    """
+    if dct.get(key) is tmc:
+        del dct[key]
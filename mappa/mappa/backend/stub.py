@@ -20,7 +20,7 @@ These stubs are useful for an `OO`_ view on the `TMDM`_.
 from operator import attrgetter
 from mappa import irilib, ModelConstraintViolation, Literal, ANY, UCS, TMDM, XSD
 from mappa.utils import is_construct, is_topic
-from mappa._internal import kind, it
+from mappa._internal import kind, it, siggen
 from mappa._internal.constraints import check_not_none, check_same_topicmap
 from mappa.backend.events import *
 
@@ -29,7 +29,31 @@ __all__ = ('TopicMapStub',
            'TopicStub', 'AssociationStub', 'RoleStub',
            'OccurrenceStub', 'NameStub', 'VariantStub')
 
+# Min. number of entries of the forwarding table before it is compacted
+_FORWARDS_MIN = 1024
+
+class SignedConstructStub(object):
+    """\
+    Caches the signature of the construct.
+
+    Derived classes must provide the following mutable attributes:
+    - `_sig` (the cached signature or ``None``)
+    """
+    __slots__ = ()
+
+    def __init__(self):
+        self._sig = None
+
+    def _changed(self):
+        """\
+        Called if a property which is part of the signature changes.
+        """
+        self._sig = None
+
+
 class ReifiableConstructStub(object):
+    __slots__ = ()
+
     def __init__(self, reifier):
         self._reifier = reifier
 
@@ -47,6 +71,8 @@ class ReifiableConstructStub(object):
 
 
 class TypedConstructStub(object):
+    __slots__ = ()
+
     def __init__(self, type):
         self._type = type
 
@@ -57,11 +83,14 @@ class TypedConstructStub(object):
             return
         self._fire_event(SetType(self, self._type, type))
         self._type = type
+        self._changed()
 
     type = property(attrgetter('_type'), _set_type)
 
 
 class DatatypeAwareConstructStub(object):
+    __slots__ = ()
+
 
     def __init__(self, literal):
         self._literal = literal
@@ -73,6 +102,7 @@ class DatatypeAwareConstructStub(object):
             return
         self._fire_event(SetValue(self, self._literal, lit))
         self._literal = lit
+        self._changed()
 
     def __pyvalue__(self):
         return self._literal.__pyvalue__()
@@ -96,8 +126,16 @@ class DatatypeAwareConstructStub(object):
 class TopicMapsConstructStub(object):
     """\
     Derived classes must provide the following mutable attributes:
-    - `iids` (a set)
+    - `iids` (a collection)
+
+    and the following methods which are used to modify the collections
+    (`iids`, `topics`, `sids`, `roles`, ...):
+    - `_add_to(collection, item)` returns the collection with the `item`
+    - `_remove_from(collection, item)` returns the collection without the
+      `item`
     """
+    __slots__ = ()
+
     def __init__(self, tm):
         self._tm = tm
         self._parent = None
@@ -115,7 +153,7 @@ class TopicMapsConstructStub(object):
         if iid in self.iids:
             return
         self._fire_event(AddItemIdentifier(self, iid))
-        self.iids.add(iid)
+        self.iids = self._add_to(self.iids, iid)
 
     def remove_iid(self, iid):
         check_not_none(iid)
@@ -124,13 +162,14 @@ class TopicMapsConstructStub(object):
         if iid not in self.iids:
             return
         self._fire_event(RemoveItemIdentifier(self, iid))
-        self.iids.remove(iid)
+        self.iids = self._remove_from(self.iids, iid)
 
     def __hash__(self):
         return hash(self.id)
 
     def __eq__(self, other):
-        return self.id == getattr(other, 'id', None)
+        # Identifiers are unique within a topic map only
+        return self.id == getattr(other, 'id', None) and self.tm is getattr(other, 'tm', None)
 
     def _fire_event(self, evt):
         if not self._is_attached():
@@ -144,8 +183,10 @@ class TopicMapsConstructStub(object):
 class ScopedConstructStub(TopicMapsConstructStub):
     """\
     Derived classes must provide the following mutable attributes:
-    - `_scope` (a set)
+    - `_scope` (a collection)
     """
+    __slots__ = ()
+
     def __init__(self, tm, scope=()):
         TopicMapsConstructStub.__init__(self, tm)
         self._scope = self._create_scope(scope)
@@ -159,6 +200,7 @@ class ScopedConstructStub(TopicMapsConstructStub):
         new_scope = self._create_scope(scope)
         self._fire_event(SetScope(self, self._scope, new_scope))
         self._scope = new_scope
+        self._changed()
 
     scope = property(attrgetter('_scope'), _set_scope)
 
@@ -167,16 +209,22 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
     """\
     Derived classes must provide the following mutable attributes:
     - `builder` (a builder for Topic Maps constructs)
-    - `topics` (a set)
-    - `associations` (a set)
+    - `topics` (a collection)
+    - `associations` (a collection)
+
+    Derived classes may provide a `_signatures` index which is used to find
+    equal constructs while merging topics.
     """
     _kind = kind.TOPIC_MAP
+    _signatures = None
     def __init__(self, iri):
         TopicMapsConstructStub.__init__(self, None)
         ReifiableConstructStub.__init__(self, None)
         EventDispatcher.__init__(self)
         self._event_multiplier = EventMultiplier(self)
         self._iri = iri
+        self._forwards = {}
+        self._forwards_limit = _FORWARDS_MIN
 
         self.topics = self._create_topics()
         self.associations = self._create_associations()
@@ -189,6 +237,56 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
     def _is_attached(self):
         return True
 
+    def _forward(self, removed, survivor):
+        """\
+        Records that the `removed` construct was merged into `survivor`.
+        """
+        forwards = self._forwards
+        forwards[removed.id] = survivor
+        if len(forwards) > self._forwards_limit:
+            self._compact_forwards()
+
+    def _compact_forwards(self):
+        """\
+        Resolves the chains of the forwarding table and drops the entries
+        whose survivor was removed.
+        """
+        forwarded = self._forwarded
+        for ident in self._forwards.keys():
+            forwarded(ident)
+        self._forwards_limit = max(_FORWARDS_MIN, 2 * len(self._forwards))
+
+    def _identities(self):
+        """\
+        Returns a tuple of dicts ``(item identifier -> construct, 
+        subject identifier -> topic, subject locator -> topic)`` or ``None``
+        if the backend does not provide them.
+
+        The dicts must not be modified.
+        """
+        return None
+
+    def _forwarded(self, ident):
+        """\
+        Returns the construct which replaced the removed construct with the
+        identifier `ident` or ``None``.
+        """
+        forwards = self._forwards
+        tmc = forwards.get(ident)
+        if tmc is None or tmc._is_attached():
+            return tmc
+        path = [ident]
+        while tmc is not None and not tmc._is_attached():
+            path.append(tmc.id)
+            tmc = forwards.get(tmc.id)
+        # Point the chain to the survivor or drop it if the survivor was removed
+        for key in path:
+            if tmc is None:
+                forwards.pop(key, None)
+            else:
+                forwards[key] = tmc
+        return tmc
+
     def _create_topic(self):
         topic = self.builder.create_topic()
         self.add_topic(topic)
@@ -222,10 +320,12 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
         topic.add_slo(slo)
         return topic
 
-    def create_association(self, type, scope=()):
+    def create_association(self, type, scope=(), roles=()):
         assert type is not None
         assoc = self.builder.create_association(type, scope)
         self.add_association(assoc)
+        for role_type, player in roles:
+            assoc.create_role(role_type, player)
         return assoc
 
     def add_topic(self, child):
@@ -234,13 +334,13 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
             return
         self._fire_event(AddTopic(self, child))
         child._parent = self
-        self.topics.add(child)
+        self.topics = self._add_to(self.topics, child)
 
     def remove_topic(self, child):
         if child._parent != self:
             return
         self._fire_event(RemoveTopic(self, child))
-        self.topics.remove(child)
+        self.topics = self._remove_from(self.topics, child)
         child._parent = None
 
     def add_association(self, child):
@@ -249,13 +349,13 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
             return
         self._fire_event(AddAssociation(self, child))
         child._parent = self
-        self.associations.add(child)
+        self.associations = self._add_to(self.associations, child)
 
     def remove_association(self, child):
         if child._parent != self:
             return
         self._fire_event(RemoveAssociation(self, child))
-        self.associations.remove(child)
+        self.associations = self._remove_from(self.associations, child)
         child._parent = None
 
     def _fire_event(self, evt):
@@ -269,12 +369,13 @@ class TopicMapStub(TopicMapsConstructStub, ReifiableConstructStub,
 class TopicStub(TopicMapsConstructStub):
     """\
     Derived classes must provide the following mutable attributes:
-    - `sids` (a set)
-    - `slos` (a set)
-    - `roles_played` (a set)
-    - `occurrences` (a set)
-    - `names` (a set)
+    - `sids` (a collection)
+    - `slos` (a collection)
+    - `roles_played` (a collection)
+    - `occurrences` (a collection)
+    - `names` (a collection)
     """
+    __slots__ = ()
     _kind = kind.TOPIC
     def __init__(self, tm):
         TopicMapsConstructStub.__init__(self, tm)
@@ -295,7 +396,7 @@ class TopicStub(TopicMapsConstructStub):
         if sid in self.sids:
             return
         self._fire_event(AddSubjectIdentifier(self, sid))
-        self.sids.add(sid)
+        self.sids = self._add_to(self.sids, sid)
 
     def remove_sid(self, sid):
         check_not_none(sid)
@@ -304,7 +405,7 @@ class TopicStub(TopicMapsConstructStub):
         if sid not in self.sids:
             return
         self._fire_event(RemoveSubjectIdentifier(self, sid))
-        self.sids.remove(sid)
+        self.sids = self._remove_from(self.sids, sid)
 
     def add_slo(self, slo):
         check_not_none(slo)
@@ -313,7 +414,7 @@ class TopicStub(TopicMapsConstructStub):
         if slo in self.slos:
             return
         self._fire_event(AddSubjectLocator(self, slo))
-        self.slos.add(slo)
+        self.slos = self._add_to(self.slos, slo)
 
     def remove_slo(self, slo):
         check_not_none(slo)
@@ -322,7 +423,7 @@ class TopicStub(TopicMapsConstructStub):
         if slo not in self.slos:
             return
         self._fire_event(RemoveSubjectLocator(self, slo))
-        self.slos.remove(slo)
+        self.slos = self._remove_from(self.slos, slo)
 
     def create_occurrence(self, type, value, scope=()):
         assert type is not None
@@ -337,13 +438,13 @@ class TopicStub(TopicMapsConstructStub):
             return
         self._fire_event(AddOccurrence(self, child))
         child._parent = self
-        self.occurrences.add(child)
+        self.occurrences = self._add_to(self.occurrences, child)
 
     def remove_occurrence(self, child):
         if child._parent != self:
             return
         self._fire_event(RemoveOccurrence(self, child))
-        self.occurrences.remove(child)
+        self.occurrences = self._remove_from(self.occurrences, child)
         child._parent = None
 
     def create_name(self, type, value, scope=()):
@@ -360,14 +461,14 @@ class TopicStub(TopicMapsConstructStub):
             return
         self._fire_event(AddName(self, child))
         child._parent = self
-        self.names.add(child)
+        self.names = self._add_to(self.names, child)
 
     def remove_name(self, child):
         assert child is not None
         if child._parent != self:
             return
         self._fire_event(RemoveName(self, child))
-        self.names.remove(child)
+        self.names = self._remove_from(self.names, child)
         child._parent = None
 
     def remove(self):
@@ -384,16 +485,19 @@ class TopicStub(TopicMapsConstructStub):
     reified = property(attrgetter('_reified'))
 
 
-class AssociationStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub):
+class AssociationStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub, SignedConstructStub):
     """\
     Derived classes must provide the following mutable attributes:
-    - `roles` (a set)
+    - `roles` (a collection)
     """
+    __slots__ = ()
     _kind = kind.ASSOCIATION
+    __sig__ = siggen.cached(siggen.association_signature)
     def __init__(self, tm, type, scope=()):
         ScopedConstructStub.__init__(self, tm, scope)
         TypedConstructStub.__init__(self, type)
         ReifiableConstructStub.__init__(self, None)
+        SignedConstructStub.__init__(self)
         self.roles = self._create_roles()
 
     def create_role(self, type, player):
@@ -410,16 +514,20 @@ class AssociationStub(ScopedConstructStub, TypedConstructStub, ReifiableConstruc
             return
         self._fire_event(AddRole(self, child))
         child._parent = self
-        child.player.roles_played.add(child)
-        self.roles.add(child)
+        player = child.player
+        player.roles_played = player._add_to(player.roles_played, child)
+        self.roles = self._add_to(self.roles, child)
+        self._sig = None
 
     def remove_role(self, child):
         assert child is not None
         if child._parent != self:
             return
         self._fire_event(RemoveRole(self, child))
-        self.roles.remove(child)
-        child.player.roles_played.remove(child)
+        self.roles = self._remove_from(self.roles, child)
+        self._sig = None
+        player = child.player
+        player.roles_played = player._remove_from(player.roles_played, child)
         child._parent = None
 
     def remove(self):
@@ -432,7 +540,7 @@ class AssociationStub(ScopedConstructStub, TypedConstructStub, ReifiableConstruc
 
 
 class RoleStub(TopicMapsConstructStub, TypedConstructStub, ReifiableConstructStub):
-
+    __slots__ = ()
     _kind = kind.ROLE
 
     def __init__(self, tm, type, player):
@@ -444,10 +552,21 @@ class RoleStub(TopicMapsConstructStub, TypedConstructStub, ReifiableConstructStu
     def _set_player(self, player):
         check_not_none(player)
         check_same_topicmap(self, player)
+        if self._player == player:
+            return
+        self._fire_event(SetPlayer(self, self._player, player))
         if self._player:
-            self._player.roles_played.remove(self)
+            old = self._player
+            old.roles_played = old._remove_from(old.roles_played, self)
         self._player = player
-        player.roles_played.add(self)
+        player.roles_played = player._add_to(player.roles_played, self)
+        self._changed()
+
+    def _changed(self):
+        # The signature of a role is cheap, only the signature of the
+        # association is cached
+        if self._parent is not None:
+            self._parent._sig = None
 
     def remove(self):
         self.reifier = None
@@ -456,36 +575,47 @@ class RoleStub(TopicMapsConstructStub, TypedConstructStub, ReifiableConstructStu
     player = property(attrgetter('_player'), _set_player)
 
 
-class OccurrenceStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub, DatatypeAwareConstructStub):
-
+class OccurrenceStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub, DatatypeAwareConstructStub, SignedConstructStub):
+    __slots__ = ()
     _kind = kind.OCCURRENCE
+    __sig__ = siggen.cached(siggen.occurrence_signature)
 
     def __init__(self, tm, type, value, scope=UCS):
         ScopedConstructStub.__init__(self, tm, scope)
         TypedConstructStub.__init__(self, type)
         ReifiableConstructStub.__init__(self, None)
         DatatypeAwareConstructStub.__init__(self, value)
+        SignedConstructStub.__init__(self)
 
     def remove(self):
         self.reifier = None
         self._parent.remove_occurrence(self)
 
 
-class NameStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub):
+class NameStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub, SignedConstructStub):
     """\
 
     Derived classes must provide the following mutable attributes:
-    - `variants` (a set)
+    - `variants` (a collection)
     """
+    __slots__ = ()
     _kind = kind.NAME
+    __sig__ = siggen.cached(siggen.name_signature)
     
     def __init__(self, tm, type, value, scope=()):
         ScopedConstructStub.__init__(self, tm, scope)
         TypedConstructStub.__init__(self, type)
         ReifiableConstructStub.__init__(self, None)
+        SignedConstructStub.__init__(self)
         self._literal = value
         self.variants = self._create_variants()
 
+    def _changed(self):
+        self._sig = None
+        # The scope of the variants includes the scope of the name
+        for var in self.variants:
+            var._sig = None
+
     def _set_value(self, value):
         check_not_none(value)
         lit = Literal(value, XSD.string)
@@ -493,6 +623,7 @@ class NameStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub):
             return
         self._fire_event(SetValue(self, self._literal, lit))
         self._literal = lit
+        self._changed()
 
     def create_variant(self, value, scope):
         def in_name_scope(theme):
@@ -511,15 +642,17 @@ class NameStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub):
             return
         self._fire_event(AddVariant(self, child))
         child._parent = self
-        self.variants.add(child)
+        child._sig = None
+        self.variants = self._add_to(self.variants, child)
 
     def remove_variant(self, child):
         assert child is not None
         if child._parent != self:
             return
         self._fire_event(RemoveVariant(self, child))
-        self.variants.remove(child)
+        self.variants = self._remove_from(self.variants, child)
         child._parent = None
+        child._sig = None
 
     def remove(self):
         self.reifier = None
@@ -531,14 +664,16 @@ class NameStub(ScopedConstructStub, TypedConstructStub, ReifiableConstructStub):
     value = property(lambda self: self._literal.value, _set_value)
 
 
-class VariantStub(ScopedConstructStub, ReifiableConstructStub, DatatypeAwareConstructStub):
-
+class VariantStub(ScopedConstructStub, ReifiableConstructStub, DatatypeAwareConstructStub, SignedConstructStub):
+    __slots__ = ()
     _kind = kind.VARIANT
+    __sig__ = siggen.cached(siggen.variant_signature)
 
     def __init__(self, tm, value, scope):
         ScopedConstructStub.__init__(self, tm, scope)
         ReifiableConstructStub.__init__(self, None)
         DatatypeAwareConstructStub.__init__(self, value)
+        SignedConstructStub.__init__(self)
 
     def _get_scope(self):
         scope = set(self._scope)
@@ -558,6 +693,7 @@ class VariantStub(ScopedConstructStub, ReifiableConstructStub, DatatypeAwareCons
         new_scope = self._create_scope(scope)
         self._fire_event(SetScope(self, self._scope, new_scope))
         self._scope = new_scope
+        self._changed()
 
     def remove(self):
         self.reifier = None
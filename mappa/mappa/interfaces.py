@@ -115,7 +115,7 @@ class IConnection(Interface):
         """\
         Commits all changes made through this connection.
         """
-    def load(source, into, base=None, format=None, **kw):
+    def load(source, into, base=None, format=None, bulk=False, deferred=False, **kw):
         """\
         Loads a topic map.
         
@@ -136,6 +136,19 @@ class IConnection(Interface):
         `format`
             The input format. By default ``XTM`` is used.
             The format is a case-insensitive string.
+        `bulk`
+            Indicates if the indexes of the topic map should be built once
+            after the source was read instead of updating them for each 
+            Topic Maps construct (default: ``False``). Recommended for 
+            large sources. The option is ignored if the backend does not 
+            support it.
+        `deferred`
+            Indicates if merging topics should be deferred until the 
+            ``source`` was read (default: ``False``). The identities of the 
+            topics are collected first and each topic is created once with
+            all its identities, so no topics are merged while the 
+            characteristics are added. The content of the ``source`` is 
+            kept in memory until the end of the topic map.
         `**kw`
             Additional configuration parameters. Unsupported parameters are
             ignored by the parser.
@@ -150,7 +163,7 @@ class IConnection(Interface):
             >>> for topic in tm.topics:
             ...     do_something_with(topic)
         """
-    def loads(string, into, base=None, format=None, **kw):
+    def loads(string, into, base=None, format=None, bulk=False, deferred=False, **kw):
         """\
         Loads a topic map from the provided ``string``.
         
@@ -375,6 +388,13 @@ class ITopicMap(IConstruct, IReifiable):
         """\
         Merges this topic map with the ``other``. The ``other`` topic map
         won't be modified.
+
+        Returns an object which provides the number of merged and copied 
+        topics (``topics_merged``, ``topics_copied``), the number of topics
+        of this topic map which became equal and were merged 
+        (``topics_unified``), and the number of associations, occurrences,
+        names and variants which were copied (``copied``) or which existed
+        already (``skipped``).
         
         .. Note:: Both topic maps must belong to the same connection. It is
                   not possible to merge a topic map from connection A with a
@@ -645,6 +665,8 @@ class ITopic(IConstruct):
         See `6 Merging <http://www.isotopicmaps.org/sam/sam-model/#sect-merging>`_
         for details.
         
+        Returns this topic.
+
         Raises a `ModelConstraintViolation` if both topics reify a Topic
         Maps construct.
         """
@@ -17,9 +17,10 @@ from tm import mio, UCS, TMDM
 import tm.mio.handler as mio_handler
 from mappa import utils, ModelConstraintViolation, IdentityViolation
 from ._internal import mergeutils, kind
+from ._internal.siggen import role_signature
 from .utils import _kind
 
-__all__ = ['MappaMapHandler']
+__all__ = ['MappaMapHandler', 'DeferredMappaMapHandler']
 
 
 class MappaMapHandler(mio_handler.HamsterMapHandler):
@@ -86,14 +87,12 @@ class MappaMapHandler(mio_handler.HamsterMapHandler):
         target.merge(source)
 
     def _create_association(self, type, scope, reifier, iids, roles):
-        assoc = self._tm.create_association(type, scope or UCS)
+        assoc = self._tm.create_association(type, scope or UCS, [(r.type, r.player) for r in roles])
         delayed = self._delayed
         for r in roles:
-            role = assoc.create_role(r.type, r.player)
             if r.reifier or r.iids:
-                delayed[role.__sig__()] = r.reifier, r.iids
-        assoc = _apply_reifier(assoc, reifier)
-        _apply_iids(assoc, iids)
+                delayed[role_signature(r)] = r.reifier, r.iids
+        assoc = _apply_iids(_apply_reifier(assoc, reifier), iids)
         if delayed:
             for role in tuple(assoc.roles):
                 reifier, iids = delayed.get(role.__sig__(), (None, None))
@@ -104,14 +103,12 @@ class MappaMapHandler(mio_handler.HamsterMapHandler):
 
     def _create_occurrence(self, parent, type, value, datatype, scope, reifier, iids):
         occ = parent.create_occurrence(type=type, value=(value, datatype), scope=scope or UCS)
-        occ = _apply_reifier(occ, reifier)
-        _apply_iids(occ, iids)
+        _apply_iids(_apply_reifier(occ, reifier), iids)
 
     def _create_name(self, parent, type, value, scope, reifier, iids, variants):
         name = parent.create_name(type=type or self._tm.create_topic_by_sid(TMDM.topic_name),
                                   value=value, scope=scope or UCS)
-        name = _apply_reifier(name, reifier)
-        _apply_iids(name, iids)
+        name = _apply_iids(_apply_reifier(name, reifier), iids)
         delayed = self._delayed
         for v in variants:
             var = name.create_variant(value=(v.value, v.datatype), scope=v.scope)
@@ -126,6 +123,221 @@ class MappaMapHandler(mio_handler.HamsterMapHandler):
             delayed.clear()
 
 
+def _recorder(name):
+    """\
+    Returns a ``MapHandler`` method which records the event `name`.
+    """
+    def record(self, *args):
+        self._events.append((name, args))
+    record.__name__ = name
+    return record
+
+
+def _start_recorder(name):
+    """\
+    Returns a ``MapHandler`` method which records the start event `name`.
+    """
+    def record(self, *args):
+        self._events.append((name, args))
+        self._open.append(None)
+    record.__name__ = name
+    return record
+
+
+def _end_recorder(name):
+    """\
+    Returns a ``MapHandler`` method which records the end event `name`.
+    """
+    def record(self):
+        self._events.append((name, ()))
+        self._open.pop()
+    record.__name__ = name
+    return record
+
+
+class DeferredMappaMapHandler(mio_handler.MapHandler):
+    """\
+    ``MapHandler`` implementation for Mappa which does not merge topics while
+    a topic map is read.
+
+    The events are recorded and the topic identities are collected into
+    equivalence classes. At the end of the topic map, one topic per
+    equivalence class is created (or looked up) with all its identities and
+    the recorded events are replayed against these topics by a
+    `MappaMapHandler`. Topics are only merged if the topic map already
+    contained several topics which are equal to a topic of the source.
+
+    The events are kept in memory until the end of the topic map.
+    """
+    __slots__ = ['_tm', '_events', '_open', '_parents', '_identities', '_seen']
+
+    def __init__(self, tm):
+        """
+        Initializes the handler with the given topic map.
+        
+        `tm`
+            The topic map to operate upon.
+        """
+        super(DeferredMappaMapHandler, self).__init__()
+        self._tm = tm
+        self._events = None
+        self._open = None
+        self._parents = None
+        self._identities = None
+        self._seen = None
+
+    def _register(self, identity):
+        """\
+        Registers the `identity` and returns its key within the union-find
+        structure.
+        """
+        key = _identity_key(identity)
+        if identity not in self._seen:
+            self._seen.add(identity)
+            self._identities.append(identity)
+            self._parents.setdefault(key, key)
+        return key
+
+    def _find(self, key):
+        parents = self._parents
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    def _union(self, key, key2):
+        root, root2 = self._find(key), self._find(key2)
+        if root != root2:
+            self._parents[root2] = root
+
+    def _add_identity(self, name, kind, iri):
+        self._events.append((name, (iri,)))
+        topic = self._open[-1] if self._open else None
+        if topic is not None:
+            self._union(topic, self._register((kind, iri)))
+
+    def _materialize(self):
+        """\
+        Creates one topic per equivalence class which has all identities of
+        the class.
+        """
+        classes = {}
+        order = []
+        for identity in self._identities:
+            root = self._find(_identity_key(identity))
+            if root not in classes:
+                classes[root] = []
+                order.append(root)
+            classes[root].append(identity)
+        tm = self._tm
+        for root in order:
+            identities = classes[root]
+            topics = []
+            for kind, iri in identities:
+                if kind is mio.SUBJECT_LOCATOR:
+                    topic = tm.topic_by_slo(iri)
+                else:
+                    topic = tm.topic_by_sid(iri) or tm.topic_by_iid(iri)
+                if topic and topic not in topics:
+                    topics.append(topic)
+            if topics:
+                topic = topics[0]
+                for other in topics[1:]:
+                    topic.merge(other)
+            else:
+                kind, iri = identities[0]
+                if kind is mio.SUBJECT_IDENTIFIER:
+                    topic = tm.create_topic_by_sid(iri)
+                elif kind is mio.SUBJECT_LOCATOR:
+                    topic = tm.create_topic_by_slo(iri)
+                else:
+                    topic = tm.create_topic_by_iid(iri)
+            for kind, iri in identities:
+                if kind is mio.SUBJECT_IDENTIFIER:
+                    topic.add_sid(iri)
+                elif kind is mio.SUBJECT_LOCATOR:
+                    topic.add_slo(iri)
+                else:
+                    topic.add_iid(iri)
+
+    ## MapHandler methods.
+    def startTopicMap(self):
+        self._events = [('startTopicMap', ())]
+        self._open = []
+        self._parents = {}
+        self._identities = []
+        self._seen = set()
+
+    def endTopicMap(self):
+        events = self._events
+        self._events.append(('endTopicMap', ()))
+        try:
+            self._materialize()
+        finally:
+            self._events = None
+            self._open = None
+            self._parents = None
+            self._identities = None
+            self._seen = None
+        handler = MappaMapHandler(self._tm)
+        for name, args in events:
+            getattr(handler, name)(*args)
+
+    def startTopic(self, identity):
+        self._events.append(('startTopic', (identity,)))
+        self._open.append(self._register(identity))
+
+    def topicRef(self, identity):
+        self._events.append(('topicRef', (identity,)))
+        self._register(identity)
+
+    def itemIdentifier(self, iri):
+        self._add_identity('itemIdentifier', mio.ITEM_IDENTIFIER, iri)
+
+    def subjectIdentifier(self, iri):
+        self._add_identity('subjectIdentifier', mio.SUBJECT_IDENTIFIER, iri)
+
+    def subjectLocator(self, iri):
+        self._add_identity('subjectLocator', mio.SUBJECT_LOCATOR, iri)
+
+    endTopic = _end_recorder('endTopic')
+    startAssociation = _start_recorder('startAssociation')
+    endAssociation = _end_recorder('endAssociation')
+    startRole = _start_recorder('startRole')
+    endRole = _end_recorder('endRole')
+    startOccurrence = _start_recorder('startOccurrence')
+    endOccurrence = _end_recorder('endOccurrence')
+    startName = _start_recorder('startName')
+    endName = _end_recorder('endName')
+    startVariant = _start_recorder('startVariant')
+    endVariant = _end_recorder('endVariant')
+    startScope = _start_recorder('startScope')
+    endScope = _end_recorder('endScope')
+    startTheme = _start_recorder('startTheme')
+    endTheme = _end_recorder('endTheme')
+    startType = _start_recorder('startType')
+    endType = _end_recorder('endType')
+    startPlayer = _start_recorder('startPlayer')
+    endPlayer = _end_recorder('endPlayer')
+    startReifier = _start_recorder('startReifier')
+    endReifier = _end_recorder('endReifier')
+    startIsa = _start_recorder('startIsa')
+    endIsa = _end_recorder('endIsa')
+    value = _recorder('value')
+
+
+def _identity_key(identity):
+    """\
+    Returns the key of the `identity` within the union-find structure.
+
+    Item identifiers and subject identifiers share the key since a topic
+    with the item identifier ``x`` is equal to a topic with the subject 
+    identifier ``x``.
+    """
+    kind, iri = identity
+    return kind is mio.SUBJECT_LOCATOR, iri
+
+
 def _apply_reifier(reifiable, reifier):
     """\
     Sets the [reifier] property of ``reifiable`` to the specified ``reifier``
@@ -149,6 +361,9 @@ def _apply_reifier(reifiable, reifier):
 def _apply_iids(reifiable, iids):
     """\
     Adds the item identifiers ``iids`` to the specified ``reifiable``.
+
+    Returns either the ``reifiable`` or the construct which ``reifiable``
+    was merged into.
     """
     for iid in iids:
         try:
@@ -157,8 +372,10 @@ def _apply_iids(reifiable, iids):
             existing = ex.existing
             if _mergable(reifiable, existing):
                 _merge_reifiables(reifiable, existing)
+                reifiable = existing
             else:
                 raise mio.MIOException('The item identifier "%s" is already assigned to another construct' % iid)
+    return reifiable
 
 
 def _mergable(a, b):
@@ -187,27 +404,18 @@ def _merge_reifiables(source, target):
             mergeutils.handle_existing(source_parent, target_parent)
             mergeutils.move_roles(source_parent, target_parent)
             source_parent.remove()
-            try:
-                source_parent.__dict__ = target_parent.__dict__
-            except AttributeError:
-                pass
+            target_parent.tm._forward(source_parent, target_parent)
     elif utils.is_variant(source):
         source_parent, target_parent = source.parent, target.parent
         if source_parent != target_parent:
             mergeutils.handle_existing(source_parent, target_parent)
             mergeutils.move_variants(source_parent, target_parent)
             source_parent.remove()
-            try:
-                source_parent.__dict__ = target_parent.__dict__
-            except AttributeError:
-                pass
+            target_parent.tm._forward(source_parent, target_parent)
     else:
         if utils.is_association(source):
             mergeutils.move_role_properties(source, target)
         elif utils.is_name(source):
             mergeutils.move_variants(source, target)
         source.remove()
-        try:
-            source.__dict__ = target.__dict__
-        except AttributeError:
-            pass
+        target.tm._forward(source, target)
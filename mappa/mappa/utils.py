@@ -171,9 +171,7 @@ def is_associated(topic1, topic2, type=ANY): # pylint: disable-msg=W0622
     Returns if the specified topics play a role in the same association.
     If the `type` is not ``ANY``, the association type is also considered.
     """
-    for assoc in imap(pred.parent, topic1.roles_played):
-        if not has_type(assoc, type):
-            continue
+    for assoc in imap(pred.parent, topic1.roles_by(ANY, assoc_type=type)):
         for _, player in assoc:
             if player == topic2:
                 return True
@@ -297,9 +295,11 @@ def isa(instance, type): # pylint: disable-msg=W0622
     if not is_topic(instance):
         return _typed_isa(instance, type)
     # 'instance' is a topic
-    if type in instance.types:
+    types = tuple(instance.types)
+    if type in types:
         return True
-    return iko(instance, type)
+    hierarchy = instance.tm.index.type_hierarchy
+    return any(type in hierarchy.supertypes(typ) for typ in types)
 
 def _typed_isa(instance, type): # pylint: disable-msg=W0622
     return instance.type == type or _typed_iko(instance, type)
@@ -318,12 +318,8 @@ def iko(subtype, supertype):
     return it.exists(supertypes(subtype), partial(eq, supertype))
 
 def _typed_iko(subtype, supertype):
-    tm = subtype.tm
-    return it.exists(_supertypes_of(subtype.type, 
-                                 tm.topic(sid=TMDM.supertype_subtype), 
-                                 tm.topic(sid=TMDM.supertype), 
-                                 tm.topic(sid=TMDM.subtype)),
-                              partial(eq, supertype))
+    typ = subtype.type
+    return typ is not None and supertype in subtype.tm.index.type_hierarchy.supertypes(typ)
 
 def supertypes(subtype):
     """\
@@ -332,13 +328,10 @@ def supertypes(subtype):
     `subtype`
         A topic.
     """
-    tm = subtype.tm
+    hierarchy = subtype.tm.index.type_hierarchy
     for typ in subtype.types:
         yield typ
-        for supertype in _supertypes_of(typ, 
-                                        tm.topic(sid=TMDM.supertype_subtype), 
-                                        tm.topic(sid=TMDM.supertype), 
-                                        tm.topic(sid=TMDM.subtype)):
+        for supertype in hierarchy.supertypes(typ):
             yield supertype
 
 def subtypes(supertype):
@@ -348,30 +341,11 @@ def subtypes(supertype):
     `supertype`
         A topic, an association, role, occurrence or name.
     """
-    tm = supertype.tm
-    return chain(tm.index.type_instance.topics(supertype), 
-                 _subtypes_of(supertype, 
-                              tm.topic(sid=TMDM.supertype_subtype), 
-                              tm.topic(sid=TMDM.supertype), 
-                              tm.topic(sid=TMDM.subtype)))
-
-def _supertypes_of(topic, supertype_subtype, supertype, subtype):
-    for assoc in imap(pred.parent, topic.roles_by(type=subtype, assoc_type=supertype_subtype)):
-        for supertyp in assoc[supertype]:
-            yield supertyp
-            # The recursive call may violate the Python rec.limit?
-            for super_super in _supertypes_of(supertyp, supertype_subtype, supertype, subtype):
-                yield super_super
-
-def _subtypes_of(topic, supertype_subtype, supertype, subtype):
-    type_idx = topic.tm.index.type_instance
-    for assoc in imap(pred.parent, topic.roles_by(type=supertype, assoc_type=supertype_subtype)):
-        for subtyp in assoc[subtype]:
-            yield subtyp
-            for instance in type_idx.topics(subtyp):
-                yield instance
-            for subsub in _subtypes_of(subtyp, supertype_subtype, supertype, subtype):
-                yield subsub
+    index = supertype.tm.index
+    type_idx = index.type_instance
+    return chain(type_idx.topics(supertype),
+                 chain.from_iterable(chain((subtyp,), type_idx.topics(subtyp))
+                                     for subtyp in index.type_hierarchy.subtypes(supertype)))
 
 def is_default_name(name):
     """\
@@ -76,6 +76,8 @@ def convert_reification(tm, remove_sid=True, remove_iid=True):
             if tmc and tmc != topic:
                 if tmc.reifier:
                     tmc.reifier.merge(topic)
+                    # The topic is merged into the reifier
+                    topic = tmc.reifier
                 else:
                     # If ``topic`` reifies something, a MCV is thrown
                     tmc.reifier = topic
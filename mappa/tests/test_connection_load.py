@@ -12,7 +12,9 @@ Tests against the topic map connection.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
-from mappa import TMDM
+from __future__ import with_statement
+from mappa import TMDM, XSD, Literal, IdentityViolation
+from mappa._internal import mergeutils
 from . mappa_test import MappaTestCase, len_
 
 class TestConnectionLoad(MappaTestCase):
@@ -52,6 +54,108 @@ class TestConnectionLoad(MappaTestCase):
         self.assert_(topic)
         self.assert_(1, len_(topic.sids))
 
+    def test_load_bulk(self):
+        self._conn.loads('''\
+john isa person; - "John"; homepage: http://www.example.org/john .
+jane isa person; - "Jane"@de .
+person ako agent .
+knows(knower: john, knowee: jane)
+john2 = http://www.example.org/john-locator; - "John" .
+''', into=self.base, format='ctm', bulk=True)
+        tm = self._tm
+        john = self.topic_by_id('john')
+        jane = self.topic_by_id('jane')
+        person = self.topic_by_id('person')
+        self.assert_(john)
+        self.assert_(tm.construct(id=john.id) is john)
+        name = tuple(john.names)[0]
+        self.assert_(tm.construct(id=name.id) is name)
+        ti_idx = tm.index.type_instance
+        self.assertEqual(set([john, jane]), set(ti_idx.topics(person)))
+        self.assertEqual(1, len_(ti_idx.associations(self.topic_by_id('knows'))))
+        self.assertEqual(3, len_(ti_idx.names(tm.topic(sid=TMDM.topic_name))))
+        self.assertEqual(1, len_(tm.index.literal.occurrences(Literal('http://www.example.org/john', XSD.anyURI))))
+        self.assertEqual(1, len_(tm.index.scoped.names(self.topic_by_id('de'))))
+        # Indexes are maintained after the bulk load
+        jane.create_occurrence(self.topic_by_id('homepage'), 'http://www.example.org/jane')
+        self.assertEqual(2, len_(ti_idx.occurrences(self.topic_by_id('homepage'))))
+
+    def test_bulk_merge(self):
+        tm = self._tm
+        with tm.bulk():
+            t1 = tm.create_topic(sid='http://www.example.org/a')
+            t2 = tm.create_topic(sid='http://www.example.org/b')
+            typ = tm.create_topic(sid='http://www.example.org/type')
+            occ = t2.create_occurrence(typ, 'value')
+            self.assertRaises(IdentityViolation, t2.add_sid, 'http://www.example.org/a')
+            t1.merge(t2)
+        self.assertEqual(1, len_(tm.index.type_instance.occurrences(typ)))
+        self.assert_(tm.construct(id=occ.id) is occ)
+        self.assert_(tm.topic(sid='http://www.example.org/b') is t1)
+        self.assertEqual(set([t1, typ]), tm.topics)
+
+    def test_bulk_remove_recreate(self):
+        tm = self._tm
+        with tm.bulk():
+            t = tm.create_topic(sid='http://www.example.org/a')
+            occ = t.create_occurrence(tm.create_topic(), 'value')
+            occ.add_iid('http://www.example.org/occ')
+            t.remove()
+            t2 = tm.create_topic(sid='http://www.example.org/a')
+            self.assert_(t2 is not t)
+            self.assert_(tm.construct(iid='http://www.example.org/occ') is None)
+            t2.create_occurrence(tm.create_topic(), 'value').add_iid('http://www.example.org/occ')
+        self.assert_(tm.topic(sid='http://www.example.org/a') is t2)
+        self.assert_(t2 in tm.topics)
+        self.assertEqual(3, len(tm.topics))
+
+    def test_load_deferred(self):
+        merges = []
+        merge_topics = mergeutils.merge_topics
+        def count_merges(source, target):
+            merges.append(source)
+            return merge_topics(source, target)
+        mergeutils.merge_topics = count_merges
+        try:
+            self._conn.loads('''\
+john http://psi.example.org/john; - "John"; isa person .
+knows(knower: john, knowee: jane)
+john2 http://psi.example.org/john; homepage: http://www.example.org/john; isa person .
+jane = http://www.example.org/jane .
+jane2 = http://www.example.org/jane; - "Jane" .
+''', into=self.base, format='ctm', deferred=True)
+        finally:
+            mergeutils.merge_topics = merge_topics
+        self.assertEqual([], merges)
+        tm = self._tm
+        john = self.topic_by_id('john')
+        self.assert_(john is self.topic_by_id('john2'))
+        self.assert_(john is tm.topic(sid='http://psi.example.org/john'))
+        self.assertEqual(1, len_(john.names))
+        self.assertEqual(1, len_(john.occurrences))
+        self.assertEqual([self.topic_by_id('person')], list(john.types))
+        jane = self.topic_by_id('jane')
+        self.assert_(jane is self.topic_by_id('jane2'))
+        self.assert_(jane is tm.topic(slo='http://www.example.org/jane'))
+        self.assertEqual(1, len_(jane.names))
+        self.assertEqual(2, len_(tm.associations))
+        self.assertEqual(set([self.base + '#john', self.base + '#john2']), set(john.iids))
+        self.assertEqual(2, len_(john.roles_played))
+        self.assertEqual(1, len_(jane.roles_played))
+
+    def test_load_deferred_existing(self):
+        tm = self._tm
+        t1 = tm.create_topic(sid='http://www.example.org/a')
+        t2 = tm.create_topic(sid='http://www.example.org/b')
+        self._conn.loads('''\
+a http://www.example.org/a; http://www.example.org/b; - "A" .
+''', into=self.base, format='ctm', deferred=True)
+        topic = tm.topic(sid='http://www.example.org/a')
+        self.assert_(topic in (t1, t2))
+        self.assert_(topic is tm.topic(sid='http://www.example.org/b'))
+        self.assert_(topic is self.topic_by_id('a'))
+        self.assertEqual(1, len_(topic.names))
+
 
 if __name__ == '__main__':
     import nose
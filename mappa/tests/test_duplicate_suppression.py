@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Tests against topic maps which suppress duplicates on creation.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+from mappa import XSD, utils
+from . mappa_test import MappaTestCase, len_
+from . test_topicmerge import TestTopicMerge
+from . test_topicmapmerge import TestTopicMapMerge
+
+_CONFIG = {'backend': 'mem', 'suppress_duplicates': True}
+
+
+class TestDuplicateSuppression(MappaTestCase):
+    config = _CONFIG
+
+    def test_occurrence(self):
+        t = self.create_topic()
+        typ, theme = self.create_topic(), self.create_topic()
+        occ = t.create_occurrence(typ, 'Semagia', [theme])
+        self.assert_(occ is t.create_occurrence(typ, 'Semagia', [theme, theme]))
+        self.assert_(occ is not t.create_occurrence(typ, 'Semagia'))
+        self.assert_(occ is not t.create_occurrence(typ, ('Semagia', XSD.anyURI), [theme]))
+        self.assert_(occ is not self.create_topic().create_occurrence(typ, 'Semagia', [theme]))
+        self.assertEqual(3, len_(t.occurrences))
+
+    def test_occurrence_modified(self):
+        t = self.create_topic()
+        typ = self.create_topic()
+        occ = t.create_occurrence(typ, 'Semagia')
+        occ.value = 'Mappa'
+        self.assert_(occ is t.create_occurrence(typ, 'Mappa'))
+        occ2 = t.create_occurrence(typ, 'Semagia')
+        self.assert_(occ is not occ2)
+        occ2.remove()
+        occ3 = t.create_occurrence(typ, 'Semagia')
+        self.assert_(occ3 is not occ2)
+        self.assertEqual(2, len_(t.occurrences))
+
+    def test_name_variant(self):
+        t = self.create_topic()
+        theme = self.create_topic()
+        name = t.create_name(None, 'Semagia')
+        self.assert_(name is t.create_name(None, 'Semagia'))
+        var = name.create_variant('Semagia', [theme])
+        self.assert_(var is name.create_variant('Semagia', [theme]))
+        self.assertEqual(1, len_(name.variants))
+        self.assertEqual(1, len_(t.names))
+        # The scope of the variant includes the scope of the name
+        theme2 = self.create_topic()
+        name.scope = [theme2]
+        self.assert_(var is name.create_variant('Semagia', [theme, theme2]))
+        self.assert_(var is not name.create_variant('Semagia', [self.create_topic()]))
+
+    def test_association(self):
+        typ, rtype = self.create_topic(), self.create_topic()
+        player, player2 = self.create_topic(), self.create_topic()
+        assoc = self._tm.create_association(typ, roles=[(rtype, player), (rtype, player2)])
+        self.assertEqual(2, len_(assoc.roles))
+        self.assert_(assoc is self._tm.create_association(typ, roles=[(rtype, player2), (rtype, player)]))
+        self.assert_(assoc is not self._tm.create_association(typ, roles=[(rtype, player)]))
+        role = [r for r in assoc.roles if r.player == player2][0]
+        role.player = player
+        self.assert_(assoc is self._tm.create_association(typ, roles=[(rtype, player), (rtype, player)]))
+        self.assertEqual(2, len_(self._tm.associations))
+
+    def test_merge(self):
+        t, t2 = self.create_topic(), self.create_topic()
+        typ = self.create_topic()
+        t.create_occurrence(typ, 'Semagia')
+        t2.create_occurrence(typ, 'Semagia')
+        t.merge(t2)
+        self.assertEqual(1, len_(t.occurrences))
+        occ = list(t.occurrences)[0]
+        self.assert_(occ is t.create_occurrence(typ, 'Semagia'))
+
+    def test_remove_duplicates(self):
+        t = self.create_topic()
+        typ = self.create_topic()
+        occ = t.create_occurrence(typ, 'Semagia')
+        occ2 = t.create_occurrence(typ, 'Mappa')
+        utils.remove_duplicates(self._tm)
+        self.assertEqual(2, len_(t.occurrences))
+        # Modifications may introduce duplicates
+        occ2.value = 'Semagia'
+        utils.remove_duplicates(self._tm)
+        self.assertEqual(1, len_(t.occurrences))
+
+    def test_remove_duplicate_roles(self):
+        typ, rtype, player = self.create_topic(), self.create_topic(), self.create_topic()
+        assoc = self._tm.create_association(typ, roles=[(rtype, player), (rtype, player)])
+        self.assertEqual(2, len_(assoc.roles))
+        utils.remove_duplicates(self._tm)
+        self.assertEqual(1, len_(assoc.roles))
+
+    def test_remove_duplicate_roles_modified(self):
+        typ, rtype = self.create_topic(), self.create_topic()
+        player, player2 = self.create_topic(), self.create_topic()
+        assoc = self._tm.create_association(typ, roles=[(rtype, player), (rtype, player2)])
+        utils.remove_duplicates(self._tm)
+        self.assertEqual(2, len_(assoc.roles))
+        # A changed player may make the roles of an association equal
+        [r for r in assoc.roles if r.player == player2][0].player = player
+        utils.remove_duplicates(self._tm)
+        self.assertEqual(1, len_(assoc.roles))
+
+
+class TestTopicMergeSuppressed(TestTopicMerge):
+    config = _CONFIG
+
+
+class TestTopicMapMergeSuppressed(TestTopicMapMerge):
+    config = _CONFIG
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
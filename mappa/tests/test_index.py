@@ -13,6 +13,7 @@ Tests against indices.
 :license:      BSD License
 """
 import unittest
+from mappa import XSD, TMDM, ANY, UCS, Literal
 from . mappa_test import MappaTestCase, len_
 
 class TestTypeInstanceIndex(MappaTestCase):
@@ -77,6 +78,177 @@ class TestTypeInstanceIndex(MappaTestCase):
         self.assertEqual(1, len_(idx.roles(r_type)))
         self.assertTrue(r in idx.roles(r_type))
 
+    def test_type_instance_types(self):
+        idx = self._tm.index.type_instance
+        a_type = self.create_topic()
+        a_type2 = self.create_topic()
+        self.assert_(a_type not in idx.association_types())
+        a = self.create_association(a_type)
+        self.assert_(a_type in idx.association_types())
+        a.type = a_type2
+        self.assert_(a_type not in idx.association_types())
+        self.assert_(a_type2 in idx.association_types())
+        self.assertEqual(0, len_(idx.associations(a_type)))
+        self.assert_(a_type not in idx.association_types())
+        a.remove()
+        self.assert_(a_type2 not in idx.association_types())
+
+    def test_type_instance_order(self):
+        idx = self._tm.index.type_instance
+        o_type = self.create_topic()
+        t = self.create_topic()
+        occs = [t.create_occurrence(o_type, str(i)) for i in range(10)]
+        self.assertEqual(occs, list(idx.occurrences(o_type)))
+        occs[3].remove()
+        del occs[3]
+        self.assertEqual(occs, list(idx.occurrences(o_type)))
+
+    def test_type_instance_order_large(self):
+        idx = self._tm.index.type_instance
+        o_type, o_type2 = self.create_topic(), self.create_topic()
+        t = self.create_topic()
+        occs = [t.create_occurrence(o_type, str(i)) for i in range(30)]
+        self.assertEqual(occs, list(idx.occurrences(o_type)))
+        for occ in occs[:26]:
+            occ.type = o_type2
+        self.assertEqual(occs[26:], list(idx.occurrences(o_type)))
+        self.assertEqual(occs[:26], list(idx.occurrences(o_type2)))
+        occs[0].type = o_type
+        self.assertEqual(occs[26:] + occs[:1], list(idx.occurrences(o_type)))
+        self.assertEqual(5, len_(idx.occurrences(o_type)))
+        self.assert_(occs[1] not in idx.occurrences(o_type))
+        self.assert_(occs[0] in idx.occurrences(o_type))
+
+    def test_topic_types(self):
+        idx = self._tm.index.type_instance
+        t = self.create_topic()
+        typ = self.create_topic()
+        self.assert_(typ not in idx.topic_types())
+        t.add_type(typ)
+        self.assertEqual([t], list(idx.topics(typ)))
+        t.remove_type(typ)
+        self.assertEqual(0, len_(idx.topics(typ)))
+        self.assert_(typ not in idx.topic_types())
+
+
+    def test_types(self):
+        idx = self._tm.index.type_instance
+        t, typ, typ2 = self.create_topic(), self.create_topic(), self.create_topic()
+        self.assertEqual(0, len_(idx.types(t)))
+        t.add_type(typ)
+        self.assertEqual([typ], list(idx.types(t)))
+        self.assertEqual([typ], list(t.types))
+        self.assertEqual([t], list(typ.instances))
+        t.add_type(typ2)
+        self.assertEqual([typ, typ2], list(t.types))
+        t.remove_type(typ)
+        self.assertEqual([typ2], list(t.types))
+        self.assertEqual(0, len_(typ.instances))
+
+    def test_types_duplicate(self):
+        idx = self._tm.index.type_instance
+        t, typ = self.create_topic(), self.create_topic()
+        type_instance = self.create_topic(sid=TMDM.type_instance)
+        type_role, instance_role = self.create_topic(sid=TMDM.type), self.create_topic(sid=TMDM.instance)
+        assocs = []
+        for i in range(2):
+            a = self.create_association(type_instance)
+            a.create_role(instance_role, t)
+            a.create_role(type_role, typ)
+            assocs.append(a)
+        self.assertEqual([typ], list(idx.types(t)))
+        # The type is kept until all associations are removed
+        assocs[0].remove()
+        self.assertEqual([typ], list(idx.types(t)))
+        assocs[1].remove()
+        self.assertEqual(0, len_(idx.types(t)))
+
+    def test_types_role_order(self):
+        idx = self._tm.index.type_instance
+        t, typ = self.create_topic(), self.create_topic()
+        a = self.create_association(self.create_topic(sid=TMDM.type_instance))
+        # The instance role is added before the type role
+        a.create_role(self.create_topic(sid=TMDM.instance), t)
+        self.assertEqual(0, len_(idx.types(t)))
+        type_role = a.create_role(self.create_topic(sid=TMDM.type), typ)
+        self.assertEqual([typ], list(idx.types(t)))
+        self.assertEqual([t], list(idx.topics(typ)))
+        # Not binary
+        role = a.create_role(self.create_topic(sid=TMDM.instance), self.create_topic())
+        self.assertEqual(0, len_(idx.types(t)))
+        role.remove()
+        self.assertEqual([typ], list(idx.types(t)))
+        typ2 = self.create_topic()
+        type_role.player = typ2
+        self.assertEqual([typ2], list(idx.types(t)))
+        self.assertEqual(0, len_(idx.topics(typ)))
+        a.scope = [self.create_topic()]
+        self.assertEqual(0, len_(idx.types(t)))
+        a.scope = []
+        self.assertEqual([typ2], list(idx.types(t)))
+        a.remove()
+        self.assertEqual(0, len_(idx.types(t)))
+        self.assert_(typ2 not in idx.topic_types())
+
+    def test_types_late_sid(self):
+        idx = self._tm.index.type_instance
+        t, typ = self.create_topic(), self.create_topic()
+        a = self.create_association(self.create_topic())
+        a.create_role(self.create_topic(sid=TMDM.type), typ)
+        a.create_role(self.create_topic(sid=TMDM.instance), t)
+        self.assertEqual(0, len_(idx.types(t)))
+        a.type.add_sid(TMDM.type_instance)
+        self.assertEqual([typ], list(idx.types(t)))
+
+class TestTypeHierarchyIndex(MappaTestCase):
+
+    def test_transitive(self):
+        idx = self._tm.index.type_hierarchy
+        a, b, c = self.create_topic(), self.create_topic(), self.create_topic()
+        self.assertEqual(0, len_(idx.supertypes(a)))
+        a.add_supertype(b)
+        self.assertEqual(set([b]), idx.supertypes(a))
+        b.add_supertype(c)
+        self.assertEqual(set([b, c]), idx.supertypes(a))
+        self.assertEqual(set([a, b]), idx.subtypes(c))
+        self.assert_(idx.is_subtype(a, c))
+        self.assert_(not idx.is_subtype(c, a))
+        b.remove_supertype(c)
+        self.assertEqual(set([b]), idx.supertypes(a))
+        self.assertEqual(0, len_(idx.subtypes(c)))
+
+    def test_player_change(self):
+        idx = self._tm.index.type_hierarchy
+        a, b, c = self.create_topic(), self.create_topic(), self.create_topic()
+        a.add_supertype(b)
+        self.assertEqual(set([b]), idx.supertypes(a))
+        role = list(a.roles_played)[0]
+        role.player = c
+        self.assertEqual(0, len_(idx.supertypes(a)))
+        self.assertEqual(set([b]), idx.supertypes(c))
+
+    def test_cycle(self):
+        idx = self._tm.index.type_hierarchy
+        a, b, c = self.create_topic(), self.create_topic(), self.create_topic()
+        a.add_supertype(b)
+        b.add_supertype(c)
+        c.add_supertype(a)
+        self.assertEqual(set([a, b, c]), idx.supertypes(a))
+        self.assertEqual(set([a, b, c]), idx.subtypes(b))
+
+    def test_instances(self):
+        idx = self._tm.index.type_hierarchy
+        sub, sup = self.create_topic(), self.create_topic()
+        t1, t2 = self.create_topic(), self.create_topic()
+        sub.add_supertype(sup)
+        t1.add_type(sup)
+        self.assertEqual(set([t1]), idx.instances(sup))
+        t2.add_type(sub)
+        self.assertEqual(set([t1, t2]), idx.instances(sup))
+        self.assertEqual(set([t2]), idx.instances(sub))
+        t1.remove_type(sup)
+        self.assertEqual(set([t2]), idx.instances(sup))
+
 
 class TestLiteralIndex(MappaTestCase):
     """\
@@ -184,6 +356,259 @@ class TestScopedIndex(MappaTestCase):
         var.remove()
         self.assert_(var not in idx.variants_by_theme(theme))
 
+    def test_association_scope(self):
+        idx = self._tm.index.scoped
+        theme1 = self.create_topic()
+        theme2 = self.create_topic()
+        assoc_ucs = self.create_association()
+        assoc1 = self.create_association(scope=[theme1])
+        assoc12 = self.create_association(scope=[theme1, theme2])
+        self.assertEqual([assoc_ucs], list(idx.associations(())))
+        self.assertEqual([assoc1], list(idx.associations(theme1)))
+        self.assertEqual([assoc1], list(idx.associations([theme1])))
+        self.assertEqual([assoc12], list(idx.associations([theme2, theme1])))
+        self.assertEqual(0, len_(idx.associations([theme2])))
+        self.assertEqual(set([assoc1, assoc12]), set(idx.associations(theme1, exact=False)))
+        self.assertEqual([assoc12], list(idx.associations(theme2, exact=False)))
+        self.assertEqual([assoc12], list(idx.associations([theme1, theme2], exact=False)))
+        self.assertEqual(3, len_(idx.associations((), exact=False)))
+        assoc1.scope = [theme2]
+        self.assertEqual(0, len_(idx.associations(theme1)))
+        self.assertEqual([assoc1], list(idx.associations(theme2)))
+        self.assertEqual([assoc12], list(idx.associations(theme1, exact=False)))
+        assoc12.remove()
+        self.assertEqual(0, len_(idx.associations([theme1, theme2])))
+        self.assertEqual(0, len_(idx.associations(theme1, exact=False)))
+
+    def test_occurrence_scope(self):
+        idx = self._tm.index.scoped
+        theme1 = self.create_topic()
+        theme2 = self.create_topic()
+        occ = self.create_occurrence()
+        self.assertEqual([occ], list(idx.occurrences(())))
+        occ.scope = [theme1, theme2]
+        self.assertEqual(0, len_(idx.occurrences(())))
+        self.assertEqual([occ], list(idx.occurrences([theme1, theme2])))
+        self.assertEqual([occ], list(idx.occurrences(theme2, exact=False)))
+        self.assertEqual(0, len_(idx.occurrences(theme2)))
+        occ.remove()
+        self.assertEqual(0, len_(idx.occurrences(theme2, exact=False)))
+
+    def test_variant_scope(self):
+        idx = self._tm.index.scoped
+        theme1 = self.create_topic()
+        theme2 = self.create_topic()
+        name = self.create_name()
+        name.scope = [theme1]
+        var = name.create_variant('Semagia', [theme2])
+        self.assertEqual([var], list(idx.variants([theme1, theme2])))
+        self.assertEqual(0, len_(idx.variants(theme2)))
+        self.assertEqual([var], list(idx.variants(theme2, exact=False)))
+        name.scope = ()
+        self.assertEqual([var], list(idx.variants(theme2)))
+        self.assertEqual(0, len_(idx.variants([theme1, theme2])))
+        self.assertEqual(0, len_(idx.variants(theme1, exact=False)))
+        var.scope = [theme1]
+        self.assertEqual([var], list(idx.variants(theme1)))
+        self.assertEqual(0, len_(idx.variants(theme2, exact=False)))
+
+class TestRolePlayerIndex(MappaTestCase):
+
+    def _roles(self, player, type=ANY, assoc_type=ANY, scope=ANY):
+        return set(self._tm.index.role_player.roles(player, type, assoc_type, scope))
+
+    def test_roles(self):
+        a_type, r_type, player = self.create_topic(), self.create_topic(), self.create_topic()
+        self.assertEqual(set(), self._roles(player))
+        a = self.create_association(a_type)
+        r1 = a.create_role(r_type, player)
+        r2 = a.create_role(self.create_topic(), player)
+        self.assertEqual(set([r1, r2]), self._roles(player))
+        self.assertEqual(set([r1]), self._roles(player, r_type))
+        self.assertEqual(set([r1]), self._roles(player, r_type, a_type))
+        self.assertEqual(set([r1, r2]), self._roles(player, assoc_type=a_type))
+        self.assertEqual(set(), self._roles(player, r_type, self.create_topic()))
+        self.assertEqual(set([r1]), self._roles(player, r_type, a_type, UCS))
+        self.assertEqual(set(), self._roles(player, r_type, a_type, [self.create_topic()]))
+        r2.remove()
+        self.assertEqual(set([r1]), self._roles(player))
+        a.remove()
+        self.assertEqual(set(), self._roles(player))
+
+    def test_changes(self):
+        a_type, r_type, player = self.create_topic(), self.create_topic(), self.create_topic()
+        a = self.create_association(a_type)
+        r = a.create_role(r_type, player)
+        new_a_type = self.create_topic()
+        a.type = new_a_type
+        self.assertEqual(set(), self._roles(player, r_type, a_type))
+        self.assertEqual(set([r]), self._roles(player, r_type, new_a_type))
+        new_r_type = self.create_topic()
+        r.type = new_r_type
+        self.assertEqual(set(), self._roles(player, r_type))
+        self.assertEqual(set([r]), self._roles(player, new_r_type, new_a_type))
+        new_player = self.create_topic()
+        r.player = new_player
+        self.assertEqual(set(), self._roles(player))
+        self.assertEqual(set([r]), self._roles(new_player, new_r_type, new_a_type))
+
+    def test_merge(self):
+        a_type, r_type, player = self.create_topic(), self.create_topic(), self.create_topic()
+        other_r_type, other_player = self.create_topic(), self.create_topic()
+        r = self.create_association(a_type).create_role(r_type, other_player)
+        player.merge(other_player)
+        self.assertEqual(set([r]), self._roles(player, r_type, a_type))
+        r_type.merge(other_r_type)
+        self.assertEqual(set([r]), self._roles(player, r_type, a_type))
+
+    def test_roles_by(self):
+        a_type, r_type, player = self.create_topic(), self.create_topic(), self.create_topic()
+        theme = self.create_topic()
+        a = self.create_association(a_type, scope=[theme])
+        r = a.create_role(r_type, player)
+        a.create_role(self.create_topic(), player)
+        self.assertEqual(set([r]), set(player.roles_by(r_type)))
+        self.assertEqual(set([r]), set(player.roles_by(r_type, a_type, [theme])))
+        self.assertEqual(set(), set(player.roles_by(r_type, a_type, UCS)))
+        with self._tm.bulk():
+            r2 = self.create_association(a_type).create_role(r_type, player)
+            self.assertEqual(set([r, r2]), set(player.roles_by(r_type, a_type)))
+        self.assertEqual(set([r, r2]), set(player.roles_by(r_type, a_type)))
+        self.assertEqual(set([r2]), set(player.roles_by(r_type, a_type, UCS)))
+
+    def test_roles_hub(self):
+        a_type, r_type, player = self.create_topic(), self.create_topic(), self.create_topic()
+        roles = [self.create_association(a_type).create_role(r_type, player) for i in range(20)]
+        self.assertEqual(roles, list(player.roles_by(r_type, a_type)))
+        for r in roles[:17]:
+            r.parent.remove()
+        self.assertEqual(roles[17:], list(player.roles_by(r_type, a_type)))
+        r = self.create_association(a_type).create_role(r_type, player)
+        self.assertEqual(roles[17:] + [r], list(player.roles_by(r_type, a_type)))
+
+
+class TestRangeIndex(MappaTestCase):
+
+    def test_range(self):
+        idx = self._tm.index.range
+        t = self.create_topic()
+        o_type = self.create_topic()
+        occs = [t.create_occurrence(o_type, Literal(str(i), XSD.integer)) for i in (5, 1, 3, 2, 4)]
+        o1, o2, o3, o4, o5 = sorted(occs, key=int)
+        self.assertEqual([o1, o2, o3, o4, o5], idx.occurrences(XSD.integer))
+        self.assertEqual([o2, o3, o4], idx.occurrences(XSD.integer, 2, 4))
+        self.assertEqual([o3], idx.occurrences(XSD.integer, 2, 4, include_lower=False, include_upper=False))
+        self.assertEqual([o4, o5], idx.occurrences(XSD.integer, '4'))
+        self.assertEqual([o1], idx.occurrences(XSD.integer, upper=Literal('1', XSD.integer)))
+        self.assertEqual([], idx.occurrences(XSD.decimal))
+        self.assertRaises(ValueError, idx.occurrences, XSD.string)
+
+    def test_changes(self):
+        idx = self._tm.index.range
+        t = self.create_topic()
+        o_type = self.create_topic()
+        occ = t.create_occurrence(o_type, Literal('2014-01-01', XSD.date))
+        occ2 = t.create_occurrence(o_type, Literal('2000-01-01', XSD.date))
+        self.assertEqual([occ2, occ], idx.occurrences(XSD.date, '1999-12-31'))
+        occ.value = Literal('1990-01-01', XSD.date)
+        self.assertEqual([occ2], idx.occurrences(XSD.date, '1999-12-31'))
+        self.assertEqual([occ, occ2], idx.occurrences(XSD.date))
+        occ.value = 'Semagia'
+        self.assertEqual([occ2], idx.occurrences(XSD.date))
+        occ.value = Literal('2000-01-01', XSD.date)
+        self.assertEqual(set([occ, occ2]), set(idx.occurrences(XSD.date, '2000-01-01', '2000-01-01')))
+        occ2.remove()
+        self.assertEqual([occ], idx.occurrences(XSD.date))
+        self._tm.remove_topic(t)
+        self.assertEqual([], idx.occurrences(XSD.date))
+        self._tm.add_topic(t)
+        self.assertEqual([occ], idx.occurrences(XSD.date))
+
+    def test_types(self):
+        idx = self._tm.index.range
+        t = self.create_topic()
+        o_type, o_type2 = self.create_topic(), self.create_topic()
+        occ = t.create_occurrence(o_type, 1.5)
+        occ2 = t.create_occurrence(o_type2, 0.5)
+        occ3 = t.create_occurrence(o_type, -1.0)
+        self.assertEqual([occ3, occ2, occ], idx.occurrences(XSD.float))
+        self.assertEqual([occ3, occ], idx.occurrences(XSD.float, types=[o_type]))
+        self.assertEqual([occ2], idx.occurrences(XSD.float, 0, types=[o_type2, self.create_topic()]))
+        occ.type = o_type2
+        self.assertEqual([occ3], idx.occurrences(XSD.float, types=[o_type]))
+        self.assertEqual([occ2, occ], idx.occurrences(XSD.float, types=[o_type2]))
+
+    def test_bulk(self):
+        t = self.create_topic()
+        o_type = self.create_topic()
+        with self._tm.bulk():
+            occs = [t.create_occurrence(o_type, i) for i in range(100)]
+        self.assertEqual(occs[10:20], self._tm.index.range.occurrences(XSD.integer, 10, 20, include_upper=False))
+
+
+class TestStatistics(MappaTestCase):
+    """\
+    Tests against the statistics.
+    """
+    def test_typed(self):
+        stats = self._tm.index.statistics
+        a_type = self.create_topic()
+        r_type = self.create_topic()
+        self.assertEqual(0, stats.association_count(a_type))
+        a = self.create_association(a_type)
+        a.create_role(r_type, self.create_topic())
+        a.create_role(r_type, self.create_topic())
+        self.assertEqual(1, stats.association_count(a_type))
+        self.assertEqual(1, stats.association_count())
+        self.assertEqual(2, stats.role_count(r_type))
+        self.assertEqual(2, stats.role_count())
+        self.assertEqual(4, stats.topic_count())
+        a.remove()
+        self.assertEqual(0, stats.association_count(a_type))
+        self.assertEqual(0, stats.role_count(r_type))
+
+    def test_topics(self):
+        stats = self._tm.index.statistics
+        typ = self.create_topic()
+        t = self.create_topic()
+        self.assertEqual(0, stats.topic_count(typ))
+        t.add_type(typ)
+        self.assertEqual(1, stats.topic_count(typ))
+        t.remove_type(typ)
+        self.assertEqual(0, stats.topic_count(typ))
+
+    def test_literals(self):
+        stats = self._tm.index.statistics
+        t = self.create_topic()
+        o_type = self.create_topic()
+        occ = t.create_occurrence(o_type, 'Semagia')
+        t.create_occurrence(o_type, 1)
+        name = self.create_name('Semagia')
+        self.assertEqual(2, stats.occurrence_count(o_type))
+        self.assertEqual(1, stats.name_count())
+        self.assertEqual(2, stats.value_count('Semagia'))
+        self.assertEqual(1, stats.value_count('1', XSD.integer))
+        self.assertEqual(2, stats.datatype_count(XSD.string))
+        self.assertEqual(1, stats.datatype_count(XSD.integer))
+        occ.value = Literal('http://www.semagia.com/', XSD.anyURI)
+        self.assertEqual(1, stats.datatype_count(XSD.string))
+        self.assertEqual(1, stats.datatype_count(XSD.anyURI))
+        name.remove()
+        self.assertEqual(0, stats.datatype_count(XSD.string))
+        self.assertEqual(0, stats.value_count('Semagia'))
+
+    def test_themes(self):
+        stats = self._tm.index.statistics
+        theme = self.create_topic()
+        self.assertEqual(0, stats.theme_count(theme))
+        self.create_association(scope=[theme])
+        name = self.create_name()
+        name.scope = [theme]
+        name.create_variant('Semagia', [self.create_topic()])
+        self.assertEqual(3, stats.theme_count(theme))
+        self.assertEqual(1, stats.variant_count())
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Tests the parallel module.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+import os
+from nose.tools import eq_
+from mappa._internal.parallel import map_chunks
+
+
+def test_map_chunks():
+    items = range(103)
+    res = map_chunks(sum, items, processes=3, chunk_size=10)
+    eq_(11, len(res))
+    eq_([sum(items[i:i+10]) for i in range(0, 103, 10)], res)
+
+
+def test_map_chunks_workers():
+    if not hasattr(os, 'fork'):
+        return
+    pid = os.getpid()
+    res = map_chunks(lambda chunk: os.getpid(), range(10), processes=2, chunk_size=2)
+    eq_(5, len(res))
+    eq_(False, pid in res)
+
+
+def test_map_chunks_one_chunk():
+    pid = os.getpid()
+    eq_([pid], map_chunks(lambda chunk: os.getpid(), range(10), chunk_size=10))
+
+
+def test_map_chunks_empty():
+    eq_([], map_chunks(sum, []))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
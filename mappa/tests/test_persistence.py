@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Tests against persistent connections (snapshot and journal).
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import mappa
+from mappa import XSD
+
+_BASE = u'http://mappa.semagia.com/test/persistence'
+
+_CTM = u'''
+a isa b; - "A" @s; occ: 1 ~ occ-reifier .
+r(x: a, y: b) @s
+'''
+
+
+class TestPersistence(TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._file = os.path.join(self._dir, 'system')
+        self._conn = self.connect()
+
+    def tearDown(self):
+        if not self._conn.closed:
+            self._conn.close()
+        shutil.rmtree(self._dir)
+
+    def connect(self, **kw):
+        return mappa.connect(persistent=True, file=self._file, **kw)
+
+    def reopen(self, commit=True):
+        self._conn.close(commit)
+        self._conn = self.connect()
+        return self._conn.get(_BASE)
+
+    def topic(self, tm, ident):
+        return tm.topic(iid=_BASE + u'#' + ident)
+
+    def create_map(self):
+        tm = self._conn.create(_BASE)
+        self._conn.loads(_CTM, into=_BASE, format='ctm')
+        return tm
+
+    def assert_map(self, tm):
+        a = self.topic(tm, 'a')
+        self.assertEqual(12, len(tm.topics))
+        self.assertEqual(2, len(tm.associations))
+        self.assertTrue(self.topic(tm, 'b') in a.types)
+        name = iter(a.names).next()
+        self.assertEqual(u'A', name.value)
+        self.assertEqual([self.topic(tm, 's')], list(name.scope))
+        occ = iter(a.occurrences).next()
+        self.assertEqual((u'1', XSD.integer), (occ.value, occ.datatype))
+        self.assertEqual(self.topic(tm, 'occ-reifier'), occ.reifier)
+        self.assertEqual(occ, self.topic(tm, 'occ-reifier').reified)
+        self.assertEqual(occ, tm.construct_by_id(occ.id))
+
+    def test_journal(self):
+        self.create_map()
+        self.assert_map(self.reopen())
+        self.assertEqual(0, os.path.getsize(self._file) if os.path.exists(self._file) else 0)
+
+    def test_no_commit(self):
+        self.create_map()
+        self.assertEqual(None, self.reopen(commit=False))
+
+    def test_snapshot(self):
+        self.create_map()
+        self._conn.snapshot()
+        journal_size = os.path.getsize(self._file + '.journal')
+        tm = self.reopen()
+        self.assert_map(tm)
+        self.assertEqual(journal_size, os.path.getsize(self._file + '.journal'))
+        self.topic(tm, 'a').add_sid(u'http://www.example.org/a')
+        tm = self.reopen()
+        self.assert_map(tm)
+        self.assertEqual(self.topic(tm, 'a'), tm.topic(sid=u'http://www.example.org/a'))
+
+    def test_snapshot_interval(self):
+        self._conn.close()
+        self._conn = self.connect(snapshot_interval=10)
+        self.create_map()
+        self._conn.commit()
+        self.assertTrue(os.path.exists(self._file))
+        self.assert_map(self.reopen())
+
+    def test_modifications(self):
+        tm = self.create_map()
+        self._conn.commit()
+        a, b, s = self.topic(tm, 'a'), self.topic(tm, 'b'), self.topic(tm, 's')
+        name = iter(a.names).next()
+        name.value = u'Name'
+        name.scope = ()
+        name.create_variant(u'Variant', [s])
+        occ = iter(a.occurrences).next()
+        occ.value = mappa.Literal(u'2', XSD.integer)
+        occ.type = b
+        occ.reifier = None
+        a.add_slo(u'http://www.example.org/slo')
+        assoc = [assoc for assoc in tm.associations if assoc.type == self.topic(tm, 'r')][0]
+        role = [role for role in assoc.roles if role.player == b][0]
+        role.player = s
+        tm.reifier = b
+        tm = self.reopen()
+        a, b, s = self.topic(tm, 'a'), self.topic(tm, 'b'), self.topic(tm, 's')
+        name = iter(a.names).next()
+        self.assertEqual(u'Name', name.value)
+        self.assertEqual(0, len(name.scope))
+        self.assertEqual([u'Variant'], [var.value for var in name.variants])
+        occ = iter(a.occurrences).next()
+        self.assertEqual(u'2', occ.value)
+        self.assertEqual(b, occ.type)
+        self.assertEqual(None, occ.reifier)
+        self.assertEqual(a, tm.topic(slo=u'http://www.example.org/slo'))
+        self.assertEqual(b, tm.reifier)
+        assoc = iter(tm.index.type_instance.associations(self.topic(tm, 'r'))).next()
+        self.assertEqual(set([a, s]), set(role.player for role in assoc.roles))
+
+    def test_removal(self):
+        tm = self.create_map()
+        self._conn.commit()
+        a = self.topic(tm, 'a')
+        for assoc in tuple(tm.associations):
+            assoc.remove()
+        iter(a.occurrences).next().remove()
+        tm.create_topic(sid=u'http://www.example.org/removed').remove()
+        tm = self.reopen()
+        self.assertEqual(0, len(tm.associations))
+        self.assertEqual(0, len(self.topic(tm, 'a').occurrences))
+        self.assertEqual(None, tm.topic(sid=u'http://www.example.org/removed'))
+        self._conn.remove(_BASE)
+        self.assertEqual(None, self.reopen())
+
+    def test_remove_recreate(self):
+        tm = self.create_map()
+        sid = u'http://www.example.org/recreated'
+        iid = _BASE + u'#recreated-occ'
+        t = tm.create_topic(sid=sid)
+        t.create_occurrence(self.topic(tm, 'b'), u'value').add_iid(iid)
+        t.remove()
+        t = tm.create_topic(sid=sid)
+        t.create_occurrence(self.topic(tm, 'b'), u'value').add_iid(iid)
+        tm = self.reopen()
+        t = tm.topic(sid=sid)
+        self.assertNotEqual(None, t)
+        self.assertEqual(t, tm.construct(iid=iid).parent)
+        self.assertEqual(13, len(tm.topics))
+        t.remove()
+        tm.create_topic(sid=sid)
+        tm = self.reopen()
+        self.assertNotEqual(None, tm.topic(sid=sid))
+
+    def test_merge(self):
+        tm = self.create_map()
+        self._conn.commit()
+        a, b = self.topic(tm, 'a'), self.topic(tm, 'b')
+        b.merge(a)
+        ident = b.id
+        tm = self.reopen()
+        b = tm.construct_by_id(ident)
+        self.assertEqual(b, self.topic(tm, 'a'))
+        self.assertEqual(b, self.topic(tm, 'b'))
+        self.assertEqual(1, len(b.names))
+        self.assertEqual(1, len(b.occurrences))
+
+    def test_ids(self):
+        tm = self.create_map()
+        ident = tm.create_topic().id
+        tm.create_topic().remove()
+        tm = self.reopen()
+        self.assertTrue(tm.create_topic().id > ident + 1)
+        self._conn.snapshot()
+        ident = tm.create_topic().id
+        tm = self.reopen()
+        self.assertTrue(tm.create_topic().id > ident)
+
+    def test_id_prefix(self):
+        tm = self.create_map()
+        prefix = tm.allocate_id.prefix
+        tm = self.reopen()
+        self.assertEqual(prefix, tm.allocate_id.prefix)
+        self._conn.snapshot()
+        tm = self.reopen()
+        self.assertEqual(prefix, tm.allocate_id.prefix)
+
+    def test_incomplete_commit(self):
+        tm = self.create_map()
+        self._conn.commit()
+        self.topic(tm, 'a').add_sid(u'http://www.example.org/a')
+        self._conn.close(True)
+        journal = self._file + '.journal'
+        size = os.path.getsize(journal)
+        f = open(journal, 'r+b')
+        f.truncate(size - 3)
+        f.close()
+        self._conn = self.connect()
+        tm = self._conn.get(_BASE)
+        self.assert_map(tm)
+        self.assertEqual(None, tm.topic(sid=u'http://www.example.org/a'))
+        self.topic(tm, 'a').add_sid(u'http://www.example.org/b')
+        tm = self.reopen()
+        self.assertEqual(self.topic(tm, 'a'), tm.topic(sid=u'http://www.example.org/b'))
+
+    def test_stale_journal(self):
+        self.create_map()
+        self._conn.commit()
+        journal = self._file + '.journal'
+        stale = open(journal, 'rb').read()
+        self._conn.snapshot()
+        self._conn.close()
+        # Simulate a crash after the snapshot was written
+        open(journal, 'wb').write(stale)
+        self._conn = self.connect()
+        self.assert_map(self._conn.get(_BASE))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
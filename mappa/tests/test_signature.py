@@ -28,6 +28,36 @@ class TestSignature(MappaTestCase):
         a2.create_role(role_type, role_player)
         self.assertEqual(a.__sig__(), a2.__sig__())
 
+    def test_association_signature_cache(self):
+        typ = self.create_topic()
+        a = self.create_association(typ)
+        a2 = self.create_association(typ)
+        role = a.create_role(self.create_topic(), self.create_topic())
+        role2 = a2.create_role(role.type, role.player)
+        self.assertEqual(a.__sig__(), a2.__sig__())
+        role.player = self.create_topic()
+        self.assertNotEqual(a.__sig__(), a2.__sig__())
+        role2.player = role.player
+        self.assertEqual(a.__sig__(), a2.__sig__())
+        role.type = self.create_topic()
+        self.assertNotEqual(a.__sig__(), a2.__sig__())
+        role.remove()
+        role2.remove()
+        self.assertEqual(a.__sig__(), a2.__sig__())
+        a.type = self.create_topic()
+        self.assertNotEqual(a.__sig__(), a2.__sig__())
+
+    def test_association_signature_scope(self):
+        typ = self.create_topic()
+        theme = self.create_topic()
+        player = self.create_topic()
+        a = self.create_association(typ, scope=[theme])
+        a.create_role(player, player)
+        a2 = self.create_association(typ)
+        a2.create_role(theme, player)
+        a2.create_role(player, player)
+        self.assertNotEqual(a.__sig__(), a2.__sig__())
+
     def test_occurrence_signature(self):
         t = self.create_topic()
         t2 = self.create_topic()
@@ -95,6 +125,18 @@ class TestSignature(MappaTestCase):
         self.assertNotEqual(v.__sig__(), v2.__sig__())
 
 
+    def test_variant_signature_name_scope(self):
+        t = self.create_topic()
+        typ = self.create_topic()
+        n = t.create_name(value='Semagia', type=typ)
+        n2 = t.create_name(value='Semagia', type=typ, scope=[self.create_topic()])
+        scope = [self.create_topic()]
+        v = n.create_variant(value='Semagia', scope=scope)
+        v2 = n2.create_variant(value='Semagia', scope=scope)
+        self.assertNotEqual(v.__sig__(), v2.__sig__())
+        n2.scope = ()
+        self.assertEqual(v.__sig__(), v2.__sig__())
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
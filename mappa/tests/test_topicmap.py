@@ -12,6 +12,7 @@ Tests against the topic map impl.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
+import mappa
 from . mappa_test import MappaTestCase, len_
 
 class TestTopicMap(MappaTestCase):
@@ -135,6 +136,37 @@ class TestTopicMap(MappaTestCase):
         except TypeError:
             pass
 
+    def test_construct_ids(self):
+        t = self.create_topic()
+        t2 = self.create_topic()
+        self.assertTrue(t.id < t2.id)
+        tm2 = self.create_map()
+        t3 = tm2.create_topic()
+        # Identifiers are unique within a topic map
+        self.assertNotEqual(self._tm, tm2)
+        self.assertEqual(t3, tm2.construct(id=t3.id))
+        self.assertFalse(t == tm2.construct(id=t.id))
+        self.assertFalse(t3 == self._tm.construct(id=t3.id))
+
+    def test_anon_topic_iids(self):
+        # Automatically assigned item identifiers are unique across topic maps
+        tm2 = mappa.connect().create(self._tm.iri)
+        t = self.create_topic()
+        t2 = tm2.create_topic()
+        self.assertEqual(1, len_(t2.iids))
+        self.assertFalse(set(t.iids) & set(t2.iids))
+
+    def test_anon_topic_iid_in_use(self):
+        t = self.create_topic()
+        alloc = self._tm.allocate_id
+        ident = alloc()
+        occ = t.create_occurrence(t, u'value')
+        for i in xrange(ident, ident + 5):
+            occ.add_iid(u'%s#id-%s-%d' % (self._tm.iri, alloc.prefix, i))
+        t2 = self._tm.create_topic()
+        self.assertEqual(1, len_(t2.iids))
+        self.assertFalse(set(t2.iids) & set(occ.iids))
+
     def test_construct(self):
         def _construct_by_id(obj):
             self.assertEqual(obj, self._tm.construct(id=obj.id))
@@ -102,6 +102,68 @@ class TestTopicMapMerge(MappaTestCase):
         self.assert_(type)
         self.assert_(type in self._tm.topic_by_sid(ref).types)
 
+    def test_merge_statistics(self):
+        ref = 'http://mappa.semagia.com/loc'
+        type_ref = 'http://mappa.semagia.com/type'
+        topicA = self._tm.create_topic(sid=ref)
+        typeA = self._tm.create_topic(sid=type_ref)
+        topicA.create_occurrence(typeA, 'value')
+        topicB = self._tm2.create_topic(sid=ref)
+        typeB = self._tm2.create_topic(sid=type_ref)
+        topicB.create_occurrence(typeB, 'value')
+        topicB.create_occurrence(typeB, 'value2')
+        self._tm2.create_topic(sid='http://mappa.semagia.com/other')
+        stats = self._tm.merge(self._tm2)
+        self.assertEqual(2, stats.topics_merged)
+        self.assertEqual(1, stats.topics_copied)
+        self.assertEqual(0, stats.topics_unified)
+        self.assertEqual(1, stats.copied)
+        self.assertEqual(1, stats.skipped)
+        self.assertEqual(3, len_(self._tm.topics))
+        self.assertEqual(2, len_(topicA.occurrences))
+
+    def test_merge_skip_association(self):
+        ref, ref2 = 'http://mappa.semagia.com/a', 'http://mappa.semagia.com/b'
+        for tm in (self._tm, self._tm2):
+            assoc = tm.create_association(tm.create_topic(sid=ref))
+            assoc.create_role(tm.create_topic(sid=ref2), tm.create_topic(sid=ref))
+        iid = 'http://mappa.semagia.com/assoc'
+        tuple(self._tm2.associations)[0].add_iid(iid)
+        stats = self._tm.merge(self._tm2)
+        self.assertEqual(1, len_(self._tm.associations))
+        self.assertEqual(1, stats.skipped)
+        self.assertEqual(0, stats.copied)
+        self.assertEqual(tuple(self._tm.associations)[0], self._tm.construct_by_iid(iid))
+
+    def test_merge_variants(self):
+        ref = 'http://mappa.semagia.com/loc'
+        theme_ref = 'http://mappa.semagia.com/theme'
+        name_ref = 'http://mappa.semagia.com/name'
+        for tm in (self._tm, self._tm2):
+            name = tm.create_topic(sid=ref).create_name(tm.create_topic(sid=name_ref), 'Name')
+            name.create_variant('Variant', (tm.create_topic(sid=theme_ref),))
+        tuple(tuple(self._tm2.topic_by_sid(ref).names)[0].variants)[0].reifier = self._tm2.create_topic()
+        name = tuple(self._tm2.topic_by_sid(ref).names)[0]
+        name.create_variant('Variant2', (self._tm2.topic_by_sid(theme_ref),))
+        self._tm.merge(self._tm2)
+        names = tuple(self._tm.topic_by_sid(ref).names)
+        self.assertEqual(1, len(names))
+        variants = names[0].variants
+        self.assertEqual(2, len_(variants))
+        self.assertEqual(1, len([var for var in variants if var.reifier]))
+
+    def test_merge_unify(self):
+        ref, ref2 = 'http://mappa.semagia.com/a', 'http://mappa.semagia.com/b'
+        topicA = self._tm.create_topic(sid=ref)
+        topicA2 = self._tm.create_topic(sid=ref2)
+        topicB = self._tm2.create_topic(sid=ref)
+        topicB.add_sid(ref2)
+        stats = self._tm.merge(self._tm2)
+        self.assertEqual(1, stats.topics_unified)
+        self.assertEqual(1, len_(self._tm.topics))
+        topic = self._tm.topic_by_sid(ref)
+        self.assert_(topic is self._tm.topic_by_sid(ref2))
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -130,6 +130,77 @@ class TestTopicMerge(MappaTestCase):
         self.assertEqual(t, n.type)
         self.assertTrue(t in n.scope)
 
+    def test_merge_returns_target(self):
+        t = self.create_topic()
+        t2 = self.create_topic()
+        self.assertEqual(t, t.merge(t2))
+
+    def test_construct_by_id_merged(self):
+        t = self.create_topic()
+        t2 = self.create_topic()
+        t3 = self.create_topic()
+        ident2, ident3 = t2.id, t3.id
+        t.merge(t2)
+        self.assertEqual(t, self._tm.construct_by_id(ident2))
+        t4 = self.create_topic()
+        t4.merge(t)
+        self.assertEqual(t4, self._tm.construct_by_id(ident2))
+        self.assertEqual(t3, self._tm.construct_by_id(ident3))
+
+    def test_construct_by_id_merged_removed(self):
+        t = self.create_topic()
+        t2 = self.create_topic()
+        ident2 = t2.id
+        t.merge(t2)
+        t.remove()
+        self.assertEqual(None, self._tm.construct_by_id(ident2))
+        self.assertFalse(ident2 in self._tm._forwards)
+
+    def test_forwards_bounded(self):
+        typ = self.create_topic()
+        for i in xrange(1100):
+            t = self.create_topic()
+            t2 = self.create_topic()
+            t2.create_occurrence(typ, 'value')
+            t.merge(t2)
+            t.remove()
+        self.assertTrue(len(self._tm._forwards) <= 1025)
+
+    def test_construct_by_id_merged_association(self):
+        t = self.create_topic()
+        t2 = self.create_topic()
+        assoc_type, role_type = self.create_topic(), self.create_topic()
+        a = self._tm.create_association(assoc_type)
+        a.create_role(role_type, t)
+        a2 = self._tm.create_association(assoc_type)
+        a2.create_role(role_type, t2)
+        ident = a2.id
+        t.merge(t2)
+        self.assertEqual(1, len_(self._tm.associations))
+        self.assertEqual(a, self._tm.construct_by_id(ident))
+
+    def test_merge_hub(self):
+        hub = self.create_topic()
+        t = self.create_topic()
+        t2 = self.create_topic()
+        assoc_type, role_type = self.create_topic(), self.create_topic()
+        hub_type = self.create_topic()
+        for i in range(20):
+            a = self._tm.create_association(assoc_type)
+            a.create_role(hub_type, hub)
+            a.create_role(role_type, self.create_topic())
+        a = self._tm.create_association(assoc_type)
+        a.create_role(hub_type, hub)
+        a.create_role(role_type, t)
+        a2 = self._tm.create_association(assoc_type)
+        a2.create_role(hub_type, hub)
+        a2.create_role(role_type, t2)
+        self.assertEqual(22, len_(self._tm.associations))
+        t.merge(t2)
+        self.assertEqual(21, len_(self._tm.associations))
+        self.assertEqual(1, len_(t.roles_played))
+        self.assertEqual(21, len_(hub.roles_played))
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -13,8 +13,8 @@ Compact Topic Maps Syntax (CTM) 1.0.
 :license:      BSD license
 """
 import re
-import io
 import codecs
+from functools import partial
 from urllib import urlopen
 from tm.mio import MIOException
 from tm.mio.deserializer import Deserializer, Context
@@ -22,6 +22,7 @@ from tm import plyutils
 from .environment import Environment
 from .contenthandler import MainContentHandler
 from .miohandler import CTMHandler
+from .internal_utils import iter_chunks
 from . import lexer as lexer_mod, parser as parser_mod
 
 __all__ = ['create_deserializer', 'CTMHandler']
@@ -72,11 +73,9 @@ class CTMDeserializer(Deserializer):
         """\
         
         """
-        parser = _make_parser()
         env = Environment(handler=self.handler, iri=source.iri,
                           subordinate=self.subordinate, included_by=self._included_by,
                           context=self.context, wildcard_counter=self._wildcard_counter)
-        parser.content_handler = MainContentHandler(env)
         self.environment = env
         data = source.stream
         if not data:
@@ -84,10 +83,17 @@ class CTMDeserializer(Deserializer):
                 data = urlopen(source.iri)
             except IOError:
                 raise MIOException('Cannot read from "%s"' % source.iri)
-        parser.parse(self._reader(data, source.encoding), lexer=_make_lexer())
+        chunks = iter_chunks(self._reader(data, source.encoding))
+        with plyutils.pooled_parser(parser_mod) as parser, plyutils.pooled_lexer(lexer_mod) as lexer:
+            parser.content_handler = MainContentHandler(env)
+            parser.parse(lexer=lexer, tokenfunc=partial(next, _tokens(lexer, chunks), None))
         self.wildcard_counter = self.environment.wildcard_counter
 
     def _reader(self, fileobj, encoding=None):
+        """\
+        Returns a function which reads and decodes up to n bytes from 
+        `fileobj`.
+        """
         found_bom = False
         encoding = encoding or 'utf-8'
         line = fileobj.readline()
@@ -100,4 +106,23 @@ class CTMDeserializer(Deserializer):
             encoding = m.group(1)
             if found_bom and encoding.lower() != 'utf-8':
                 raise MIOException('Found BOM, but encoding directive declares "%s"' % encoding)
-        return codecs.getreader(encoding)(io.BytesIO(''.join([line, fileobj.read()]))).read()
+        decoder = codecs.getincrementaldecoder(encoding)()
+        pending = [line]
+        def read(size):
+            data = pending.pop() if pending else fileobj.read(size)
+            while True:
+                res = decoder.decode(data, final=not data)
+                if res or not data:
+                    return res
+                data = fileobj.read(size)
+        return read
+
+
+def _tokens(lexer, chunks):
+    """\
+    Returns an iterator over the tokens of the provided chunks.
+    """
+    for chunk in chunks:
+        lexer.input(chunk)
+        for tok in iter(lexer.token, None):
+            yield tok
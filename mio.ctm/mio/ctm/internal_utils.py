@@ -12,10 +12,21 @@ CTM related utilities.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+import re
 from tm import mio, XSD
 from . import consts
 from .utils import CTM_INTEGER
 
+# Default number of bytes which are read at once (c.f. `iter_chunks`)
+CHUNK_SIZE = 1 << 16
+
+_NORMAL_SPECIAL = re.compile(ur'\n|"|\#\(?|[a-zA-Z][a-zA-Z0-9\+\-\.]*://')
+_IRI_END = re.compile(ur'[\s\]\(]')
+_STRING_END = re.compile(ur'(?:[^"\\]|\\.)*"', re.S)
+_TRIPLE_STRING_END = re.compile(ur'(?:[^"\\]|\\.|"(?!""))*"""', re.S)
+_MLCOMMENT_DELIM = re.compile(ur'\#\(|\)\#')
+_WHITESPACE = re.compile(ur'\s')
+
 _CONST2IRI = {
     consts.STRING: XSD.string,
     consts.IRI: XSD.anyURI,
@@ -63,3 +74,85 @@ def handle_identity(handler, ctx, identity):
     if kind != consts.IRI:
         raise mio.MIOException('Expected an IRI, got: (%s, %s)' % (kind, iri))
     handler.subjectIdentifier(iri)
+
+
+def iter_chunks(read, size=CHUNK_SIZE):
+    """\
+    Returns an iterator over unicode chunks which can be lexed one after 
+    another: Each chunk (but the last one) ends with a line break which is 
+    not part of a string or a comment.
+
+    `read`
+        A function which returns up to `size` decoded characters, or an empty 
+        string if the end of the input was reached.
+    """
+    buf = u''
+    pos = level = 0
+    while True:
+        data = read(size)
+        if not data:
+            if buf:
+                yield buf
+            return
+        buf += data
+        pos, level, cut = _scan(buf, pos, level)
+        if cut:
+            yield buf[:cut]
+            buf = buf[cut:]
+            pos -= cut
+
+
+def _scan(buf, pos, level):
+    """\
+    Scans `buf` starting at `pos` and returns a tuple 
+    ``(position, comment nesting level, cut)``. 
+    
+    The position is where scanning must be continued once more data is 
+    available, `cut` is the position after the last line break where the 
+    buffer can be split (``0`` if no such line break was found).
+    """
+    cut = 0
+    end = len(buf)
+    while pos < end:
+        if level:
+            m = _MLCOMMENT_DELIM.search(buf, pos)
+            if not m:
+                return max(pos, end - 1), level, cut
+            level += 1 if m.group() == u'#(' else -1
+            pos = m.end()
+            continue
+        m = _NORMAL_SPECIAL.search(buf, pos)
+        if not m:
+            # Continue at the last token boundary, the buffer may end with a
+            # partial IRI or comment
+            boundary = pos
+            for ws in _WHITESPACE.finditer(buf, pos):
+                boundary = ws.end()
+            return boundary, level, cut
+        start, token = m.start(), m.group()
+        if token == u'\n':
+            pos = cut = m.end()
+        elif token == u'#(':
+            level, pos = 1, m.end()
+        elif token == u'#':
+            newline = buf.find(u'\n', start)
+            if start + 1 == end or newline < 0:
+                return start, level, cut
+            pos = newline
+        elif token == u'"':
+            if buf.startswith(u'"""', start):
+                m = _TRIPLE_STRING_END.match(buf, start + 3)
+            elif buf[start:] in (u'"', u'""'):
+                # May be the start of a triple quoted string
+                return start, level, cut
+            else:
+                m = _STRING_END.match(buf, start + 1)
+            if not m:
+                return start, level, cut
+            pos = m.end()
+        else:
+            m = _IRI_END.search(buf, m.end())
+            if not m:
+                return start, level, cut
+            pos = m.start()
+    return pos, level, cut
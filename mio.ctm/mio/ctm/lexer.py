@@ -197,7 +197,7 @@ def t_INTEGER(t):
 
 
 def t_triple_string(t):
-    ur'"{3}([^"\\]|(\\[\\"rntuU])|"|"")*"{3}'
+    ur'"{3}([^"\\]|(\\[\\"rntuU])|"|"")*?"{3}'
     t.value = t.value[3:-3]
     t.type = 'STRING'
     t.lexer.lineno += t.value.count('\n')
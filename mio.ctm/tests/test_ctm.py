@@ -12,7 +12,12 @@ CTM test cases.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+from nose.tools import eq_, raises
+import mappa
+from mappa.miohandler import MappaMapHandler
 from mappaext.cxtm.cxtm_test import create_invalid_cxtm_cases, create_valid_cxtm_cases
+from tm import Source
+from tm.mio import MIOException
 from mio.ctm import create_deserializer
 
 _EXCLUDED = [
@@ -29,6 +34,27 @@ def test_cxtm_invalid():
         yield test
 
 
+def _parse(data, tm):
+    deser = create_deserializer()
+    deser.handler = MappaMapHandler(tm)
+    deser.parse(Source(data=data, iri=u'http://www.example.org/ctm'))
+
+
+@raises(MIOException)
+def test_parser_reuse():
+    conn = mappa.connect()
+    tm = conn.create(u'http://www.example.org/ctm')
+    try:
+        _parse(u'a isa b; - "A" . c isa ', tm)
+    except MIOException:
+        pass
+    # The pooled parser and lexer must not remember the state of the failed parse
+    _parse(u'x isa y .', tm)
+    x = tm.topic_by_iid(u'http://www.example.org/ctm#x')
+    eq_([tm.topic_by_iid(u'http://www.example.org/ctm#y')], list(x.types))
+    _parse(u'x isa ', tm)
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -12,8 +12,10 @@ Tests against mio.ctm.lexer.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+from io import StringIO
 from nose.tools import eq_
-from mio.ctm import _make_lexer as make_lexer
+from mio.ctm import _make_lexer as make_lexer, _tokens
+from mio.ctm.internal_utils import iter_chunks
 
 
 def the_lexer(data):
@@ -106,6 +108,32 @@ http://psi.example.org/ ex:fake.''',
                  ]
 
 
+_CHUNKED_DOC = u'''%prefix ex http://www.example.org/voc#
+# A comment with a "quote
+a isa ex:b; - "A "" name
+spanning lines";
+  occ: """A "triple" quoted
+string with ""quotes""" .
+#( A "comment
+ #( nested )# " )#
+c - "C\\" ; - "\"D" ~ <http://www.example.org/iri>; o: http://www.example.org/a"b .
+d - """x""" . e - """y""""" .
+'''
+
+def check_chunked(size):
+    expected = [(tok.type, tok.value) for tok in iter(the_lexer(_CHUNKED_DOC).token, None)]
+    lexer = make_lexer()
+    chunks = list(iter_chunks(StringIO(_CHUNKED_DOC).read, size))
+    eq_(_CHUNKED_DOC, u''.join(chunks))
+    eq_(expected, [(tok.type, tok.value) for tok in _tokens(lexer, iter(chunks))])
+    eq_(_CHUNKED_DOC.count(u'\n') + 1, lexer.lineno)
+
+
+def test_chunked():
+    for size in range(1, 12):
+        yield check_chunked, size
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -13,6 +13,7 @@ JSON Topic Maps (JTM) 1.0/1.1 deserializer.
 :license:      BSD license
 """
 from __future__ import absolute_import
+from urllib import urlopen
 from tm import mio, XSD, TMDM
 from tm.irilib import resolve_iri
 from tm.mio.deserializer import Deserializer
@@ -63,54 +64,140 @@ class JTMDeserializer(Deserializer):
 
     def _do_parse(self, source):
         """\
-
+        Reads the JSON source incrementally and reports the topics and
+        associations of a topic map as soon as they were read.
         """
-        dct = None
-        if source.stream:
-            dct = json.load(source.stream)
+        stream = source.stream
+        close = not stream
+        if close:
+            stream = urlopen(source.iri)
+        try:
+            ctx = _Context(self.handler, source.iri)
+            for key, value in json.iter_members(stream, arrays=(u'topics', u'associations')):
+                ctx.member(key, value)
+            ctx.end()
+        finally:
+            if close:
+                stream.close()
+
+
+class _Context(object):
+    """\
+    Issues the events for the members of a JTM instance.
+
+    The members are buffered until the version and the item type are known.
+    Afterwards, the topics and associations of a topic map are reported
+    immediately while all other item types are evaluated at the end.
+    Since the prefixes may be declared after the members which use them,
+    members of a JTM 1.1 topic map which may contain QNames are deferred
+    until the prefixes are known.
+    """
+    def __init__(self, handler, base_iri):
+        self.handler = handler
+        self.prefixes = {None: base_iri, u'xsd': _NS_XSD}
+        self.version = None
+        self.item_type = None
+        self._pending = []
+        # Members waiting for the prefixes, ``None`` if the prefixes are known
+        self._deferred = []
+        self._item = {}
+
+    def member(self, key, value):
+        if key == u'version':
+            if value not in (u'1.0', u'1.1'):
+                raise mio.MIOException('Unknown JTM version "%s"' % value)
+            self.version = float(value)
+        elif key == u'item_type':
+            self._set_item_type(value)
+        if self.version is None or self.item_type is None:
+            self._pending.append((key, value))
         else:
-            dct = json.load(source.iri)
-        version = dct.get(u'version', u'1.0')
-        if version not in (u'1.0', u'1.1'):
-            raise mio.MIOException('Unknown JTM version "%s"' % version)
-        _issue_events(self.handler, source.iri, dct, version)
-
-
-def _issue_events(handler, base_iri, dct, version):
-    version = float(version)
-    prefixes = dct.get(u'prefixes', {})
-    if prefixes and not version > 1.0:
-        raise mio.MIOException('Prefixes are not allowed in JTM 1.0')
-    prefixes[None] = base_iri
-    xsd_iri = prefixes.get(u'xsd', None)
-    if xsd_iri and xsd_iri != _NS_XSD:
-        raise mio.MIOException('The prefix "xsd" is predefined and cannot be bound to "%s"' % xsd_iri)
-    else:
-        prefixes[u'xsd'] = _NS_XSD
-    item_type = dct.get(u'item_type', u'').lower()
-    if item_type not in _ITEM_TYPES:
-        raise mio.MIOException('Unknown item type: "%s"' % item_type)
-    if item_type not in _ITEM_TYPES_SUPPORTED:
-        raise mio.MIOException('The item type "%s" is not supported' % item_type)
-    if item_type == u'association':
-        _handle_association(handler, prefixes, dct)
-    elif item_type == u'topic':
-        _handle_topic(handler, prefixes, dct)
-    elif item_type == u'occurrence':
-        _handle_occurrence(handler, prefixes, dct)
-    elif item_type == u'name':
-        _handle_name(handler, prefixes, dct)
-    else:
-        _handle_reifier(handler, prefixes, dct)
-        for k, v in ((k, v) for k, v in dct.iteritems() if k not in (u'version', u'prefixes', u'item_type', u'reifier')):
-            if k == u'item_identifiers':
-                _handle_iids(handler, prefixes, dct)
-            elif k == u'topics':
-                for topic in v:
-                    _handle_topic(handler, prefixes, topic, version)
-            elif k == u'associations':
-                for assoc in v:
-                    _handle_association(handler, prefixes, assoc)
+            self._handle(key, value)
+
+    def end(self):
+        if self.version is None:
+            self.version = 1.0
+        if self.item_type is None:
+            self._set_item_type(u'')
+        self._flush()
+        self._handle_deferred()
+        handler, prefixes, dct = self.handler, self.prefixes, self._item
+        item_type = self.item_type
+        if item_type == u'association':
+            _handle_association(handler, prefixes, dct)
+        elif item_type == u'topic':
+            _handle_topic(handler, prefixes, dct, self.version)
+        elif item_type == u'occurrence':
+            _handle_occurrence(handler, prefixes, dct)
+        elif item_type == u'name':
+            _handle_name(handler, prefixes, dct)
+
+    def _set_item_type(self, item_type):
+        item_type = item_type.lower()
+        if item_type not in _ITEM_TYPES:
+            raise mio.MIOException('Unknown item type: "%s"' % item_type)
+        if item_type not in _ITEM_TYPES_SUPPORTED:
+            raise mio.MIOException('The item type "%s" is not supported' % item_type)
+        self.item_type = item_type
+
+    def _flush(self):
+        pending = self._pending
+        self._pending = []
+        # Buffered prefixes apply to all buffered members
+        pending.sort(key=lambda member: member[0] != u'prefixes')
+        for key, value in pending:
+            self._handle(key, value)
+
+    def _handle_deferred(self):
+        deferred, self._deferred = self._deferred or (), None
+        for key, value in deferred:
+            self._handle(key, value)
+
+    def _handle(self, key, value):
+        if self._pending:
+            self._flush()
+        if key == u'prefixes':
+            self._add_prefixes(value)
+            self._handle_deferred()
+        elif self.item_type != u'topicmap':
+            self._item[key] = value
+        elif self._deferred is not None and self.version > 1.0 and _has_qname(value):
+            self._deferred.append((key, value))
+        elif key == u'topics':
+            _handle_topic(self.handler, self.prefixes, value, self.version)
+        elif key == u'associations':
+            _handle_association(self.handler, self.prefixes, value)
+        elif key == u'item_identifiers':
+            for iid in value:
+                self.handler.itemIdentifier(_resolve_iri(self.prefixes, iid))
+        elif key == u'reifier' and value:
+            self.handler.reifier(_resolve_topicref(self.prefixes, value))
+
+    def _add_prefixes(self, prefixes):
+        if prefixes and not self.version > 1.0:
+            raise mio.MIOException('Prefixes are not allowed in JTM 1.0')
+        xsd_iri = prefixes.get(u'xsd', None)
+        if xsd_iri and xsd_iri != _NS_XSD:
+            raise mio.MIOException('The prefix "xsd" is predefined and cannot be bound to "%s"' % xsd_iri)
+        prefixes.pop(u'xsd', None)
+        self.prefixes.update(prefixes)
+
+
+def _has_qname(value):
+    """\
+    Returns if the JSON `value` contains a string which may be a QName or
+    a topic reference which uses a QName.
+    """
+    if isinstance(value, basestring):
+        return value[:1] == u'[' or value[3:4] == u'['
+    if isinstance(value, dict):
+        value = value.itervalues()
+    elif not isinstance(value, list):
+        return False
+    for val in value:
+        if _has_qname(val):
+            return True
+    return False
 
 
 def _resolve_topicref(prefixes, ref):
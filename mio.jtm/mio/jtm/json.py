@@ -6,13 +6,15 @@
 # BSD license.
 #
 """\
-This module provides a JSON writer.
+This module provides a JSON writer and an incremental reader for JSON
+objects.
 
 :author:       Lars Heuer (heuer[at]semagia.com)
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
 from __future__ import absolute_import
+import re
 import codecs
 try:
     import simplejson as json
@@ -23,6 +25,131 @@ from json.encoder import encode_basestring_ascii as escape
 load = json.load
 loads = json.loads
 
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_match_ws = re.compile(r'[ \t\n\r]*').match
+
+
+def iter_members(fileobj, arrays=(), size=CHUNK_SIZE):
+    """\
+    Returns an iterator over the members of the JSON object provided by
+    `fileobj` which yields ``(key, value)`` tuples in document order.
+
+    The input is read and decoded incrementally. The values of the
+    members named in `arrays` are not materialized as a whole, a
+    ``(key, element)`` tuple is yielded for each element of the array
+    instead.
+
+    `fileobj`
+        A file-like object which provides UTF-8 encoded JSON.
+    `arrays`
+        An iterable of member names which must provide an array.
+    `size`
+        The number of bytes which are read at once.
+    """
+    reader = _Reader(fileobj, size)
+    reader.expect(u'{')
+    if reader.peek() == u'}':
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, basestring):
+                raise ValueError('Expected a string key, got "%r"' % key)
+            reader.expect(u':')
+            if key in arrays:
+                reader.expect(u'[')
+                if reader.peek() == u']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield key, reader.value()
+                        if reader.expect(u',]') == u']':
+                            break
+            else:
+                yield key, reader.value()
+            if reader.expect(u',}') == u'}':
+                break
+    if reader.peek():
+        raise ValueError('Extra data after the JSON object')
+
+
+class _Reader(object):
+    """\
+    Buffers the decoded input of a file-like object.
+
+    Byte strings are decoded as UTF-8, text streams which return unicode
+    strings are read as they are.
+    """
+    __slots__ = ['buf', 'pos', 'eof', '_read', '_decode', '_size']
+
+    def __init__(self, fileobj, size):
+        self.buf = u''
+        self.pos = 0
+        self.eof = False
+        self._read = fileobj.read
+        self._decode = codecs.getincrementaldecoder('utf-8-sig')().decode
+        self._size = size
+
+    def _fill(self, size):
+        """\
+        Reads at least `size` bytes and appends them to the buffer. Returns
+        ``False`` iff the end of the input was reached.
+        """
+        data = self._read(size)
+        self.eof = not data
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        if isinstance(data, unicode):
+            self.buf += data
+        else:
+            self.buf += self._decode(data, self.eof)
+        return not self.eof
+
+    def peek(self):
+        """\
+        Skips whitespaces and returns the next character or an empty string
+        if the end of the input was reached.
+        """
+        while True:
+            self.pos = _match_ws(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self._fill(self._size):
+                return u''
+
+    def expect(self, chars):
+        """\
+        Consumes and returns the next character which must be one of `chars`.
+        """
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expected one of "%s", got "%s"' % (chars, c or u'EOF'))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """\
+        Consumes and returns the next JSON value.
+        """
+        self.peek()
+        size = self._size
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may be incomplete
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return val
+            except ValueError:
+                if self.eof:
+                    raise
+            # Grow the read size to avoid re-decoding large values too often
+            self._fill(size)
+            size *= 2
+
 
 class JSONWriter(object):
     """\
@@ -43,12 +170,27 @@ class JSONWriter(object):
         self._depth = 0
         self.prettify = False
 
-    def start(self):
+    def start(self, depth=0):
         """\
         Indicates the start of JSON output.
+
+        `depth`
+            The nesting depth of the output (used to indent a fragment of a
+            JSON document).
         """
         self._want_comma = False
-        self._depth = 0
+        self._depth = depth
+
+    def fragment(self, fragment):
+        """\
+        Writes the serialized JSON `fragment` (a string which contains zero or
+        more comma separated values) unchanged.
+        """
+        if fragment:
+            if self._want_comma:
+                self._out.write(u',')
+            self._out.write(fragment)
+            self._want_comma = True
     
     def end(self):
         """\
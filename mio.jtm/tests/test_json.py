@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Tests against the incremental JSON reader (mio.jtm.json).
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - http://www.semagia.com/
+:license:      BSD license
+"""
+import io
+from StringIO import StringIO
+from nose.tools import eq_, raises
+from mio.jtm import json
+
+_JSON = '''\xef\xbb\xbf{"version": "1.1", "number": 12345678,
+  "topics": [{"subject_identifiers": ["http://www.example.org/\xc3\xa4"]}, {"a": [1, 2]}, [] ],
+  "empty" : [] , "nested": {"topics": [1]}, "associations":[]}'''
+
+
+def _members(data, size=json.CHUNK_SIZE):
+    return list(json.iter_members(StringIO(data), arrays=(u'topics', u'associations', u'empty'), size=size))
+
+
+def test_iter_members():
+    expected = [(u'version', u'1.1'), (u'number', 12345678),
+                (u'topics', {u'subject_identifiers': [u'http://www.example.org/\xe4']}),
+                (u'topics', {u'a': [1, 2]}), (u'topics', []),
+                (u'nested', {u'topics': [1]})]
+    eq_(expected, _members(_JSON))
+    for size in range(1, 8):
+        eq_(expected, _members(_JSON, size))
+
+
+def test_unicode_stream():
+    data = _JSON[3:].decode('utf-8')
+    for size in (1, 5, json.CHUNK_SIZE):
+        eq_(_members(_JSON), list(json.iter_members(io.StringIO(data), arrays=(u'topics', u'associations', u'empty'), size=size)))
+
+
+def test_empty_object():
+    eq_([], _members(' { } '))
+
+
+def test_invalid():
+    @raises(ValueError)
+    def check(data):
+        _members(data, 3)
+    for data in ('', '[]', '{"a": 1', '{"a": 1} x', '{"topics": {}}', '{1: 2}', '{"a": [1, }'):
+        yield check, data
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -12,6 +12,11 @@ Tests against the JTM 1.0/1.1 deserializer.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+from StringIO import StringIO
+from nose.tools import eq_, raises
+from tm import mio
+from tm.mio import Source
+from tm.mio.handler import MapHandler
 from mappaext.cxtm.cxtm_test import create_invalid_cxtm_cases, create_valid_cxtm_cases
 from mio.jtm import create_deserializer
 
@@ -36,6 +41,94 @@ def test_cxtm_invalid_11():
         yield test
 
 
+class _ChunkedStream(object):
+    """\
+    Returns at most 5 bytes per ``read`` call.
+    """
+    def __init__(self, data):
+        self._stream = StringIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(5)
+
+
+class _Handler(MapHandler):
+    """\
+    Records the topic references.
+    """
+    def __init__(self):
+        super(_Handler, self).__init__()
+        self.events = []
+
+    def startTopic(self, identity):
+        self.events.append(('startTopic', identity))
+
+    def topicRef(self, identity):
+        self.events.append(('topicRef', identity))
+
+
+def _parse(data, base=u'http://www.example.org/map'):
+    handler = _Handler()
+    deser = create_deserializer()
+    deser.handler = handler
+    deser.parse(Source(iri=base, file=_ChunkedStream(data)))
+    return handler.events
+
+
+def test_streaming():
+    data = '''{"topics": [{"subject_identifiers": ["[ex:a]"]}, {"item_identifiers": ["#b"]}],
+                 "prefixes": {"ex": "http://www.example.org/"}, "version": "1.1", "item_type": "topicmap",
+                 "associations": [{"type": "si:[ex:assoc]", "roles": [{"type": "si:[ex:role]", "player": "ii:#b"}]}]}'''
+    eq_([('startTopic', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/a')),
+         ('startTopic', (mio.ITEM_IDENTIFIER, u'http://www.example.org/map#b')),
+         ('topicRef', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/assoc')),
+         ('topicRef', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/role')),
+         ('topicRef', (mio.ITEM_IDENTIFIER, u'http://www.example.org/map#b'))],
+        _parse(data))
+
+
+def test_late_prefixes():
+    data = '''{"version": "1.1", "item_type": "topicmap",
+                 "topics": [{"subject_identifiers": ["[ex:a]"]}, {"item_identifiers": ["#b"]}],
+                 "associations": [{"type": "si:[ex:assoc]", "roles": [{"type": "si:[ex:role]", "player": "ii:#b"}]}],
+                 "prefixes": {"ex": "http://www.example.org/"}}'''
+    # Members without QNames are reported immediately
+    eq_([('startTopic', (mio.ITEM_IDENTIFIER, u'http://www.example.org/map#b')),
+         ('startTopic', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/a')),
+         ('topicRef', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/assoc')),
+         ('topicRef', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/role')),
+         ('topicRef', (mio.ITEM_IDENTIFIER, u'http://www.example.org/map#b'))],
+        _parse(data))
+
+
+def test_fragment():
+    data = '''{"version": "1.1", "instance_of": ["si:[ex:type]"], "item_type": "topic",
+                 "prefixes": {"ex": "http://www.example.org/"}, "subject_identifiers": ["[ex:a]"]}'''
+    eq_([('startTopic', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/a')),
+         ('topicRef', (mio.SUBJECT_IDENTIFIER, u'http://www.example.org/type'))],
+        _parse(data))
+
+
+def test_invalid_streaming():
+    @raises(mio.MIOException)
+    def check(data):
+        _parse(data)
+    data = (
+        # Prefixes in 1.0
+        '''{"version": "1.0", "item_type": "topicmap", "prefixes": {"ex": "http://www.example.org/"}}''',
+        # Undeclared prefix
+        '''{"version": "1.1", "item_type": "topicmap", "topics": [{"subject_identifiers": ["[ex:a]"]}],
+              "prefixes": {"x": "http://www.example.org/"}}''',
+        '''{"version": "1.1", "item_type": "topicmap", "topics": [{"subject_identifiers": ["[ex:a]"]}]}''',
+        '''{"version": "1.1", "item_type": "topicmap", "prefixes": {"xsd": "http://www.example.org/"}}''',
+        '''{"version": "2.0", "item_type": "topicmap"}''',
+        '''{"version": "1.0", "item_type": "role"}''',
+        '''{"version": "1.0"}''',
+    )
+    for d in data:
+        yield check, d
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
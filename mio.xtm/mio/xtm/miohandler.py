@@ -50,7 +50,7 @@ class XTM21Handler(mio_handler.HamsterMapHandler):
         SUBJECT_LOCATOR: u'subjectLocator'
     }
 
-    def __init__(self, writer=None, fileobj=None, encoding='utf-8', prettify=False):
+    def __init__(self, writer=None, fileobj=None, encoding='utf-8', prettify=False, compress=False):
         """\
 
         `writer`
@@ -62,6 +62,9 @@ class XTM21Handler(mio_handler.HamsterMapHandler):
         `prettify`
             Indicates if the XML should be prettified or written in one line (default)
             (ignored iff `writer` is provided)
+        `compress`
+            Indicates if the output should be gzip compressed (default: ``False``)
+            (ignored iff `writer` is provided)
 
         >>> import io
         >>> out = io.BytesIO()
@@ -84,7 +87,7 @@ class XTM21Handler(mio_handler.HamsterMapHandler):
         '<?xml version="1.0" encoding="utf-8" standalone="yes"?>\\n<topicMap xmlns="http://www.topicmaps.org/xtm/" version="2.1">\\n  <topic>\\n    <subjectIdentifier href="http://psi.example.org/something"/>\\n  </topic>\\n</topicMap>\\n'
         """
         super(XTM21Handler, self).__init__()
-        self._out = writer if writer else XMLWriter(fileobj, encoding, prettify)
+        self._out = writer if writer else XMLWriter(fileobj, encoding, prettify, compress)
         self._state = _STATE_ILLEGAL
         self._last_topic = None
         # Optional properties
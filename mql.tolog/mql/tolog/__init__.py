@@ -17,8 +17,18 @@ from functools import partial
 from urllib2 import urlopen
 from tm import make_source, plyutils, xmlutils
 from . import lexer as lexer_mod, parser as parser_mod, handler as handler_mod, xsl
+from .utils import LRUCache
 
-__all__ = ('parse', 'parse_query')
+__all__ = ('parse', 'parse_query', 'query_cache_info', 'clear_query_cache',
+           'set_query_cache_size')
+
+# Max. number of cached queries (c.f. `parse_query`). Each query may occupy 
+# two entries: one keyed by the query string and one by the canonicalized query
+QUERY_CACHE_SIZE = 512
+
+_C14N = u'query-c14n'
+
+_cache = LRUCache(QUERY_CACHE_SIZE)
 
 
 def parse(src, handler, tolog_plus=False, **kw):
@@ -37,14 +47,14 @@ def parse(src, handler, tolog_plus=False, **kw):
         tolog+ mode is enabled automatically, regardless of the provided
         `tolog_plus` value
     """
-    parser = plyutils.make_parser(parser_mod)
-    parser_mod.initialize_parser(parser, handler, tolog_plus)
     source = make_source(src, kw.get('iri'))
     data = source.stream or urlopen(source.iri)
     handler.base_iri = source.iri
     handler.start()
-    lexer = _make_lexer(tolog_plus)
-    parser.parse(data.read(), lexer=lexer)
+    with plyutils.pooled_parser(parser_mod) as parser, plyutils.pooled_lexer(lexer_mod) as lexer:
+        parser_mod.initialize_parser(parser, handler, tolog_plus)
+        lexer.tolog_plus = tolog_plus
+        parser.parse(data.read(), lexer=lexer)
     handler.end()
 
 
@@ -62,7 +72,7 @@ def _make_lexer(tolog_plus):
     return lexer
 
 
-def parse_query(src, query_handler=None, factory=None, tolog_plus=False, optimizers=None, **kw):
+def parse_query(src, query_handler=None, factory=None, tolog_plus=False, optimizers=None, cache=True, **kw):
     """\
     Parses and optimizes the query and returns an executable query.
     
@@ -71,6 +81,11 @@ def parse_query(src, query_handler=None, factory=None, tolog_plus=False, optimiz
     the factory argument will be ignored. If the `factory` is provided and
     the `handler` is ``None``, a default handler will be used which utilizes
     the provided factory to create the query.
+
+    Queries which are created by the default handler/factory combination are
+    cached (keyed by the query string, resp. the canonicalized query, the 
+    optimizers and the base IRI) and shared, the query parameters are bound 
+    at execution time (c.f. `query_cache_info`).
     
     `src`
         A string, a file object or a `tm.Source` instance to read the query from.
@@ -90,17 +105,72 @@ def parse_query(src, query_handler=None, factory=None, tolog_plus=False, optimiz
         the parsed provided query. If the optimizers are not provided,
         a default set of optimizers will be applied to the query.
         To omit any optimization, an empty iterable must be provided.
+    `cache`
+        Indicates if the query cache should be used (enabled by default).
     """
-    query_handler = query_handler or handler_mod.make_queryhandler(factory)
     source = make_source(src, iri=kw.get('iri'))
-    query_handler.base_iri = source.iri
     if optimizers is None:
         optimizers = xsl.DEFAULT_TRANSFORMERS
-    xsl.apply_transformations(parse_to_etree(source, tolog_plus, **kw), optimizers,
+    if query_handler or factory or not cache or _cache.maxsize <= 0:
+        return _parse_query(parse_to_etree(source, tolog_plus, **kw), source.iri,
+                            query_handler or handler_mod.make_queryhandler(factory),
+                            optimizers)
+    optimizers = tuple(optimizers)
+    data = (source.stream or urlopen(source.iri)).read()
+    key = data, tolog_plus, optimizers, source.iri
+    # A miss is counted iff the canonicalized query is not cached either
+    query = _cache.get(key, count_miss=False)
+    if query is not None:
+        return query
+    kw['iri'] = source.iri
+    doc = parse_to_etree(data, tolog_plus, **kw)
+    if optimizers[:1] == (_C14N,):
+        doc = xsl.apply_transformation(doc, _C14N)
+        optimizers = optimizers[1:]
+    c14n_key = xsl.tostring(doc), optimizers, source.iri
+    query = _cache.get(c14n_key)
+    if query is None:
+        query = _parse_query(doc, source.iri, handler_mod.make_queryhandler(), optimizers)
+        _cache.put(c14n_key, query)
+    _cache.put(key, query)
+    return query
+
+
+def _parse_query(doc, base, query_handler, optimizers):
+    """\
+    Optimizes the query etree and returns the query created by the 
+    `query_handler`.
+    """
+    query_handler.base_iri = base
+    xsl.apply_transformations(doc, optimizers,
                               partial(xsl.saxify, handler=handler_mod.SAXMediator(query_handler)))
     return query_handler.query
 
 
+def query_cache_info():
+    """\
+    Returns a dict with the statistics of the `parse_query` cache:
+    ``hits``, ``misses``, ``size`` (the number of cache entries) and 
+    ``maxsize``.
+    """
+    return _cache.info()
+
+
+def clear_query_cache():
+    """\
+    Clears the cache of `parse_query` and resets the statistics.
+    """
+    _cache.clear()
+
+
+def set_query_cache_size(size):
+    """\
+    Sets the max. number of entries of the `parse_query` cache. 
+    ``0`` disables the cache.
+    """
+    _cache.resize(size)
+
+
 def parse_to_etree(src, tolog_plus=False, **kw):
     """\
     Returns the provided query as Etree.
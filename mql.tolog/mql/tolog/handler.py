@@ -15,7 +15,8 @@ tolog handler implementations.
 from __future__ import absolute_import
 import logging
 import xml.sax as sax
-from . import consts
+from tm import mql
+from . import consts, query as query_mod
 
 
 class TologHandler(object):
@@ -24,6 +25,288 @@ class TologHandler(object):
     """
 
 
+def make_queryhandler(factory=None):
+    """\
+    Returns a `mql.tolog.interfaces.IQueryHandler` which utilizes the
+    provided `factory`.
+
+    `factory`
+        A `mql.tolog.interfaces.IQueryFactory` or ``None``. If the factory
+        is ``None``, a `mql.tolog.query.QueryFactory` is used.
+    """
+    return QueryHandler(factory or query_mod.QueryFactory())
+
+
+class QueryHandler(TologHandler):
+    """\
+    Handler which creates a query via an `IQueryFactory`.
+
+    The handler expects the events issued by the `SAXMediator`.
+    """
+    def __init__(self, factory):
+        """\
+
+        `factory`
+            A `mql.tolog.interfaces.IQueryFactory` instance.
+        """
+        self._factory = factory
+        self.base_iri = None
+        self.query = None
+
+    def start(self):
+        self.query = None
+        self._frames = [({}, [])]
+        self._prefixes = {}
+        self._rules = {}
+        self._where = ()
+        self._order_by = None
+        self._limit = None
+        self._offset = None
+
+    def end(self):
+        pass
+
+    def _push(self, kind, **info):
+        info['kind'] = kind
+        self._frames.append((info, []))
+
+    def _pop(self):
+        return self._frames.pop()
+
+    def _emit(self, item):
+        self._frames[-1][1].append(item)
+
+    def _unsupported(self, *args, **kw):
+        raise mql.InvalidQueryError('Only "select" queries are supported')
+
+    startInsert = startDelete = startUpdate = startMerge = startLoad = \
+    startCreate = startDrop = startFrom = startInto = startFragment = _unsupported
+
+    def base(self, iri):
+        self.base_iri = self._factory.resolve_iri(self.base_iri, iri)
+
+    def xdirective(self, name, iri):
+        pass
+
+    def namespace(self, identifier, iri, kind):
+        self._prefixes[identifier] = iri
+
+    def startSelect(self):
+        self._push(u'select')
+
+    def endSelect(self):
+        _, header = self._pop()
+        self.query = self._factory.create_select_query(header, self._where,
+                                                       self._order_by,
+                                                       self._limit, self._offset,
+                                                       rules=self._rules,
+                                                       base=self.base_iri)
+
+    def startWhere(self):
+        self._push(u'where')
+
+    def endWhere(self):
+        _, self._where = self._pop()
+
+    def startOrderby(self):
+        self._push(u'orderby')
+
+    def endOrderby(self):
+        _, self._order_by = self._pop()
+
+    def ascending(self, name):
+        self._emit((name, consts.ASC))
+
+    def descending(self, name):
+        self._emit((name, consts.DESC))
+
+    def startPagination(self):
+        pass
+
+    def endPagination(self):
+        pass
+
+    def limit(self, value):
+        self._limit = int(value)
+
+    def offset(self, value):
+        self._offset = int(value)
+
+    def startRule(self, name, variables):
+        self._push(u'rule', name=name, params=variables)
+
+    def endRule(self):
+        info, body = self._pop()
+        name = info['name']
+        self._rules[name] = self._factory.create_rule(name, info['params'], body)
+
+    def startBuiltinPredicate(self, name, costs=None, hints=None):
+        self._push(u'builtin', name=name, hints=hints)
+
+    def endBuiltinPredicate(self):
+        info, args = self._pop()
+        self._emit(self._factory.create_builtin_predicate(info['name'], args, info['hints']))
+
+    def startInternalPredicate(self, name, removed_variables=None, costs=None, hints=None):
+        self._push(u'internal', name=name, hints=hints)
+
+    def endInternalPredicate(self):
+        info, args = self._pop()
+        pred = self._factory.create_internal_predicate(info['name'], args, info['hints'])
+        if pred is None:
+            raise mql.InvalidQueryError('Unsupported internal predicate "%s"' % info['name'])
+        self._emit(pred)
+
+    def startInfixPredicate(self, name, costs=None, hints=None):
+        self._push(u'infix', name=name, hints=hints)
+
+    def endInfixPredicate(self):
+        info, (lh, rh) = self._pop()
+        self._emit(self._factory.create_infix_predicate(info['name'], lh, rh, info['hints']))
+
+    def startAssociationPredicate(self, costs=None):
+        self._push(u'association')
+
+    def endAssociationPredicate(self):
+        info, roles = self._pop()
+        self._emit(self._factory.create_association_predicate(self._topic_ref(info['name']), roles))
+
+    def startDynamicPredicate(self, costs=None):
+        self._push(u'dynamic')
+
+    def endDynamicPredicate(self):
+        info, args = self._pop()
+        if len(args) != 2:
+            raise mql.InvalidQueryError('Unknown predicate "%s"' % info['name'])
+        self._emit(self._factory.create_dynamic_occurrence_predicate(self._topic_ref(info['name']), *args))
+
+    def startPredicate(self, costs=None):
+        self._push(u'predicate')
+
+    def endPredicate(self):
+        info, args = self._pop()
+        self._emit(self._factory.create_predicate(info['name'], args))
+
+    def startName(self):
+        self._push(u'name')
+
+    def endName(self):
+        _, (name,) = self._pop()
+        self._frames[-1][0]['name'] = name
+
+    def startPair(self):
+        self._push(u'pair')
+
+    def endPair(self):
+        _, (type, player) = self._pop()
+        self._emit((type, player))
+
+    def startType(self):
+        pass
+
+    endType = startPlayer = endPlayer = startType
+
+    def startNot(self):
+        self._push(u'not')
+
+    def endNot(self):
+        _, clauses = self._pop()
+        self._emit(self._factory.create_not(clauses))
+
+    def startOr(self):
+        self._push(u'or')
+
+    def endOr(self):
+        _, branches = self._pop()
+        short_circuit = any(sc for sc, _ in branches)
+        self._emit(self._factory.create_or([clauses for _, clauses in branches], short_circuit))
+
+    def startBranch(self, short_circuit=False):
+        self._push(u'branch', short_circuit=short_circuit)
+
+    def endBranch(self):
+        info, clauses = self._pop()
+        self._emit((info['short_circuit'], clauses))
+
+    def _topic_ref(self, name):
+        if isinstance(name, basestring):
+            return self._identifier(name)
+        return name
+
+    def _identifier(self, value):
+        factory = self._factory
+        return factory.create_item_identifier(factory.resolve_iri(self.base_iri, u'#' + value))
+
+    def _resolve(self, iri):
+        return self._factory.resolve_iri(self.base_iri, iri)
+
+    def variable(self, name):
+        self._emit(self._factory.create_variable(name))
+
+    def count(self, name):
+        self._emit(self._factory.create_count(name))
+
+    def parameter(self, name):
+        self._emit(self._factory.create_parameter(name))
+
+    def identifier(self, value):
+        if self._frames[-1][0]['kind'] == u'name':
+            # Predicate name, may refer to a rule
+            self._emit(value)
+        else:
+            self._emit(self._identifier(value))
+
+    def objectid(self, value):
+        self._emit(self._factory.create_object_id(value))
+
+    def iri(self, value):
+        self._emit(self._factory.create_subject_identifier(self._resolve(value)))
+
+    def subjectidentifier(self, value):
+        self._emit(self._factory.create_subject_identifier(self._resolve(value)))
+
+    def subjectlocator(self, value):
+        self._emit(self._factory.create_subject_locator(self._resolve(value)))
+
+    def itemidentifier(self, value):
+        self._emit(self._factory.create_item_identifier(self._resolve(value)))
+
+    def string(self, value):
+        self._emit(self._factory.create_string(value))
+
+    def integer(self, value):
+        self._emit(self._factory.create_integer(value))
+
+    def decimal(self, value):
+        self._emit(self._factory.create_decimal(value))
+
+    def date(self, value):
+        self._emit(self._factory.create_date(value))
+
+    def datetime(self, value):
+        self._emit(self._factory.create_datetime(value))
+
+    def curie(self, kind, prefix, localpart):
+        if kind == consts.MODULE:
+            # Module function, i.e. str:contains
+            self._emit(u'%s:%s' % (prefix, localpart))
+            return
+        try:
+            iri = self._factory.create_iri(self._prefixes[prefix] + localpart)
+        except KeyError:
+            raise mql.InvalidQueryError('Undefined prefix "%s"' % prefix)
+        factory = self._factory
+        if kind == consts.SID:
+            ref = factory.create_subject_identifier(iri)
+        elif kind == consts.SLO:
+            ref = factory.create_subject_locator(iri)
+        else:
+            ref = factory.create_item_identifier(iri)
+        self._emit(ref)
+
+    qname = curie
+
+
 class NoopParserHandler(TologHandler):
     """\
     A ParserHandler which does nothing.
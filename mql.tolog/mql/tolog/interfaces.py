@@ -558,9 +558,20 @@ class IQueryFactory(Interface):
              as target IRI, too.
         """
     
-    def create_select_query(header, where, order_by=None, limit=None, offset=None):
+    def create_select_query(header, where, order_by=None, limit=None, offset=None, rules=None, base=None):
         """\
         
+        `header`
+            An iterable of variables and count expressions.
+        `where`
+            An iterable of predicates, built-in predicates, infix predicates etc.
+        `order_by`
+            An optional iterable of (variable name, direction) tuples where
+            direction is either ``consts.ASC`` or ``consts.DESC``.
+        `rules`
+            An optional mapping of rule names to rules (c.f. `create_rule`).
+        `base`
+            The base IRI of the query.
         """
 
     def create_insert_query(variables, fragment, where, order_by=None, limit=None, offset=None):
@@ -739,6 +750,22 @@ class IQueryFactory(Interface):
             An object created by `create_iri` or `resolve_iri`.
         """
 
+    def create_object_id(ident):
+        """\
+        Creates a reference to a Topic Maps construct by its internal identifier.
+
+        `ident`
+            A string representing the object id (without ``@`` prefix).
+        """
+
+    def create_parameter(name):
+        """\
+        Creates a parameter.
+
+        `name`
+            A string representing a parameter name (without ``%`` delimiters).
+        """
+
     def create_variable(name):
         """\
         Creates a variable.
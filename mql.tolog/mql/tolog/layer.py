@@ -14,8 +14,16 @@
 """
 from __future__ import absolute_import
 from abc import abstractmethod, ABCMeta
-from tm import ANY, mql
-from itertools import chain
+from tm import ANY, TMDM, mql
+from itertools import chain, ifilter, tee
+
+def _distinct(iterable):
+    seen = set()
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
 
 #TODO: This shouldn't belong to the mql.tolog package but to the generic mql package
 class TopicMapLayer(object):
@@ -113,7 +121,7 @@ class TopicMapLayer(object):
         `iid`
             An IRI.
         """
-        obj = self.get_object_by_item_identifier(iid)
+        obj = self.get_construct_by_item_identifier(iid)
         return obj if self.is_name(obj) else None
 
     def get_variant_by_item_identifier(self, iid):
@@ -320,6 +328,25 @@ class TopicMapLayer(object):
         Returns an iterable of variants which have the provided value/datatype.
         """
 
+    def get_occurrences_by_range(self, datatype, lower=None, upper=None, types=ANY,
+                                 include_lower=True, include_upper=True):
+        """\
+        Returns an iterable of occurrences with the provided `datatype` and a
+        value within the range ``[lower, upper]`` (ordered by their values)
+        or ``None`` if the layer does not support range lookups for the
+        `datatype`.
+
+        `lower`, `upper`
+            The bounds in the lexical representation of the `datatype`
+            or ``None`` (unbounded).
+        `types`
+            An iterable of occurrence types or ``ANY``.
+        `include_lower`, `include_upper`
+            Indicates if occurrences with a value equal to the bound are
+            included.
+        """
+        return None
+
     @abstractmethod
     def get_topic_direct_types(self):
         """\
@@ -358,6 +385,172 @@ class TopicMapLayer(object):
         Returns an iterable of name types.
         """
 
+    @abstractmethod
+    def get_type(self, typed):
+        """\
+        Returns the type of an association, role, occurrence, or name.
+        """
+
+    @abstractmethod
+    def get_types(self, topic):
+        """\
+        Returns an iterable of the direct types of the provided `topic`.
+        """
+
+    @abstractmethod
+    def get_scope(self, scoped):
+        """\
+        Returns an iterable of themes of an association, occurrence, name,
+        or variant.
+        """
+
+    @abstractmethod
+    def get_value(self, tmc):
+        """\
+        Returns the value (a string) of an occurrence, name, or variant.
+        """
+
+    @abstractmethod
+    def get_datatype(self, tmc):
+        """\
+        Returns the datatype (an IRI) of an occurrence or variant.
+        """
+
+    @abstractmethod
+    def get_player(self, role):
+        """\
+        Returns the player of the provided `role`.
+        """
+
+    def get_supertypes(self, topic):
+        """\
+        Returns an iterable of all (transitive) supertypes of `topic`.
+
+        The default implementation walks the ``supertype-subtype``
+        associations.
+        """
+        return self._walk_type_hierarchy(topic, TMDM.subtype, TMDM.supertype)
+
+    def get_subtypes(self, topic):
+        """\
+        Returns an iterable of all (transitive) subtypes of `topic`.
+
+        The default implementation walks the ``supertype-subtype``
+        associations.
+        """
+        return self._walk_type_hierarchy(topic, TMDM.supertype, TMDM.subtype)
+
+    def _walk_type_hierarchy(self, topic, role_sid, other_role_sid):
+        assoc_type = self.get_topic_by_subject_identifier(TMDM.supertype_subtype)
+        role_type = self.get_topic_by_subject_identifier(role_sid)
+        other_role_type = self.get_topic_by_subject_identifier(other_role_sid)
+        if assoc_type is None or role_type is None or other_role_type is None:
+            return
+        seen = set([topic])
+        todo = [topic]
+        while todo:
+            for role in self.get_roles_played(todo.pop(), (role_type,)):
+                assoc = self.get_parent(role)
+                if self.get_type(assoc) != assoc_type:
+                    continue
+                for other in self.get_roles(assoc, (other_role_type,)):
+                    player = self.get_player(other)
+                    if player not in seen:
+                        seen.add(player)
+                        todo.append(player)
+                        yield player
+
+    def get_instances(self, type, direct=False):
+        """\
+        Returns an iterable of topics which are instances of `type`.
+
+        `type`
+            The type.
+        `direct`
+            If ``True``, only the direct instances are returned, otherwise
+            the instances of the subtypes of `type` are returned, too.
+        """
+        if direct:
+            return self.get_topics((type,))
+        return _distinct(chain(self.get_topics((type,)),
+                                    chain.from_iterable(self.get_topics((subtype,))
+                                                        for subtype in self.get_subtypes(type))))
+
+    def get_typed(self, type, kinds=ANY):
+        """\
+        Returns an iterable of associations, roles, occurrences, and names
+        which have the provided `type`.
+
+        `kinds`
+            An iterable of strings (``association``, ``role``, ``occurrence``,
+            ``name``) or ``ANY`` to restrict the kind of the returned
+            Topic Maps constructs.
+        """
+        types = (type,)
+        res = []
+        if kinds is ANY or u'association' in kinds:
+            res.append(self.get_associations(types))
+        if kinds is ANY or u'role' in kinds:
+            res.append(chain.from_iterable(self.get_roles(assoc, types)
+                                           for assoc in self.get_associations()))
+        if kinds is ANY or u'occurrence' in kinds:
+            res.append(chain.from_iterable(self.get_occurrences(topic, types)
+                                           for topic in self.get_topics()))
+        if kinds is ANY or u'name' in kinds:
+            res.append(chain.from_iterable(self.get_names(topic, types)
+                                           for topic in self.get_topics()))
+        return chain(*res)
+
+    def get_scoped(self, theme, kinds=ANY):
+        """\
+        Returns an iterable of associations, occurrences, names, and variants
+        which have `theme` in their scope.
+
+        `kinds`
+            An iterable of strings (``association``, ``occurrence``,
+            ``name``, ``variant``) or ``ANY`` to restrict the kind of the
+            returned Topic Maps constructs.
+        """
+        candidates = []
+        if kinds is ANY or u'association' in kinds:
+            candidates.append(self.get_associations())
+        if kinds is ANY or u'occurrence' in kinds:
+            candidates.append(chain.from_iterable(self.get_occurrences(topic)
+                                                  for topic in self.get_topics()))
+        if kinds is ANY or u'name' in kinds or u'variant' in kinds:
+            names = chain.from_iterable(self.get_names(topic) for topic in self.get_topics())
+            if kinds is ANY or u'variant' in kinds:
+                names, names_of_variants = tee(names)
+                candidates.append(chain.from_iterable(self.get_variants(name)
+                                                      for name in names_of_variants))
+            if kinds is ANY or u'name' in kinds:
+                candidates.append(names)
+        return ifilter(lambda scoped: theme in self.get_scope(scoped), chain(*candidates))
+
+    def get_statistics(self):
+        """\
+        Returns the statistics of the topic map or ``None`` if no statistics
+        are available.
+
+        The statistics are used by the query planner to estimate the number
+        of results of a predicate. The returned object must provide the
+        following methods which return integers:
+
+        ``topic_count(type=ANY)``
+            The number of topics or the number of direct instances of `type`.
+        ``association_count(type=ANY)``, ``role_count(type=ANY)``, ``occurrence_count(type=ANY)``, ``name_count(type=ANY)``
+            The number of associations, roles, occurrences and names (of `type`).
+        ``variant_count()``
+            The number of variants.
+        ``theme_count(theme)``
+            The number of scoped constructs which have `theme` in their scope.
+        ``datatype_count(datatype)``
+            The number of constructs with a value of the provided `datatype`.
+        ``value_count(value, datatype)``
+            The number of constructs with the provided value and datatype.
+        """
+        return None
+
     def is_parent_of(self, parent, child):
         """\
         Returns if `parent` is the parent of `child`.
@@ -435,6 +628,75 @@ class AdvancedTopicMapLayer(TopicMapLayer):
             raise mql.InvalidQueryError()  #TODO: Msg.
         return topic
         
+    def get_construct_by_id(self, tmc_id):
+        return self._layer.get_construct_by_id(tmc_id)
+
+    def get_construct_id(self, tmc):
+        return self._layer.get_construct_id(tmc)
+
+    def get_parent(self, tmc):
+        return self._layer.get_parent(tmc)
+
+    def get_topicmap(self):
+        return self._layer.get_topicmap()
+
+    def get_topics(self, types=ANY):
+        return self._layer.get_topics(types)
+
+    def get_associations(self, types=ANY, scope=ANY):
+        return self._layer.get_associations(types, scope)
+
+    def get_variants(self, name, scope=ANY):
+        return self._layer.get_variants(name, scope)
+
+    def get_roles(self, assoc, types=ANY):
+        return self._layer.get_roles(assoc, types)
+
+    def get_item_identifiers(self, tmc):
+        return self._layer.get_item_identifiers(tmc)
+
+    def get_reifier(self, reified):
+        return self._layer.get_reifier(reified)
+
+    def get_reified(self, reifier):
+        return self._layer.get_reified(reifier)
+
+    def get_type(self, typed):
+        return self._layer.get_type(typed)
+
+    def get_types(self, topic):
+        return self._layer.get_types(topic)
+
+    def get_scope(self, scoped):
+        return self._layer.get_scope(scoped)
+
+    def get_value(self, tmc):
+        return self._layer.get_value(tmc)
+
+    def get_datatype(self, tmc):
+        return self._layer.get_datatype(tmc)
+
+    def get_player(self, role):
+        return self._layer.get_player(role)
+
+    def get_supertypes(self, topic):
+        return self._layer.get_supertypes(topic)
+
+    def get_subtypes(self, topic):
+        return self._layer.get_subtypes(topic)
+
+    def get_instances(self, type, direct=False):
+        return self._layer.get_instances(type, direct)
+
+    def get_typed(self, type, kinds=ANY):
+        return self._layer.get_typed(type, kinds)
+
+    def get_scoped(self, theme, kinds=ANY):
+        return self._layer.get_scoped(theme, kinds)
+
+    def get_statistics(self):
+        return self._layer.get_statistics()
+
     def get_occurrences(self, tmc, types=ANY, scope=ANY):
         topic = self._topic(tmc)
         return () if not topic else self._layer.get_occurrences(topic, types, scope)
@@ -467,6 +729,11 @@ class AdvancedTopicMapLayer(TopicMapLayer):
     def get_variants_by_value(self, value, datatype):
         return self._layer.get_variants_by_value(value, datatype)
 
+    def get_occurrences_by_range(self, datatype, lower=None, upper=None, types=ANY,
+                                 include_lower=True, include_upper=True):
+        return self._layer.get_occurrences_by_range(datatype, lower, upper, types,
+                                                    include_lower, include_upper)
+
     def get_topic_direct_types(self):
         return self._layer.get_topic_direct_types()
 
@@ -502,6 +769,9 @@ class AdvancedTopicMapLayer(TopicMapLayer):
             res = is_expected_type(reified) if reified is not None else None
         return res
 
+    def is_topic(self, obj):
+        return self._layer.is_topic(obj)
+
     def is_topicmap(self, obj):
         return self._is(obj, self._layer.is_topicmap)
 
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+`TopicMapLayer` implementation for Mappa topic maps.
+
+The layer utilizes the indexes of the topic map (``topicmap.index``) for
+type, scope and value lookups and provides the statistics of the indexes
+to the query planner.
+
+.. Note:: This module requires Mappa.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+from __future__ import absolute_import
+from itertools import chain
+from tm import ANY
+from mappa import Literal, utils
+from .layer import TopicMapLayer, _distinct
+
+__all__ = ['MappaTopicMapLayer']
+
+
+def _filter_type(typed, types):
+    if types is ANY:
+        return typed
+    return (tmc for tmc in typed if tmc.type in types)
+
+
+def _filter_scope(scoped, scope):
+    if scope is ANY:
+        return scoped
+    scope = frozenset(scope)
+    return (tmc for tmc in scoped if frozenset(tmc.scope) == scope)
+
+
+class MappaTopicMapLayer(TopicMapLayer):
+    """\
+    Layer which operates on a Mappa topic map.
+    """
+    def __init__(self, topicmap):
+        """\
+
+        `topicmap`
+            A Mappa topic map.
+        """
+        self._tm = topicmap
+
+    def get_topicmap(self):
+        return self._tm
+
+    def get_topic_by_subject_identifier(self, sid):
+        return self._tm.topic_by_sid(sid)
+
+    def get_topic_by_subject_locator(self, slo):
+        return self._tm.topic_by_slo(slo)
+
+    def get_construct_by_item_identifier(self, iid):
+        return self._tm.construct_by_iid(iid)
+
+    def get_construct_by_id(self, tmc_id):
+        tmc = self._tm.construct_by_id(tmc_id)
+        if tmc is None and isinstance(tmc_id, basestring) and tmc_id.isdigit():
+            tmc = self._tm.construct_by_id(int(tmc_id))
+        return tmc
+
+    def get_construct_id(self, tmc):
+        return tmc.id
+
+    def get_parent(self, tmc):
+        return tmc.parent
+
+    def get_topics(self, types=ANY):
+        if types is ANY:
+            return self._tm.topics
+        idx = self._tm.index.type_instance
+        return _distinct(chain.from_iterable(idx.topics(typ) for typ in types))
+
+    def get_associations(self, types=ANY, scope=ANY):
+        if types is ANY:
+            assocs = self._tm.associations
+        else:
+            idx = self._tm.index.type_instance
+            assocs = chain.from_iterable(idx.associations(typ) for typ in types)
+        return _filter_scope(assocs, scope)
+
+    def get_occurrences(self, topic, types=ANY, scope=ANY):
+        return _filter_scope(_filter_type(topic.occurrences, types), scope)
+
+    def get_names(self, topic, types=ANY, scope=ANY):
+        return _filter_scope(_filter_type(topic.names, types), scope)
+
+    def get_variants(self, name, scope=ANY):
+        return _filter_scope(name.variants, scope)
+
+    def get_roles_played(self, topic, types=ANY):
+        return _filter_type(topic.roles_played, types)
+
+    def get_roles(self, assoc, types=ANY):
+        return _filter_type(assoc.roles, types)
+
+    def get_subject_identifiers(self, topic):
+        return topic.sids
+
+    def get_subject_locators(self, topic):
+        return topic.slos
+
+    def get_item_identifiers(self, tmc):
+        return tmc.iids
+
+    def get_reifier(self, reified):
+        return reified.reifier
+
+    def get_reified(self, reifier):
+        return reifier.reified
+
+    def get_type(self, typed):
+        return typed.type
+
+    def get_types(self, topic):
+        return topic.types
+
+    def get_scope(self, scoped):
+        return scoped.scope
+
+    def get_value(self, tmc):
+        return tmc.value
+
+    def get_datatype(self, tmc):
+        return tmc.datatype
+
+    def get_player(self, role):
+        return role.player
+
+    def get_names_by_value(self, value):
+        return self._tm.index.literal.names(Literal(value))
+
+    def get_occurrences_by_value(self, value, datatype):
+        return self._tm.index.literal.occurrences(Literal(value, datatype))
+
+    def get_variants_by_value(self, value, datatype):
+        return self._tm.index.literal.variants(Literal(value, datatype))
+
+    def get_occurrences_by_range(self, datatype, lower=None, upper=None, types=ANY,
+                                 include_lower=True, include_upper=True):
+        idx = getattr(self._tm.index, 'range', None)
+        if idx is None:
+            return None
+        try:
+            return idx.occurrences(datatype, lower, upper, types, include_lower, include_upper)
+        except ValueError:
+            # Unsupported datatype
+            return None
+
+    def get_typed(self, type, kinds=ANY):
+        idx = self._tm.index.type_instance
+        res = []
+        if kinds is ANY or u'association' in kinds:
+            res.append(idx.associations(type))
+        if kinds is ANY or u'role' in kinds:
+            res.append(idx.roles(type))
+        if kinds is ANY or u'occurrence' in kinds:
+            res.append(idx.occurrences(type))
+        if kinds is ANY or u'name' in kinds:
+            res.append(idx.names(type))
+        return chain(*res)
+
+    def get_scoped(self, theme, kinds=ANY):
+        idx = self._tm.index.scoped
+        res = []
+        if kinds is ANY or u'association' in kinds:
+            res.append(idx.associations_by_theme(theme))
+        if kinds is ANY or u'occurrence' in kinds:
+            res.append(idx.occurrences_by_theme(theme))
+        if kinds is ANY or u'name' in kinds:
+            res.append(idx.names_by_theme(theme))
+        if kinds is ANY or u'variant' in kinds:
+            res.append(idx.variants_by_theme(theme))
+        return chain(*res)
+
+    def get_statistics(self):
+        return self._tm.index.statistics
+
+    def get_topic_direct_types(self):
+        return self._tm.index.type_instance.topic_types()
+
+    def get_topic_types(self):
+        types = self.get_topic_direct_types()
+        return _distinct(chain(types, chain.from_iterable(self.get_supertypes(typ) for typ in types)))
+
+    def get_association_types(self):
+        return self._tm.index.type_instance.association_types()
+
+    def get_role_types(self):
+        return self._tm.index.type_instance.role_types()
+
+    def get_occurrence_types(self):
+        return self._tm.index.type_instance.occurrence_types()
+
+    def get_name_types(self):
+        return self._tm.index.type_instance.name_types()
+
+    def is_instance_of(self, instance, type, scope=ANY):
+        return utils.isa(instance, type)
+
+    def is_topicmap(self, obj):
+        return utils.is_topicmap(obj)
+
+    def is_topic(self, obj):
+        return utils.is_topic(obj)
+
+    def is_association(self, obj):
+        return utils.is_association(obj)
+
+    def is_role(self, obj):
+        return utils.is_role(obj)
+
+    def is_occurrence(self, obj):
+        return utils.is_occurrence(obj)
+
+    def is_name(self, obj):
+        return utils.is_name(obj)
+
+    def is_variant(self, obj):
+        return utils.is_variant(obj)
@@ -0,0 +1,753 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Implementations of the tolog built-in predicates.
+
+Each built-in predicate is represented by a relation which operates on a
+`mql.tolog.layer.TopicMapLayer`. A binary relation provides a method to test
+if two values are related, methods to produce the values related to a bound
+value (``forward`` if the first argument is bound, ``backward`` if the second
+argument is bound) and a method to enumerate all pairs.
+
+Relations should utilize the (indexed) lookup methods of the layer for the
+``forward`` and ``backward`` methods. The ``enumerate`` method is only used
+if neither argument is bound.
+
+The ``estimate`` class methods return the estimated number of results of a
+relation based on the statistics of the topic map
+(c.f. `mql.tolog.layer.TopicMapLayer.get_statistics`). The query planner
+uses the estimates to order the predicates.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+from __future__ import absolute_import
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+from tm import ANY, XSD, mql
+
+__all__ = ['get_relation', 'is_equal', 'compare', 'sort_key',
+           'literals_for', 'constructs', 'BOUND']
+
+#: Indicates an argument which is bound to a value which is unknown at
+#: planning time (c.f. ``estimate``)
+BOUND = object()
+
+_ASSOC = u'association'
+_ROLE = u'role'
+_OCC = u'occurrence'
+_NAME = u'name'
+_VARIANT = u'variant'
+
+_TYPED_KINDS = (_ASSOC, _ROLE, _OCC, _NAME)
+_SCOPED_KINDS = (_ASSOC, _OCC, _NAME, _VARIANT)
+_VALUE_KINDS = (_OCC, _NAME, _VARIANT)
+_ALL_KINDS = (_ASSOC, _ROLE, _OCC, _NAME, _VARIANT)
+
+_NUMBERS = (int, long, float, Decimal)
+
+
+def _kinds(hints, applicable):
+    """\
+    Returns the kinds of Topic Maps constructs which are applicable for a
+    predicate, restricted by the optimizer's `hints`.
+    """
+    if not hints:
+        return applicable
+    return tuple(kind for kind in applicable if kind in hints)
+
+
+def constructs(layer, kinds=_ALL_KINDS):
+    """\
+    Returns an iterator over all Topic Maps constructs of the provided `kinds`.
+    """
+    want_roles = _ROLE in kinds
+    want_occs, want_names, want_vars = _OCC in kinds, _NAME in kinds, _VARIANT in kinds
+    if _ASSOC in kinds or want_roles:
+        for assoc in layer.get_associations():
+            if _ASSOC in kinds:
+                yield assoc
+            if want_roles:
+                for role in layer.get_roles(assoc):
+                    yield role
+    if want_occs or want_names or want_vars:
+        for topic in layer.get_topics():
+            if want_occs:
+                for occ in layer.get_occurrences(topic):
+                    yield occ
+            if want_names or want_vars:
+                for name in layer.get_names(topic):
+                    if want_names:
+                        yield name
+                    if want_vars:
+                        for variant in layer.get_variants(name):
+                            yield variant
+
+
+def _count(stats, kinds, type=ANY):
+    """\
+    Returns the number of Topic Maps constructs of the provided `kinds`.
+    """
+    res = 0
+    if _ASSOC in kinds:
+        res += stats.association_count(type)
+    if _ROLE in kinds:
+        res += stats.role_count(type)
+    if _OCC in kinds:
+        res += stats.occurrence_count(type)
+    if _NAME in kinds:
+        res += stats.name_count(type)
+    if _VARIANT in kinds and type is ANY:
+        res += stats.variant_count()
+    return res
+
+
+def _count_typed(count, types):
+    """\
+    Returns the result of `count` for all `types`.
+    """
+    if types is ANY or BOUND in types:
+        return count(ANY)
+    return sum(count(typ) for typ in types)
+
+
+def _avg(total, parents):
+    return float(total) / max(parents, 1)
+
+
+def _distinct(iterable):
+    seen = set()
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+def _is_one_of(layer, obj, kinds):
+    return (_ASSOC in kinds and layer.is_association(obj)) \
+            or (_ROLE in kinds and layer.is_role(obj)) \
+            or (_OCC in kinds and layer.is_occurrence(obj)) \
+            or (_NAME in kinds and layer.is_name(obj)) \
+            or (_VARIANT in kinds and layer.is_variant(obj))
+
+
+def literals_for(value):
+    """\
+    Returns an iterable of (value, datatype) tuples which may represent
+    the provided Python value.
+
+    Strings match string literals and IRIs.
+    """
+    if isinstance(value, bool):
+        return (((u'true' if value else u'false'), XSD.boolean),)
+    if isinstance(value, (int, long)):
+        return ((unicode(value), XSD.integer),)
+    if isinstance(value, Decimal):
+        return ((unicode(value), XSD.decimal),)
+    if isinstance(value, float):
+        return ((unicode(value), XSD.float),)
+    value = unicode(value)
+    return ((value, XSD.string), (value, XSD.anyURI))
+
+
+def _coerce(a, b):
+    """\
+    Converts a string into a number if the other value is a number.
+    """
+    if isinstance(a, _NUMBERS) and isinstance(b, basestring):
+        try:
+            return a, type(a)(b)
+        except (ValueError, InvalidOperation):
+            return a, b
+    if isinstance(b, _NUMBERS) and isinstance(a, basestring):
+        b, a = _coerce(b, a)
+    return a, b
+
+
+def is_equal(a, b):
+    """\
+    Returns if the provided values are equal.
+
+    If one value is a number and the other value is a string, the string
+    is converted into a number.
+    """
+    a, b = _coerce(a, b)
+    return a == b
+
+
+def compare(a, b):
+    """\
+    Compares the provided values (c.f. `is_equal`).
+    """
+    a, b = _coerce(a, b)
+    return cmp(a, b)
+
+
+def sort_key(layer, value):
+    """\
+    Returns a key to sort the provided value.
+
+    Numbers are sorted before strings and strings before Topic Maps constructs.
+    Topics are sorted by their names, other Topic Maps constructs with a value
+    by their values.
+    """
+    if value is None:
+        return (0,)
+    if isinstance(value, _NUMBERS):
+        return (1, value)
+    if isinstance(value, basestring):
+        return (2, value)
+    if layer.is_topic(value):
+        names = sorted(layer.get_value(name) for name in layer.get_names(value))
+        return (3, names[0] if names else u'', unicode(layer.get_construct_id(value)))
+    if layer.is_occurrence(value) or layer.is_name(value) or layer.is_variant(value):
+        return (3, layer.get_value(value), unicode(layer.get_construct_id(value)))
+    return (3, u'', unicode(layer.get_construct_id(value)))
+
+
+class BinaryRelation(object):
+    """\
+    Common base class of relations with two arguments.
+
+    Subclasses must implement at least `enumerate`.
+    """
+    #: Indicates which arguments are literal values (``True``) or
+    #: references to Topic Maps constructs (``False``)
+    literals = (False, False)
+
+    def __init__(self, layer, hints=None, types=ANY, base=None):
+        self.layer = layer
+        self.hints = hints
+        self.types = types
+        self.base = base
+
+    def test(self, x, y):
+        for val in self.forward(x):
+            if is_equal(val, y):
+                return True
+        return False
+
+    def forward(self, x):
+        return (b for a, b in self.enumerate() if a == x)
+
+    def backward(self, y):
+        return (a for a, b in self.enumerate() if is_equal(b, y))
+
+    def enumerate(self):
+        raise NotImplementedError()
+
+    def _has_type(self, typed):
+        return self.types is ANY or self.layer.get_type(typed) in self.types
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        """\
+        Returns the estimated number of results.
+
+        `stats`
+            The statistics of the topic map.
+        `x`, `y`
+            The values of the arguments, ``None`` if an argument is unbound or
+            `BOUND` if the argument is bound to a yet unknown value.
+        """
+        if x is not None or y is not None:
+            return 1
+        return stats.topic_count()
+
+
+class UnaryRelation(object):
+    """\
+    Common base class of relations with one argument.
+    """
+    literals = (False,)
+
+    def __init__(self, layer, hints=None, types=ANY, base=None):
+        self.layer = layer
+        self.hints = hints
+        self.base = base
+
+    def test(self, x):
+        for val in self.enumerate():
+            if is_equal(val, x):
+                return True
+        return False
+
+    def enumerate(self):
+        raise NotImplementedError()
+
+    @classmethod
+    def estimate(cls, stats, x, hints=None):
+        """\
+        Returns the estimated number of results (c.f. `BinaryRelation.estimate`).
+        """
+        return 1
+
+
+class _TopicRelation(UnaryRelation):
+    def test(self, x):
+        return self.layer.is_topic(x)
+
+    def enumerate(self):
+        return self.layer.get_topics()
+
+    @classmethod
+    def estimate(cls, stats, x, hints=None):
+        return 1 if x is not None else stats.topic_count()
+
+
+class _AssociationRelation(UnaryRelation):
+    def test(self, x):
+        return self.layer.is_association(x)
+
+    def enumerate(self):
+        return self.layer.get_associations()
+
+    @classmethod
+    def estimate(cls, stats, x, hints=None):
+        return 1 if x is not None else stats.association_count()
+
+
+class _TopicMapRelation(UnaryRelation):
+    def test(self, x):
+        return self.layer.is_topicmap(x)
+
+    def enumerate(self):
+        return (self.layer.get_topicmap(),)
+
+
+class _BaseLocatorRelation(UnaryRelation):
+    literals = (True,)
+
+    def enumerate(self):
+        return (self.base,) if self.base else ()
+
+
+class _InstanceOfRelation(BinaryRelation):
+    direct = False
+
+    def forward(self, topic):
+        layer = self.layer
+        if not layer.is_topic(topic):
+            return ()
+        types = layer.get_types(topic)
+        if self.direct:
+            return types
+        return _distinct(chain.from_iterable(chain((typ,), layer.get_supertypes(typ))
+                                             for typ in types))
+
+    def backward(self, type):
+        if not self.layer.is_topic(type):
+            return ()
+        return self.layer.get_instances(type, self.direct)
+
+    def enumerate(self):
+        return ((topic, typ) for topic in self.layer.get_topics() for typ in self.forward(topic))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        if y is None or y is BOUND:
+            return stats.topic_count()
+        return stats.topic_count(y)
+
+
+class _DirectInstanceOfRelation(_InstanceOfRelation):
+    direct = True
+
+
+class _TypeRelation(BinaryRelation):
+    def forward(self, typed):
+        kinds = _kinds(self.hints, _TYPED_KINDS)
+        return (self.layer.get_type(typed),) if _is_one_of(self.layer, typed, kinds) else ()
+
+    def backward(self, type):
+        return self.layer.get_typed(type, _kinds(self.hints, _TYPED_KINDS))
+
+    def enumerate(self):
+        get_type = self.layer.get_type
+        return ((typed, get_type(typed)) for typed in constructs(self.layer, _kinds(self.hints, _TYPED_KINDS)))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        kinds = _kinds(hints, _TYPED_KINDS)
+        if y is None or y is BOUND:
+            return _count(stats, kinds)
+        return _count(stats, kinds, y)
+
+
+class _ScopeRelation(BinaryRelation):
+    def forward(self, scoped):
+        kinds = _kinds(self.hints, _SCOPED_KINDS)
+        return self.layer.get_scope(scoped) if _is_one_of(self.layer, scoped, kinds) else ()
+
+    def backward(self, theme):
+        return self.layer.get_scoped(theme, _kinds(self.hints, _SCOPED_KINDS))
+
+    def enumerate(self):
+        get_scope = self.layer.get_scope
+        return ((scoped, theme) for scoped in constructs(self.layer, _kinds(self.hints, _SCOPED_KINDS))
+                    for theme in get_scope(scoped))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        if y is None or y is BOUND:
+            return _count(stats, _kinds(hints, _SCOPED_KINDS))
+        return stats.theme_count(y)
+
+
+class _ValueRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, tmc):
+        kinds = _kinds(self.hints, _VALUE_KINDS)
+        return (self.layer.get_value(tmc),) if _is_one_of(self.layer, tmc, kinds) else ()
+
+    def backward(self, value):
+        layer = self.layer
+        kinds = _kinds(self.hints, _VALUE_KINDS)
+        res = []
+        for value, datatype in literals_for(value):
+            if _NAME in kinds and datatype == XSD.string:
+                res.append(layer.get_names_by_value(value))
+            if _OCC in kinds:
+                res.append(layer.get_occurrences_by_value(value, datatype))
+            if _VARIANT in kinds:
+                res.append(layer.get_variants_by_value(value, datatype))
+        return chain(*res)
+
+    def enumerate(self):
+        get_value = self.layer.get_value
+        return ((tmc, get_value(tmc)) for tmc in constructs(self.layer, _kinds(self.hints, _VALUE_KINDS)))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        if y is None or y is BOUND:
+            return _count(stats, _kinds(hints, _VALUE_KINDS))
+        return sum(stats.value_count(value, datatype) for value, datatype in literals_for(y))
+
+
+class _DatatypeRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, tmc):
+        layer = self.layer
+        if layer.is_name(tmc):
+            return (XSD.string,)
+        if layer.is_occurrence(tmc) or layer.is_variant(tmc):
+            return (layer.get_datatype(tmc),)
+        return ()
+
+    def enumerate(self):
+        return ((tmc, dt) for tmc in constructs(self.layer, _kinds(self.hints, _VALUE_KINDS))
+                    for dt in self.forward(tmc))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        if y is None or y is BOUND:
+            return _count(stats, _kinds(hints, _VALUE_KINDS))
+        return stats.datatype_count(y)
+
+
+class _ResourceRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, tmc):
+        layer = self.layer
+        if (layer.is_occurrence(tmc) or layer.is_variant(tmc)) \
+                and layer.get_datatype(tmc) == XSD.anyURI:
+            return (layer.get_value(tmc),)
+        return ()
+
+    def backward(self, iri):
+        kinds = _kinds(self.hints, (_OCC, _VARIANT))
+        res = []
+        if _OCC in kinds:
+            res.append(self.layer.get_occurrences_by_value(iri, XSD.anyURI))
+        if _VARIANT in kinds:
+            res.append(self.layer.get_variants_by_value(iri, XSD.anyURI))
+        return chain(*res)
+
+    def enumerate(self):
+        return ((tmc, iri) for tmc in constructs(self.layer, _kinds(self.hints, (_OCC, _VARIANT)))
+                    for iri in self.forward(tmc))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        if y is None or y is BOUND:
+            return stats.datatype_count(XSD.anyURI)
+        return stats.value_count(y, XSD.anyURI)
+
+
+class _ChildRelation(BinaryRelation):
+    """\
+    Relation between a parent and its children.
+    """
+    def _children(self, parent):
+        raise NotImplementedError()
+
+    def _is_child(self, child):
+        raise NotImplementedError()
+
+    def _parents(self):
+        return self.layer.get_topics()
+
+    def forward(self, parent):
+        return self._children(parent)
+
+    def backward(self, child):
+        if not self._is_child(child):
+            return ()
+        return (self.layer.get_parent(child),)
+
+    def enumerate(self):
+        return ((parent, child) for parent in self._parents() for child in self._children(parent))
+
+    @classmethod
+    def _count_children(cls, stats, types):
+        raise NotImplementedError()
+
+    @classmethod
+    def _count_parents(cls, stats):
+        return stats.topic_count()
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if y is not None:
+            return 1
+        children = cls._count_children(stats, types)
+        if x is not None:
+            return _avg(children, cls._count_parents(stats))
+        return children
+
+
+class _TopicNameRelation(_ChildRelation):
+    def _children(self, topic):
+        if not self.layer.is_topic(topic):
+            return ()
+        return self.layer.get_names(topic, self.types)
+
+    def _is_child(self, name):
+        return self.layer.is_name(name) and self._has_type(name)
+
+    @classmethod
+    def _count_children(cls, stats, types):
+        return _count_typed(stats.name_count, types)
+
+
+class _OccurrenceRelation(_ChildRelation):
+    def _children(self, topic):
+        if not self.layer.is_topic(topic):
+            return ()
+        return self.layer.get_occurrences(topic, self.types)
+
+    def _is_child(self, occ):
+        return self.layer.is_occurrence(occ) and self._has_type(occ)
+
+    @classmethod
+    def _count_children(cls, stats, types):
+        return _count_typed(stats.occurrence_count, types)
+
+
+class _VariantRelation(_ChildRelation):
+    def _children(self, name):
+        if not self.layer.is_name(name):
+            return ()
+        return self.layer.get_variants(name)
+
+    def _is_child(self, variant):
+        return self.layer.is_variant(variant)
+
+    def _parents(self):
+        return constructs(self.layer, (_NAME,))
+
+    @classmethod
+    def _count_children(cls, stats, types):
+        return stats.variant_count()
+
+    @classmethod
+    def _count_parents(cls, stats):
+        return stats.name_count()
+
+
+class _AssociationRoleRelation(_ChildRelation):
+    def _children(self, assoc):
+        if not self.layer.is_association(assoc):
+            return ()
+        return self.layer.get_roles(assoc, self.types)
+
+    def _is_child(self, role):
+        return self.layer.is_role(role) and self._has_type(role)
+
+    def _parents(self):
+        return self.layer.get_associations()
+
+    @classmethod
+    def _count_children(cls, stats, types):
+        return _count_typed(stats.role_count, types)
+
+    @classmethod
+    def _count_parents(cls, stats):
+        return stats.association_count()
+
+
+class _RolePlayerRelation(BinaryRelation):
+    def forward(self, role):
+        if not self.layer.is_role(role) or not self._has_type(role):
+            return ()
+        return (self.layer.get_player(role),)
+
+    def backward(self, player):
+        if not self.layer.is_topic(player):
+            return ()
+        return self.layer.get_roles_played(player, self.types)
+
+    def enumerate(self):
+        return ((role, player) for player in self.layer.get_topics() for role in self.backward(player))
+
+    @classmethod
+    def estimate(cls, stats, x, y, types=ANY, hints=None):
+        if x is not None:
+            return 1
+        roles = _count_typed(stats.role_count, types)
+        if y is not None:
+            return _avg(roles, stats.topic_count())
+        return roles
+
+
+class _ReifiesRelation(BinaryRelation):
+    def forward(self, reifier):
+        if not self.layer.is_topic(reifier):
+            return ()
+        reified = self.layer.get_reified(reifier)
+        return (reified,) if reified is not None else ()
+
+    def backward(self, reified):
+        if self.layer.is_topic(reified):
+            return ()
+        reifier = self.layer.get_reifier(reified)
+        return (reifier,) if reifier is not None else ()
+
+    def enumerate(self):
+        return ((reifier, reified) for reifier in self.layer.get_topics() for reified in self.forward(reifier))
+
+
+class _SubjectIdentifierRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, topic):
+        return self.layer.get_subject_identifiers(topic) if self.layer.is_topic(topic) else ()
+
+    def backward(self, iri):
+        topic = self.layer.get_topic_by_subject_identifier(iri)
+        return (topic,) if topic is not None else ()
+
+    def enumerate(self):
+        return ((topic, iri) for topic in self.layer.get_topics() for iri in self.forward(topic))
+
+
+class _SubjectLocatorRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, topic):
+        return self.layer.get_subject_locators(topic) if self.layer.is_topic(topic) else ()
+
+    def backward(self, iri):
+        topic = self.layer.get_topic_by_subject_locator(iri)
+        return (topic,) if topic is not None else ()
+
+    def enumerate(self):
+        return ((topic, iri) for topic in self.layer.get_topics() for iri in self.forward(topic))
+
+
+class _ItemIdentifierRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, tmc):
+        return self.layer.get_item_identifiers(tmc)
+
+    def backward(self, iri):
+        tmc = self.layer.get_construct_by_item_identifier(iri)
+        return (tmc,) if tmc is not None else ()
+
+    def enumerate(self):
+        layer = self.layer
+        tmcs = chain((layer.get_topicmap(),), layer.get_topics(), constructs(layer))
+        return ((tmc, iri) for tmc in tmcs for iri in layer.get_item_identifiers(tmc))
+
+
+class _ObjectIdRelation(BinaryRelation):
+    literals = (False, True)
+
+    def forward(self, tmc):
+        return (unicode(self.layer.get_construct_id(tmc)),)
+
+    def backward(self, ident):
+        tmc = self.layer.get_construct_by_id(ident)
+        return (tmc,) if tmc is not None else ()
+
+    def enumerate(self):
+        layer = self.layer
+        tmcs = chain((layer.get_topicmap(),), layer.get_topics(), constructs(layer))
+        return ((tmc, unicode(layer.get_construct_id(tmc))) for tmc in tmcs)
+
+
+_RELATIONS = {
+    u'topic': _TopicRelation,
+    u'association': _AssociationRelation,
+    u'topicmap': _TopicMapRelation,
+    u'base-locator': _BaseLocatorRelation,
+    u'instance-of': _InstanceOfRelation,
+    u'direct-instance-of': _DirectInstanceOfRelation,
+    u'type': _TypeRelation,
+    u'scope': _ScopeRelation,
+    u'value': _ValueRelation,
+    u'datatype': _DatatypeRelation,
+    u'resource': _ResourceRelation,
+    u'topic-name': _TopicNameRelation,
+    u'occurrence': _OccurrenceRelation,
+    u'variant': _VariantRelation,
+    u'association-role': _AssociationRoleRelation,
+    u'role-player': _RolePlayerRelation,
+    u'reifies': _ReifiesRelation,
+    u'subject-identifier': _SubjectIdentifierRelation,
+    u'subject-locator': _SubjectLocatorRelation,
+    u'item-identifier': _ItemIdentifierRelation,
+    u'source-locator': _ItemIdentifierRelation,
+    u'object-id': _ObjectIdRelation,
+}
+
+# Predicates which accept an additional type argument (c.f. fold-type.xsl)
+_TYPED_RELATIONS = (u'topic-name', u'occurrence', u'role-player')
+
+
+def get_relation(name, arity):
+    """\
+    Returns the relation class of the built-in predicate `name`.
+
+    Raises an `mql.InvalidQueryError` if the predicate is unknown or if it
+    does not accept `arity` arguments.
+    """
+    relation = _RELATIONS.get(name)
+    if relation is None:
+        raise mql.InvalidQueryError('The built-in predicate "%s" is not supported' % name)
+    expected = len(relation.literals)
+    if arity != expected and not (name in _TYPED_RELATIONS and arity > expected):
+        raise mql.InvalidQueryError('The built-in predicate "%s" expects %d arguments, got %d' % (name, expected, arity))
+    return relation
@@ -22,6 +22,7 @@ from itertools import tee, chain, ifilter, imap
 __all__ = ['fill_column',
            'filter_column', 'filter_columns', 
            'produce_column', 'produce_columns', 
+           'filter_rows', 'produce_rows',
            ]
 
 _first = itemgetter(0)
@@ -89,3 +90,25 @@ def produce_columns(res, idx1, idx2, iterable, func):
     res[idx1] = imap(_first, iter1)
     res[idx2] = imap(_second, iter2)
     return res
+
+
+def filter_rows(rows, pred):
+    """\
+    Returns an iterator over those `rows` where ``pred`` returns ``True``.
+
+    The rows are consumed lazily.
+    """
+    return ifilter(pred, rows)
+
+
+def produce_rows(rows, func):
+    """\
+    Returns an iterator over the rows produced by invoking `func` for every
+    row in `rows`.
+
+    `func`
+        A function which is invoked with a row and returns an iterable of
+        (extended) rows. If the function returns an empty iterable, the
+        row is dropped.
+    """
+    return chain.from_iterable(imap(func, rows))
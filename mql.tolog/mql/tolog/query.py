@@ -0,0 +1,1049 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Executable tolog queries.
+
+The `QueryFactory` creates a query plan from the (optimized) query. Each
+clause of the plan is compiled into an operator which consumes an iterator
+of rows and returns an iterator of rows (c.f. `mql.tolog.predutils`), so the
+results are streamed and not materialized unless the query requires it
+(i.e. ``order by`` or ``count``).
+
+The plan is independent of the topic map. It is executed against a
+`mql.tolog.layer.TopicMapLayer`::
+
+    >>> query = parse_query('select $t from instance-of($t, person)?', iri=base)
+    >>> for row in query.execute(layer):
+    ...     print row['t']
+
+If the layer provides statistics (c.f. ``TopicMapLayer.get_statistics``), the
+clauses are ordered by the estimated number of results at execution time.
+Otherwise the order of the optimizer (which uses fixed costs, c.f.
+``annotate-costs.xsl``) is kept.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+from __future__ import absolute_import
+from decimal import Decimal
+from itertools import islice, chain
+from tm import ANY, mql, irilib
+from tm.proto import implements
+from . import interfaces, consts, predicates
+from .predutils import filter_rows, produce_rows
+
+__all__ = ['QueryFactory', 'SelectQuery', 'Result', 'Row']
+
+
+class Variable(object):
+    """\
+    A variable.
+    """
+    __slots__ = ['name']
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return '$%s' % self.name
+
+
+class Count(Variable):
+    """\
+    A ``count($name)`` expression within the select clause.
+    """
+    __slots__ = []
+
+    def __repr__(self):
+        return 'count($%s)' % self.name
+
+
+class Parameter(object):
+    """\
+    A parameter which is provided at execution time.
+    """
+    __slots__ = ['name']
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self, env):
+        try:
+            return env.params[self.name]
+        except KeyError:
+            raise mql.InvalidQueryError('The parameter "%s" was not provided' % self.name)
+
+    literal = resolve
+
+
+class Literal(object):
+    """\
+    A string, number, or date literal.
+    """
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        self.value = value
+
+    def resolve(self, env):
+        return self.value
+
+    literal = resolve
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+class Reference(object):
+    """\
+    A reference to a Topic Maps construct by a subject identifier, subject
+    locator, or item identifier.
+
+    Within a literal context (i.e. the second argument of the
+    ``subject-identifier`` predicate) the IRI is used as value.
+    """
+    __slots__ = ['kind', 'iri']
+
+    def __init__(self, kind, iri):
+        self.kind = kind
+        self.iri = iri
+
+    def resolve(self, env):
+        key = self.kind, self.iri
+        try:
+            return env.constructs[key]
+        except KeyError:
+            layer = env.layer
+            if self.kind == consts.SID:
+                tmc = layer.get_topic_by_subject_identifier(self.iri)
+            elif self.kind == consts.SLO:
+                tmc = layer.get_topic_by_subject_locator(self.iri)
+            else:
+                tmc = layer.get_construct_by_item_identifier(self.iri)
+            env.constructs[key] = tmc
+            return tmc
+
+    def literal(self, env):
+        return self.iri
+
+    def __repr__(self):
+        return '<%s>' % self.iri
+
+
+class ObjectId(object):
+    """\
+    A reference to a Topic Maps construct by its internal identifier.
+    """
+    __slots__ = ['ident']
+
+    def __init__(self, ident):
+        self.ident = ident
+
+    def resolve(self, env):
+        return env.layer.get_construct_by_id(self.ident)
+
+    def literal(self, env):
+        return self.ident
+
+
+class _Arg(object):
+    """\
+    Compiled argument: Either a variable slot or a constant.
+    """
+    __slots__ = ['slot', 'const', 'literal']
+
+    def __init__(self, slot=None, const=None, literal=False):
+        self.slot = slot
+        self.const = const
+        self.literal = literal
+
+    def value(self, env, row):
+        """\
+        Returns the value of this argument or ``None`` if the argument is
+        an unbound variable. Returns `_NOT_FOUND` if the argument is a constant
+        which cannot be resolved.
+        """
+        if self.slot is not None:
+            return row[self.slot]
+        val = self.const.literal(env) if self.literal else self.const.resolve(env)
+        return _NOT_FOUND if val is None else val
+
+_NOT_FOUND = object()
+
+
+class _Context(object):
+    """\
+    Maps variable names to slots within a row.
+    """
+    def __init__(self, rules, planner=None):
+        self.rules = rules
+        self.planner = planner
+        self.slots = {}
+
+    def slot(self, name):
+        try:
+            return self.slots[name]
+        except KeyError:
+            slot = len(self.slots)
+            self.slots[name] = slot
+            return slot
+
+    def arg(self, term, literal=False):
+        if isinstance(term, Variable):
+            return _Arg(slot=self.slot(term.name))
+        return _Arg(const=term, literal=literal)
+
+    def __len__(self):
+        return len(self.slots)
+
+
+class _Env(object):
+    """\
+    Execution environment.
+    """
+    def __init__(self, layer, params, base):
+        self.layer = layer
+        self.params = params
+        self.base = base
+        self.constructs = {}
+
+
+def _bind(row, slot, value):
+    r = list(row)
+    r[slot] = value
+    return tuple(r)
+
+
+def _run(ops, env, rows):
+    for op in ops:
+        rows = op(env, rows)
+    return rows
+
+
+def _is_empty(iterable):
+    for _ in iterable:
+        return False
+    return True
+
+
+def _variables(terms):
+    return [term.name for term in terms if isinstance(term, Variable)]
+
+
+def _compile_clauses(ctx, clauses, bound=()):
+    """\
+    Returns a list of operators for the provided clauses.
+
+    The order of the clauses (which was determined by the optimizer) is
+    kept unless a clause filters rows by variables which are bound by a
+    subsequent clause (i.e. ``not`` clauses and comparisons) or unless
+    the context provides a `_Planner` which chooses the clause with the
+    lowest estimated number of results.
+    """
+    bound = set(bound)
+    remaining = list(clauses)
+    ops = []
+    while remaining:
+        ready = []
+        for i, clause in enumerate(remaining):
+            others = set(chain.from_iterable(c.variables() for c in remaining if c is not clause))
+            if clause.is_ready(bound, others):
+                ready.append(i)
+                if ctx.planner is None:
+                    break
+        if not ready:
+            i = 0
+        elif len(ready) == 1:
+            i = ready[0]
+        else:
+            i = ctx.planner.choose(remaining, ready, bound)
+        clause = remaining.pop(i)
+        ops.append(clause.compile(ctx, frozenset(bound)))
+        bound.update(clause.bound_variables(bound))
+    return ops
+
+
+class _Planner(object):
+    """\
+    Chooses the next clause by the statistics of the topic map.
+    """
+    def __init__(self, env, stats):
+        self.env = env
+        self.stats = stats
+
+    def estimate(self, clause, bound):
+        """\
+        Returns the estimated number of results of `clause` per input row or
+        ``None`` if the number is unknown.
+        """
+        return clause.estimate(self, bound)
+
+    def choose(self, clauses, candidates, bound):
+        """\
+        Returns the index of the clause with the lowest estimated number of
+        results. Clauses with an unknown estimate are evaluated last, the
+        order of the optimizer is kept if the estimates are equal.
+
+        `clauses`
+            A list of clauses.
+        `candidates`
+            The indexes of the clauses which can be evaluated.
+        `bound`
+            The set of bound variables.
+        """
+        def key(i):
+            cost = self.estimate(clauses[i], bound)
+            return cost is None, cost
+        return min(candidates, key=key)
+
+    def value(self, term, bound, literal=False):
+        """\
+        Returns the value of `term` for the relation estimates: ``None`` if
+        `term` is an unbound variable, `predicates.BOUND` if it is a bound
+        variable, `_NOT_FOUND` if it is a constant which cannot be resolved.
+        """
+        if isinstance(term, Variable):
+            return predicates.BOUND if term.name in bound else None
+        val = term.literal(self.env) if literal else term.resolve(self.env)
+        return _NOT_FOUND if val is None else val
+
+
+def _avg(total, parents):
+    return float(total) / max(parents, 1)
+
+
+class _Clause(object):
+    """\
+    Common base class of all clauses.
+    """
+    def variables(self):
+        """\
+        Returns an iterable of variable names used by this clause.
+        """
+        return ()
+
+    def bound_variables(self, bound):
+        """\
+        Returns the variables which are bound after this clause was evaluated.
+        """
+        return self.variables()
+
+    def is_ready(self, bound, others):
+        """\
+        Returns if this clause can be evaluated.
+
+        `bound`
+            The set of bound variables.
+        `others`
+            The set of variables used by the remaining clauses.
+        """
+        return True
+
+    def estimate(self, planner, bound):
+        """\
+        Returns the estimated number of results per input row or ``None``
+        if the number is unknown.
+
+        `planner`
+            The `_Planner` which provides the statistics.
+        `bound`
+            The set of bound variables.
+        """
+        return None
+
+    def compile(self, ctx, bound):
+        """\
+        Returns a function which accepts an environment and an iterable of
+        rows and returns an iterable of rows.
+        """
+        raise NotImplementedError()
+
+
+class BuiltinPredicate(_Clause):
+    """\
+    A built-in predicate like ``instance-of``.
+    """
+    def __init__(self, name, args, hints=None):
+        self.name = name
+        self.args = args
+        self.hints = hints
+
+    def variables(self):
+        return _variables(self.args)
+
+    def estimate(self, planner, bound):
+        relation = predicates.get_relation(self.name, len(self.args))
+        args = [planner.value(term, bound, literal) for term, literal in zip(self.args, relation.literals)]
+        types = tuple(planner.value(term, bound) for term in self.args[len(relation.literals):])
+        if _NOT_FOUND in args or _NOT_FOUND in types:
+            return 0
+        if None in types:
+            types = (predicates.BOUND,)
+        stats = planner.stats
+        if len(args) == 1:
+            return relation.estimate(stats, args[0], hints=self.hints)
+        return relation.estimate(stats, args[0], args[1], types=types or ANY, hints=self.hints)
+
+    def compile(self, ctx, bound):
+        relation = predicates.get_relation(self.name, len(self.args))
+        args = [ctx.arg(term, literal) for term, literal in zip(self.args, relation.literals)]
+        types = [ctx.arg(term) for term in self.args[len(relation.literals):]]
+        hints = self.hints
+        if len(args) == 1:
+            return _unary_op(relation, args[0], hints)
+        return _binary_op(relation, args[0], args[1], types, hints)
+
+
+def _make_relation(relation, env, row, hints, types=()):
+    type_values = ANY
+    if types:
+        type_values = tuple(arg.value(env, row) for arg in types)
+        if None in type_values or _NOT_FOUND in type_values:
+            return None
+    return relation(env.layer, hints=hints, types=type_values, base=env.base)
+
+
+def _unary_op(relation, arg, hints):
+    slot = arg.slot
+    def op(env, rows):
+        rel = _make_relation(relation, env, None, hints)
+        def evaluate(row):
+            x = arg.value(env, row)
+            if x is _NOT_FOUND:
+                return ()
+            if x is not None:
+                return (row,) if rel.test(x) else ()
+            return (_bind(row, slot, val) for val in rel.enumerate())
+        return produce_rows(rows, evaluate)
+    return op
+
+
+def _binary_op(relation, a, b, types, hints):
+    same_var = a.slot is not None and a.slot == b.slot
+    a_slot, b_slot = a.slot, b.slot
+    def op(env, rows):
+        cache = {}
+        def get_relation(row):
+            if not types:
+                rel = cache.get(None)
+                if rel is None:
+                    rel = cache[None] = _make_relation(relation, env, row, hints)
+                return rel
+            return _make_relation(relation, env, row, hints, types)
+        def evaluate(row):
+            rel = get_relation(row)
+            x, y = a.value(env, row), b.value(env, row)
+            if rel is None or x is _NOT_FOUND or y is _NOT_FOUND:
+                return ()
+            if x is not None:
+                if y is not None:
+                    return (row,) if rel.test(x, y) else ()
+                return (_bind(row, b_slot, val) for val in rel.forward(x))
+            if y is not None:
+                return (_bind(row, a_slot, val) for val in rel.backward(y))
+            if same_var:
+                return (_bind(row, a_slot, val1) for val1, val2 in rel.enumerate() if val1 == val2)
+            return (_bind(_bind(row, a_slot, val1), b_slot, val2) for val1, val2 in rel.enumerate())
+        return produce_rows(rows, evaluate)
+    return op
+
+
+_COMPARATORS = {
+    u'ne': lambda res: res != 0,
+    u'lt': lambda res: res < 0,
+    u'le': lambda res: res <= 0,
+    u'gt': lambda res: res > 0,
+    u'ge': lambda res: res >= 0,
+}
+
+
+class InfixPredicate(_Clause):
+    """\
+    A comparison like ``$a = $b`` or ``$a < 3``.
+    """
+    def __init__(self, name, lh, rh, hints=None):
+        if name != u'eq' and name not in _COMPARATORS:
+            raise mql.InvalidQueryError('Unknown infix predicate "%s"' % name)
+        self.name = name
+        self.lh = lh
+        self.rh = rh
+
+    def variables(self):
+        return _variables((self.lh, self.rh))
+
+    def _unbound(self, bound):
+        return set(self.variables()) - bound
+
+    def is_ready(self, bound, others):
+        unbound = self._unbound(bound)
+        if self.name == u'eq' and len(unbound) < 2:
+            return True
+        return not unbound & others
+
+    def bound_variables(self, bound):
+        if self.name == u'eq' and len(self._unbound(bound)) < 2:
+            return self.variables()
+        return ()
+
+    def estimate(self, planner, bound):
+        return 1 if self._unbound(bound) else 0
+
+    def compile(self, ctx, bound):
+        lh, rh = ctx.arg(self.lh), ctx.arg(self.rh)
+        if self.name == u'eq':
+            def evaluate(env, row):
+                x, y = lh.value(env, row), rh.value(env, row)
+                if x is _NOT_FOUND or y is _NOT_FOUND:
+                    return ()
+                if x is None and y is None:
+                    raise mql.InvalidQueryError('Both sides of "=" are unbound')
+                if x is None:
+                    return (_bind(row, lh.slot, y),)
+                if y is None:
+                    return (_bind(row, rh.slot, x),)
+                return (row,) if predicates.is_equal(x, y) else ()
+            return lambda env, rows: produce_rows(rows, lambda row: evaluate(env, row))
+        accept = _COMPARATORS[self.name]
+        name = self.name
+        def test(env, row):
+            x, y = lh.value(env, row), rh.value(env, row)
+            if x is None or y is None:
+                raise mql.InvalidQueryError('Unbound variable in "%s" comparison' % name)
+            if x is _NOT_FOUND or y is _NOT_FOUND:
+                return False
+            return accept(predicates.compare(x, y))
+        return lambda env, rows: filter_rows(rows, lambda row: test(env, row))
+
+
+class AssociationPredicate(_Clause):
+    """\
+    An association predicate like ``composed-by($opera : work, puccini : composer)``.
+    """
+    def __init__(self, type, roles):
+        self.type = type
+        self.roles = roles
+
+    def variables(self):
+        return _variables(chain((self.type,), chain.from_iterable(self.roles)))
+
+    def estimate(self, planner, bound):
+        stats = planner.stats
+        typ = planner.value(self.type, bound)
+        if typ is _NOT_FOUND:
+            return 0
+        if typ is None or typ is predicates.BOUND:
+            res = stats.association_count()
+        else:
+            res = stats.association_count(typ)
+        for role_type, player in self.roles:
+            role_type, player = planner.value(role_type, bound), planner.value(player, bound)
+            if _NOT_FOUND in (role_type, player):
+                return 0
+            if player is None:
+                continue
+            if role_type is None or role_type is predicates.BOUND:
+                role_type = ANY
+            # Average number of roles of the role type played by a topic
+            res = min(res, _avg(stats.role_count(role_type), stats.topic_count()))
+        return res
+
+    def compile(self, ctx, bound):
+        type_arg = ctx.arg(self.type)
+        pairs = [(ctx.arg(role_type), ctx.arg(player)) for role_type, player in self.roles]
+        def op(env, rows):
+            layer = env.layer
+            def match(assoc, row, pairs, used):
+                if not pairs:
+                    yield row
+                    return
+                (role_type, player_arg), rest = pairs[0], pairs[1:]
+                player = player_arg.value(env, row)
+                for role in layer.get_roles(assoc, (role_type,)):
+                    if role in used:
+                        continue
+                    role_player = layer.get_player(role)
+                    if player is None:
+                        r = _bind(row, player_arg.slot, role_player)
+                    elif player == role_player:
+                        r = row
+                    else:
+                        continue
+                    for res in match(assoc, r, rest, used | set([role])):
+                        yield res
+            def evaluate(row):
+                assoc_type = type_arg.value(env, row)
+                if assoc_type is None or assoc_type is _NOT_FOUND:
+                    return ()
+                resolved = []
+                start = None
+                for role_type_arg, player_arg in pairs:
+                    role_type = role_type_arg.value(env, row)
+                    player = player_arg.value(env, row)
+                    if role_type is None or role_type is _NOT_FOUND or player is _NOT_FOUND:
+                        return ()
+                    resolved.append((role_type, player_arg))
+                    if start is None and player is not None:
+                        start = role_type, player
+                if start is not None:
+                    role_type, player = start
+                    if not layer.is_topic(player):
+                        return ()
+                    assocs = (layer.get_parent(role) for role in layer.get_roles_played(player, (role_type,)))
+                    assocs = (assoc for assoc in assocs if layer.get_type(assoc) == assoc_type)
+                else:
+                    assocs = layer.get_associations((assoc_type,))
+                return chain.from_iterable(match(assoc, row, resolved, frozenset()) for assoc in assocs)
+            return produce_rows(rows, evaluate)
+        return op
+
+
+class DynamicOccurrencePredicate(_Clause):
+    """\
+    A dynamic occurrence predicate like ``homepage($topic, $value)``.
+    """
+    def __init__(self, type, topic, value):
+        self.type = type
+        self.topic = topic
+        self.value = value
+
+    def variables(self):
+        return _variables((self.type, self.topic, self.value))
+
+    def estimate(self, planner, bound):
+        stats = planner.stats
+        typ, topic = planner.value(self.type, bound), planner.value(self.topic, bound)
+        value = planner.value(self.value, bound, True)
+        if _NOT_FOUND in (typ, topic, value):
+            return 0
+        if typ is None or typ is predicates.BOUND:
+            typ = ANY
+        res = stats.occurrence_count(typ)
+        if topic is not None:
+            res = _avg(res, stats.topic_count())
+        if value is predicates.BOUND:
+            res = min(res, 1)
+        elif value is not None:
+            res = min(res, sum(stats.value_count(val, datatype) for val, datatype in predicates.literals_for(value)))
+        return res
+
+    def compile(self, ctx, bound):
+        type_arg, topic_arg, value_arg = ctx.arg(self.type), ctx.arg(self.topic), ctx.arg(self.value, True)
+        def op(env, rows):
+            layer = env.layer
+            def evaluate(row):
+                typ, topic, value = type_arg.value(env, row), topic_arg.value(env, row), value_arg.value(env, row)
+                if typ is None or _NOT_FOUND in (typ, topic, value):
+                    return ()
+                types = (typ,)
+                if topic is not None:
+                    if not layer.is_topic(topic):
+                        return ()
+                    values = (layer.get_value(occ) for occ in layer.get_occurrences(topic, types))
+                    if value is not None:
+                        return (row,) if any(predicates.is_equal(val, value) for val in values) else ()
+                    return (_bind(row, value_arg.slot, val) for val in values)
+                if value is not None:
+                    occs = (occ for val, datatype in predicates.literals_for(value)
+                                    for occ in layer.get_occurrences_by_value(val, datatype)
+                                        if layer.get_type(occ) == typ)
+                    return (_bind(row, topic_arg.slot, layer.get_parent(occ)) for occ in occs)
+                return (_bind(_bind(row, topic_arg.slot, layer.get_parent(occ)), value_arg.slot, layer.get_value(occ))
+                            for occ in layer.get_typed(typ, (u'occurrence',)))
+            return produce_rows(rows, evaluate)
+        return op
+
+
+class Predicate(_Clause):
+    """\
+    Invocation of a rule.
+    """
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def variables(self):
+        return _variables(self.args)
+
+    def compile(self, ctx, bound):
+        rule = ctx.rules.get(self.name)
+        if rule is None:
+            raise mql.InvalidQueryError('Unknown predicate "%s"' % self.name)
+        if len(rule.params) != len(self.args):
+            raise mql.InvalidQueryError('The rule "%s" expects %d arguments, got %d' % (self.name, len(rule.params), len(self.args)))
+        args = [ctx.arg(term) for term in self.args]
+        rules = ctx.rules
+        def op(env, rows):
+            rule_ctx, rule_ops = rule.plan(rules)
+            param_slots = [rule_ctx.slots[name] for name in rule.params]
+            def evaluate(row):
+                init = [None] * len(rule_ctx)
+                for arg, slot in zip(args, param_slots):
+                    val = arg.value(env, row)
+                    if val is _NOT_FOUND:
+                        return
+                    init[slot] = val
+                for res in _run(rule_ops, env, (tuple(init),)):
+                    r = list(row)
+                    for arg, slot in zip(args, param_slots):
+                        if arg.slot is None:
+                            continue
+                        val = res[slot]
+                        if r[arg.slot] is None:
+                            r[arg.slot] = val
+                        elif r[arg.slot] != val:
+                            break
+                    else:
+                        yield tuple(r)
+            return produce_rows(rows, evaluate)
+        return op
+
+
+class Rule(object):
+    """\
+    A rule definition.
+    """
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.body = body
+        self._plan = None
+
+    def plan(self, rules):
+        """\
+        Returns a (context, operators) tuple.
+        """
+        if self._plan is None:
+            ctx = _Context(rules)
+            for name in self.params:
+                ctx.slot(name)
+            ops = []
+            self._plan = ctx, ops
+            ops.extend(_compile_clauses(ctx, self.body))
+        return self._plan
+
+
+class Not(_Clause):
+    """\
+    A ``not`` clause.
+    """
+    def __init__(self, clauses):
+        self.clauses = clauses
+
+    def variables(self):
+        return list(chain.from_iterable(clause.variables() for clause in self.clauses))
+
+    def bound_variables(self, bound):
+        return ()
+
+    def is_ready(self, bound, others):
+        return not (set(self.variables()) - bound) & others
+
+    def estimate(self, planner, bound):
+        return 0
+
+    def compile(self, ctx, bound):
+        ops = _compile_clauses(ctx, self.clauses, bound)
+        return lambda env, rows: filter_rows(rows, lambda row: _is_empty(_run(ops, env, (row,))))
+
+
+class Or(_Clause):
+    """\
+    An ``or`` clause.
+    """
+    def __init__(self, branches, short_circuit=False):
+        self.branches = branches
+        self.short_circuit = short_circuit
+
+    def variables(self):
+        return list(chain.from_iterable(clause.variables() for branch in self.branches for clause in branch))
+
+    def estimate(self, planner, bound):
+        res = 0
+        for branch in self.branches:
+            estimates = [planner.estimate(clause, bound) for clause in branch]
+            if not estimates or None in estimates:
+                return None
+            res += min(estimates)
+        return res
+
+    def compile(self, ctx, bound):
+        branches = [_compile_clauses(ctx, branch, bound) for branch in self.branches]
+        short_circuit = self.short_circuit
+        def op(env, rows):
+            def evaluate(row):
+                found = False
+                for i, ops in enumerate(branches):
+                    if found and short_circuit and i > 0:
+                        break
+                    for res in _run(ops, env, (row,)):
+                        found = True
+                        yield res
+            return produce_rows(rows, evaluate)
+        return op
+
+
+class SelectQuery(object):
+    """\
+    An executable ``select`` query.
+    """
+    def __init__(self, header, where, order_by=None, limit=None, offset=None, rules=None, base=None):
+        """\
+
+        `header`
+            An iterable of `Variable` and `Count` instances.
+        `where`
+            An iterable of clauses.
+        `order_by`
+            An optional iterable of (variable name, direction) tuples where
+            direction is either ``consts.ASC`` or ``consts.DESC``.
+        `limit`
+            An optional maximum number of rows.
+        `offset`
+            An optional number of rows to skip.
+        `rules`
+            An optional mapping of rule names to `Rule` instances.
+        `base`
+            The base IRI of the query.
+        """
+        self.base = base
+        self._limit = limit
+        self._offset = offset or 0
+        self._where = where
+        self._rules = rules or {}
+        self._keys = tuple(item.name for item in header)
+        self._counts = [i for i, item in enumerate(header) if isinstance(item, Count)]
+        self._plan = self._compile()
+        self._order_by = []
+        for name, direction in order_by or ():
+            if name not in self._keys:
+                raise mql.InvalidQueryError('The variable "%s" is not part of the select clause' % name)
+            self._order_by.append((self._keys.index(name), direction == consts.DESC))
+
+    keys = property(lambda self: self._keys)
+
+    def _compile(self, planner=None):
+        """\
+        Returns a tuple of (operators, row size, slots of the selected variables).
+        """
+        ctx = _Context(self._rules, planner)
+        ops = _compile_clauses(ctx, self._where)
+        try:
+            slots = [ctx.slots[name] for name in self._keys]
+        except KeyError, ex:
+            raise mql.InvalidQueryError('The variable "%s" is not used in the query' % ex.args[0])
+        return ops, len(ctx), slots
+
+    def execute(self, layer, **params):
+        """\
+        Executes this query against the provided `layer` and returns a
+        `Result`.
+
+        `layer`
+            A `mql.tolog.layer.TopicMapLayer`.
+        `params`
+            Values for the query parameters (``%name%``).
+        """
+        env = _Env(layer, params, self.base)
+        stats = layer.get_statistics()
+        if stats is not None:
+            ops, size, slots = self._compile(_Planner(env, stats))
+        else:
+            ops, size, slots = self._plan
+        rows = _run(ops, env, ((None,) * size,))
+        rows = (tuple(row[slot] for slot in slots) for row in rows)
+        if self._counts:
+            rows = self._count(rows)
+        else:
+            rows = _distinct(rows)
+        if self._order_by:
+            rows = self._sort(layer, rows)
+        if self._offset or self._limit is not None:
+            stop = self._offset + self._limit if self._limit is not None else None
+            rows = islice(rows, self._offset, stop)
+        return Result(self._keys, rows)
+
+    def _count(self, rows):
+        counts = self._counts
+        group_idx = [i for i in range(len(self._keys)) if i not in counts]
+        groups = {}
+        for row in _distinct(rows):
+            key = tuple(row[i] for i in group_idx)
+            values = groups.get(key)
+            if values is None:
+                values = groups[key] = [set() for _ in counts]
+            for i, idx in enumerate(counts):
+                if row[idx] is not None:
+                    values[i].add(row[idx])
+        if not groups and not group_idx:
+            groups[()] = [() for _ in counts]
+        for key, values in groups.iteritems():
+            res = list(key)
+            for i, idx in enumerate(counts):
+                res.insert(idx, len(values[i]))
+            yield tuple(res)
+
+    def _sort(self, layer, rows):
+        rows = list(rows)
+        for idx, reverse in reversed(self._order_by):
+            rows.sort(key=lambda row: predicates.sort_key(layer, row[idx]), reverse=reverse)
+        return rows
+
+
+def _distinct(rows):
+    seen = set()
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            yield row
+
+
+class Row(tuple):
+    """\
+    A row of a `Result`.
+
+    The values can be accessed by index or by the column name::
+
+        >>> row[0] == row['t']
+        True
+    """
+    def __new__(cls, keys, values):
+        row = tuple.__new__(cls, values)
+        row._keys = keys
+        return row
+
+    def __getitem__(self, idx):
+        if isinstance(idx, basestring):
+            try:
+                idx = self._keys.index(idx)
+            except ValueError:
+                raise KeyError(idx)
+        return tuple.__getitem__(self, idx)
+
+    def keys(self):
+        return self._keys
+
+
+class Result(object):
+    """\
+    Result of a query.
+    """
+    implements(interfaces.IResult)
+
+    def __init__(self, keys, rows):
+        self._keys = keys
+        self._rows = iter(rows)
+
+    def __iter__(self):
+        keys = self._keys
+        for values in self._rows:
+            yield Row(keys, values)
+
+    def keys(self):
+        return self._keys
+
+    def first(self):
+        row = None
+        for row in self:
+            break
+        self.close()
+        return row
+
+    def scalar(self):
+        row = self.first()
+        return row[0] if row is not None else None
+
+    def close(self):
+        self._rows = iter(())
+
+
+class QueryFactory(object):
+    """\
+    Default `mql.tolog.interfaces.IQueryFactory` implementation which
+    creates executable `SelectQuery` instances.
+    """
+    implements(interfaces.IQueryFactory)
+
+    def create_select_query(self, header, where, order_by=None, limit=None, offset=None, rules=None, base=None):
+        return SelectQuery(header, where, order_by, limit, offset, rules, base)
+
+    def _unsupported(self, *args, **kw):
+        raise mql.InvalidQueryError('Only "select" queries are supported')
+
+    create_create_query = create_drop_query = create_load_query = \
+    create_insert_query = create_merge_query = create_update_query = \
+    create_delete_query = _unsupported
+
+    def create_rule(self, name, params, body):
+        return Rule(name, params, body)
+
+    def create_predicate(self, name, args):
+        return Predicate(name, args)
+
+    def create_builtin_predicate(self, name, args, hints=None):
+        return BuiltinPredicate(name, args, hints)
+
+    def create_internal_predicate(self, name, args, hints=None):
+        return None
+
+    def create_infix_predicate(self, name, lh, rh, hints=None):
+        return InfixPredicate(name, lh, rh, hints)
+
+    def create_association_predicate(self, type, roles):
+        return AssociationPredicate(type, roles)
+
+    def create_dynamic_occurrence_predicate(self, type, topic, value):
+        return DynamicOccurrencePredicate(type, topic, value)
+
+    def create_not(self, clauses):
+        return Not(clauses)
+
+    def create_or(self, branches, short_circuit=False):
+        return Or(branches, short_circuit)
+
+    def create_count(self, variable):
+        return Count(variable)
+
+    def create_iri(self, iri):
+        return iri
+
+    def create_subject_identifier(self, iri):
+        return Reference(consts.SID, iri)
+
+    def create_subject_locator(self, iri):
+        return Reference(consts.SLO, iri)
+
+    def create_item_identifier(self, iri):
+        return Reference(consts.IID, iri)
+
+    def create_object_id(self, ident):
+        return ObjectId(ident)
+
+    def create_variable(self, name):
+        return Variable(name)
+
+    def create_parameter(self, name):
+        return Parameter(name)
+
+    def create_string(self, value):
+        return Literal(unicode(value))
+
+    def create_integer(self, value):
+        return Literal(int(value))
+
+    def create_decimal(self, value):
+        return Literal(Decimal(value))
+
+    def create_date(self, value):
+        return Literal(unicode(value))
+
+    def create_datetime(self, value):
+        return Literal(unicode(value))
+
+    def resolve_iri(self, base, reference):
+        return irilib.resolve_iri(base, reference)
@@ -12,6 +12,8 @@ Internal utility functions.
 :organization: Semagia - <http://www.semagia.com/>
 :license:      BSD License
 """
+from collections import OrderedDict
+from threading import Lock
 from mql.tolog import consts
 
 _INFIX_PREDICATES = (u'/=', u'<', u'<=', u'=', u'>', u'>=')
@@ -84,3 +86,77 @@ def is_update_function(name):
     Returns if ``name`` is a update function.
     """
     return name in _TOLOG_UPDATE_FUNCTIONS
+
+
+class LRUCache(object):
+    """\
+    Thread-safe cache which discards the least recently used entries if
+    more than `maxsize` entries are stored.
+
+    The cache counts the hits and misses of `get` (c.f. `info`).
+    """
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, count_miss=True):
+        """\
+        Returns the value for `key` or ``None`` if `key` is not cached.
+
+        `count_miss`
+            Indicates if a failed lookup should be counted as miss
+            (i.e. ``False`` if the lookup is retried with another key).
+        """
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                if count_miss:
+                    self._misses += 1
+                return None
+            self._entries[key] = value
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._maxsize <= 0:
+                return
+            self._entries[key] = value
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        """\
+        Changes the max. number of entries, ``0`` disables the cache.
+        """
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """\
+        Removes all entries and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def info(self):
+        """\
+        Returns a dict with the statistics of the cache: ``hits``,
+        ``misses``, ``size`` (the number of entries) and ``maxsize``.
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses,
+                    'size': len(self._entries), 'maxsize': self._maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    maxsize = property(lambda self: self._maxsize)
@@ -102,6 +102,13 @@ def apply_transformations(doc, names, callback=None, **params):
     return result if callback is None else callback(result)
 
 
+def tostring(doc):
+    """\
+    Returns the serialized representation of the provided `doc`.
+    """
+    return etree.tostring(doc)
+
+
 def saxify(doc, handler):
     """\
     Issues SAX events from the provided lxml.etree document.
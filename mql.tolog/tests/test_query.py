@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2007 - 2014 -- Lars Heuer - Semagia <http://www.semagia.com/>.
+# All rights reserved.
+#
+# BSD license.
+#
+"""\
+Tests against the query execution (mql.tolog.query) with a Mappa topic map.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD License
+"""
+from nose.tools import ok_, eq_, raises
+from tm import mql, ANY, XSD
+from mql import tolog
+from mql.tolog import parse_query
+from mql.tolog.layer import AdvancedTopicMapLayer
+from mql.tolog.mappalayer import MappaTopicMapLayer
+from mql.tolog.utils import LRUCache
+import mappa
+
+_BASE = u'http://www.example.org/map'
+
+_CTM = u'''
+puccini isa composer; - "Giacomo Puccini"; homepage: http://www.puccini.it/ ; born: 1858 .
+verdi isa composer; - "Giuseppe Verdi"; born: 1813 .
+tosca isa opera; - "Tosca" .
+aida isa opera; - "Aida" .
+boheme isa opera; - "La Boheme" .
+composer ako person .
+composed-by(work: tosca, composer: puccini)
+composed-by(work: boheme, composer: puccini)
+composed-by(work: aida, composer: verdi)
+'''
+
+_TM = None
+_CONN = None
+
+def setup():
+    global _TM, _CONN
+    _CONN = mappa.connect()
+    _TM = _CONN.create(_BASE)
+    _CONN.loads(_CTM, into=_BASE, format='ctm')
+
+
+def teardown():
+    _CONN.close()
+
+
+def _topic(ident):
+    return _TM.topic_by_iid(_BASE + u'#' + ident)
+
+
+def _topics(*idents):
+    return set(_topic(ident) for ident in idents)
+
+
+def _execute(query, layer=None, **params):
+    return parse_query(query, iri=_BASE).execute(layer or MappaTopicMapLayer(_TM), **params)
+
+
+def _column(query, **params):
+    return [row[0] for row in _execute(query, **params)]
+
+
+def test_instance_of():
+    eq_(_topics('puccini', 'verdi'), set(_column('select $t from instance-of($t, composer)?')))
+
+
+def test_instance_of_supertype():
+    eq_(_topics('puccini', 'verdi'), set(_column('instance-of($t, person)?')))
+
+
+def test_direct_instance_of():
+    eq_([], _column('direct-instance-of($t, person)?'))
+
+
+def test_association_predicate():
+    eq_([_topic('boheme'), _topic('tosca')],
+        _column('select $o from composed-by($o : work, puccini : composer) order by $o?'))
+
+
+def test_count():
+    res = _execute('select $c, count($o) from composed-by($o : work, $c : composer) order by $c desc?')
+    eq_(('c', 'o'), res.keys())
+    eq_([(_topic('verdi'), 1), (_topic('puccini'), 2)], list(res))
+
+
+def test_count_empty():
+    eq_([0], _column('select count($t) from instance-of($t, unknown-type)?'))
+
+
+def test_value():
+    eq_([_topic('tosca')], _column('select $t from topic-name($t, $n), value($n, "Tosca")?'))
+
+
+def test_comparison():
+    eq_([_topic('verdi')], _column('select $t from born($t, $v), $v < 1850?'))
+
+
+def test_not():
+    eq_(_topics('tosca', 'boheme'),
+        set(_column('select $t from instance-of($t, opera), not(composed-by($t : work, verdi : composer))?')))
+
+
+def test_or_pagination():
+    eq_([_topic('puccini'), _topic('verdi')],
+        _column('select $t from { instance-of($t, opera) | instance-of($t, composer) } order by $t limit 2 offset 1?'))
+
+
+def test_rule():
+    eq_(_topics('tosca', 'boheme'),
+        set(_column('created-by($c, $w) :- composed-by($w : work, $c : composer). select $w from created-by(puccini, $w)?')))
+
+
+def test_parameter():
+    eq_(_topics('puccini', 'verdi'), set(_column('instance-of($t, %type%)?', type=_topic('composer'))))
+
+
+@raises(mql.InvalidQueryError)
+def test_missing_parameter():
+    _column('instance-of($t, %type%)?')
+
+
+def test_dynamic_occurrence_predicate():
+    eq_([_topic('puccini')], _column('select $t from homepage($t, "http://www.puccini.it/")?'))
+    eq_([u'http://www.puccini.it/'], _column('select $v from homepage(puccini, $v)?'))
+
+
+def test_unknown_topic():
+    eq_([], _column('select $t from instance-of($t, does-not-exist)?'))
+
+
+def test_infix_ne():
+    res = _execute('select $a, $b from composed-by($a : work, $c : composer), '
+                   'composed-by($b : work, $c : composer), $a /= $b?')
+    eq_(set([(_topic('tosca'), _topic('boheme')), (_topic('boheme'), _topic('tosca'))]),
+        set(res))
+
+
+def test_result():
+    res = _execute('select $t from instance-of($t, composer) order by $t?')
+    row = res.first()
+    eq_(('t',), row.keys())
+    eq_(_topic('puccini'), row['t'])
+    eq_(row[0], row['t'])
+    eq_(None, res.first())
+    eq_(_topic('puccini'), _execute('select $t from instance-of($t, composer) order by $t?').scalar())
+
+
+def test_streaming():
+    res = _execute('select $t from instance-of($t, opera)?')
+    it = iter(res)
+    ok_(next(it) is not None)
+    res.close()
+    eq_([], list(res))
+
+
+def test_advanced_layer():
+    layer = AdvancedTopicMapLayer(MappaTopicMapLayer(_TM))
+    eq_(_topics('puccini', 'verdi'),
+        set(row[0] for row in _execute('instance-of($t, composer)?', layer)))
+
+
+def test_occurrences_by_range():
+    born = _topic('born')
+    layer = MappaTopicMapLayer(_TM)
+    eq_([_topic('verdi')], [occ.parent for occ in layer.get_occurrences_by_range(XSD.integer, upper=u'1850')])
+    eq_([_topic('verdi'), _topic('puccini')],
+        [occ.parent for occ in AdvancedTopicMapLayer(layer).get_occurrences_by_range(XSD.integer, u'1813', types=[born])])
+    eq_([], layer.get_occurrences_by_range(XSD.integer, u'1813', types=[_topic('homepage')]))
+    eq_(None, layer.get_occurrences_by_range(XSD.string))
+
+
+@raises(mql.InvalidQueryError)
+def test_unknown_rule():
+    _column('select $t from unknown-rule($t, $x, $y)?')
+
+
+def test_query_cache():
+    tolog.clear_query_cache()
+    query = parse_query('select $t from instance-of($t, %type%)?', iri=_BASE)
+    ok_(query is parse_query('select $t from instance-of($t, %type%)?', iri=_BASE))
+    eq_(1, tolog.query_cache_info()['hits'])
+    eq_(1, tolog.query_cache_info()['misses'])
+    # Same canonicalized query
+    ok_(query is parse_query('select $t from instance-of($t,   %type%) ?', iri=_BASE))
+    eq_(2, tolog.query_cache_info()['hits'])
+    ok_(query is not parse_query('select $t from instance-of($t, %type%)?', iri=_BASE + u'2'))
+    ok_(query is not parse_query('select $t from instance-of($t, %type%)?', iri=_BASE, optimizers=()))
+    ok_(query is not parse_query('select $t from instance-of($t, %type%)?', iri=_BASE, cache=False))
+    eq_(3, tolog.query_cache_info()['misses'])
+    eq_(_topics('puccini', 'verdi'), set(row[0] for row in query.execute(MappaTopicMapLayer(_TM), type=_topic('composer'))))
+    eq_(_topics('tosca', 'aida', 'boheme'), set(row[0] for row in query.execute(MappaTopicMapLayer(_TM), type=_topic('opera'))))
+
+
+def test_lru_cache_info():
+    from threading import Thread
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    def lookup():
+        for i in xrange(2000):
+            cache.get('a')
+            cache.get('b')
+            cache.get('c', count_miss=False)
+    threads = [Thread(target=lookup) for i in xrange(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    eq_({'hits': 8000, 'misses': 8000, 'size': 1, 'maxsize': 2}, cache.info())
+    cache.clear()
+    eq_({'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}, cache.info())
+
+
+def test_query_cache_size():
+    tolog.clear_query_cache()
+    try:
+        tolog.set_query_cache_size(0)
+        query = parse_query('instance-of($t, composer)?', iri=_BASE)
+        ok_(query is not parse_query('instance-of($t, composer)?', iri=_BASE))
+        eq_(0, tolog.query_cache_info()['size'])
+        tolog.set_query_cache_size(2)
+        parse_query('instance-of($t, composer)?', iri=_BASE)
+        parse_query('instance-of($t, opera)?', iri=_BASE)
+        eq_(2, tolog.query_cache_info()['size'])
+    finally:
+        tolog.set_query_cache_size(tolog.QUERY_CACHE_SIZE)
+
+
+class _RecordingLayer(MappaTopicMapLayer):
+    """\
+    Records the types of ``get_associations`` calls.
+    """
+    def __init__(self, topicmap, statistics=True):
+        super(_RecordingLayer, self).__init__(topicmap)
+        self.statistics = statistics
+        self.calls = []
+
+    def get_associations(self, types=ANY, scope=ANY):
+        self.calls.append(types)
+        return super(_RecordingLayer, self).get_associations(types, scope)
+
+    def get_statistics(self):
+        return super(_RecordingLayer, self).get_statistics() if self.statistics else None
+
+
+def test_statistics():
+    base = u'http://www.example.org/stats'
+    tm = _CONN.create(base)
+    ctm = u''.join(u'big(a: a%d, b: b%d)\n' % (i, i % 3) for i in range(30))
+    _CONN.loads(ctm + u'rare(b: b1, c: c)\n', into=base, format='ctm')
+    query = parse_query(u'select $a from big($a : a, $b : b), rare($b : b, $c : c)?', iri=base)
+    big, rare = tm.topic_by_iid(base + u'#big'), tm.topic_by_iid(base + u'#rare')
+    expected = set((tm.topic_by_iid(base + u'#a%d' % i),) for i in range(1, 30, 3))
+    layer = _RecordingLayer(tm, statistics=False)
+    eq_(expected, set(query.execute(layer)))
+    eq_([(big,)], layer.calls)
+    layer = _RecordingLayer(tm)
+    eq_(expected, set(query.execute(layer)))
+    eq_([(rare,)], layer.calls)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
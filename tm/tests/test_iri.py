@@ -12,7 +12,8 @@ Tests against the ``tm.irilib``.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
-from nose.tools import eq_
+from nose.tools import eq_, ok_
+from tm import irilib
 from tm.irilib import normalize, resolve_iri
 
 
@@ -155,6 +156,64 @@ def test_windows_normalization():
     eq_('file://localhost/E:/somewhere/bla.ctm', normalize('file://localhost/E|/somewhere/bla.ctm'))
 
 
+def test_normalize_cache():
+    irilib.clear_normalize_cache()
+    iri = 'HTTP://www.semagia.com/a/../b'
+    eq_('http://www.semagia.com/b', normalize(iri))
+    info = irilib.normalize_cache_info()
+    eq_(0, info['hits'])
+    eq_(1, info['misses'])
+    eq_(1, info['size'])
+    eq_('http://www.semagia.com/b', normalize(iri))
+    eq_(1, irilib.normalize_cache_info()['hits'])
+    irilib.clear_normalize_cache()
+    info = irilib.normalize_cache_info()
+    eq_(0, info['hits'])
+    eq_(0, info['size'])
+
+
+def test_normalize_cache_bounded():
+    irilib.clear_normalize_cache()
+    size = irilib.NORMALIZE_CACHE_SIZE
+    for i in xrange(3 * size):
+        eq_('http://www.semagia.com/%d' % i, normalize('http://www.semagia.com:80/%d' % i))
+    info = irilib.normalize_cache_info()
+    ok_(info['size'] <= info['maxsize'])
+    irilib.clear_normalize_cache()
+
+
+def test_normalize_type():
+    irilib.clear_normalize_cache()
+    for iri in ('http://www.semagia.com/a', 'http://www.Semagia.com/a'):
+        # The cache is shared by equal str and unicode IRIs
+        for i in xrange(2):
+            ok_(isinstance(normalize(iri), str))
+            ok_(isinstance(normalize(unicode(iri)), unicode))
+    irilib.clear_normalize_cache()
+
+
+def test_normalized_fastpath():
+    for iri in ('http://www.semagia.com/',
+                'https://www.semagia.com/home/~lars',
+                'http://www.semagia.com/x#',
+                'http://psi.example.org/a;b=c/d#frag-ment'):
+        ok_(irilib._is_normalized(iri))
+        eq_(iri, normalize(iri))
+    for iri in ('http://www.semagia.com',
+                'HTTP://www.semagia.com/',
+                'http://www.Semagia.com/',
+                'http://www.semagia.com:80/',
+                'http://www.semagia.com./',
+                'http://www.semagia.com/a/./b',
+                'http://www.semagia.com/a/../b',
+                'http://www.semagia.com/a//b',
+                'http://www.semagia.com/%7elars',
+                'http://www.semagia.com/x?',
+                'http://www.semagia.com/a b',
+                'mailto:Joe@Example.COM'):
+        ok_(not irilib._is_normalized(iri))
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
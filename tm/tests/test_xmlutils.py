@@ -12,7 +12,8 @@ Tests against the ``xmlutils`` module.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
-from nose.tools import ok_
+import gzip
+from nose.tools import ok_, eq_
 from StringIO import StringIO
 from xml.sax import saxutils
 from tm import xmlutils
@@ -53,7 +54,65 @@ def test_simplesaxhandler2():
     handler.dataElement('i', 'j', {'k': 'l'})
     handler.endElement('xml')
     handler.endDocument()
-    
+
+
+def _write_document(writer):
+    writer.startDocument()
+    writer.startElement(u'xml')
+    for i in range(xmlutils._CHUNK_SIZE):
+        writer.dataElement(u'a', u'\xe4 & b', {u'c': u'd'})
+    writer.emptyElement(u'e')
+    writer.endElement(u'xml')
+    writer.endDocument()
+
+
+def _expected_document():
+    return (u'<?xml version="1.0" encoding="utf-8" standalone="yes"?>\n<xml>' 
+            + u'<a c="d">\xe4 &amp; b</a>' * xmlutils._CHUNK_SIZE
+            + u'<e/></xml>\n').encode('utf-8')
+
+
+def test_xmlwriter():
+    out = StringIO()
+    _write_document(xmlutils.XMLWriter(out))
+    eq_(_expected_document(), out.getvalue())
+
+
+def test_xmlwriter_flush():
+    out = StringIO()
+    writer = xmlutils.XMLWriter(out)
+    writer.startElement(u'xml')
+    eq_('', out.getvalue())
+    writer.flush()
+    eq_('<xml>', out.getvalue())
+
+
+def test_xmlwriter_gzip():
+    out = StringIO()
+    _write_document(xmlutils.XMLWriter(out, compress=True))
+    ok_(not out.closed)
+    out.seek(0)
+    eq_(_expected_document(), gzip.GzipFile(fileobj=out).read())
+
+
+def test_xmlwriter_fragment():
+    out = StringIO()
+    writer = xmlutils.XMLWriter(out)
+    writer.startFragment()
+    writer.startElement(u'a')
+    writer.endElement(u'a')
+    writer.endDocument()
+    fragment = out.getvalue().decode('utf-8')
+    out = StringIO()
+    writer = xmlutils.XMLWriter(out)
+    writer.startDocument()
+    writer.startElement(u'xml')
+    writer.writeFragment(fragment)
+    writer.endElement(u'xml')
+    writer.endDocument()
+    eq_('<?xml version="1.0" encoding="utf-8" standalone="yes"?>\n<xml><a></a>\n</xml>\n',
+        out.getvalue())
+
 
 if __name__ == '__main__':
     import nose
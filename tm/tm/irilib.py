@@ -12,10 +12,86 @@ Constants and functions that may be useful to operate upon IRIs.
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
 """
+import re
 from urlparse import urljoin
-from ._urlutils import normalize
+from ._urlutils import normalize as _normalize
 
-__all__ = ['resolve_iri', 'normalize']
+__all__ = ['resolve_iri', 'normalize', 'normalize_cache_info',
+           'clear_normalize_cache']
+
+# Max. number of IRIs per cache generation, the cache keeps two generations.
+NORMALIZE_CACHE_SIZE = 10000
+
+_young = {}
+_old = {}
+_hits = 0
+_misses = 0
+
+# Matches simple http(s) IRIs which are already normalized. The path must not
+# contain dot-segments or empty segments, this is checked separately.
+_NORMALIZED_IRI = re.compile(r"^https?://[a-z0-9\-]+(?:\.[a-z0-9\-]+)*(/[\-A-Za-z0-9_.~:@!$&'()*+,;=/]*)(?:#[\-A-Za-z0-9_.~]*)?$")
+
+del re
+
+def normalize(iri):
+    """\
+    Returns the normalized `iri`.
+
+    The results are cached, IRIs which are already normalized are returned
+    as they are. The result has the type (``str`` or ``unicode``) of the
+    `iri`.
+    """
+    global _young, _old, _hits, _misses
+    # Equal str and unicode IRIs share a cache entry
+    cls = iri.__class__
+    res = _young.get(iri)
+    if res is not None and res.__class__ is cls:
+        _hits += 1
+        return res
+    res = _old.get(iri)
+    if res is not None and res.__class__ is cls:
+        _hits += 1
+    else:
+        _misses += 1
+        if _is_normalized(iri):
+            res = iri
+        else:
+            res = _normalize(iri)
+    if len(_young) >= NORMALIZE_CACHE_SIZE:
+        _old, _young = _young, {}
+    _young[iri] = res
+    return res
+
+def _is_normalized(iri):
+    """\
+    Returns if the `iri` is normalized.
+
+    This function may return ``False`` for normalized IRIs, it checks
+    only simple http(s) IRIs.
+    """
+    m = _NORMALIZED_IRI.match(iri)
+    if not m:
+        return False
+    path = m.group(1)
+    return '//' not in path and '/.' not in path
+
+def normalize_cache_info():
+    """\
+    Returns a dict with the statistics of the `normalize` cache:
+    ``hits``, ``misses``, ``size`` (the number of cached IRIs) and 
+    ``maxsize``.
+    """
+    return {'hits': _hits, 'misses': _misses,
+            'size': len(_young) + len(_old),
+            'maxsize': 2 * NORMALIZE_CACHE_SIZE}
+
+def clear_normalize_cache():
+    """\
+    Clears the cache of `normalize` and resets the statistics.
+    """
+    global _young, _old, _hits, _misses
+    _young, _old = {}, {}
+    _hits = _misses = 0
 
 
 def resolve_iri(base, reference):
@@ -8,6 +8,13 @@
 """\
 Utilities for lexers / parsers using `Ply <http://www.dabeaz.com/ply/>`_
 
+Creating a parser / lexer loads the parse tables and creates the parser /
+lexer state. `pooled_parser` and `pooled_lexer` provide instances which are 
+created once per process and which are reused within a thread::
+
+    with pooled_parser(parser_module) as parser, pooled_lexer(lexer_module) as lexer:
+        parser.parse(data, lexer=lexer)
+
 :author:       Lars Heuer (heuer[at]semagia.com)
 :organization: Semagia - http://www.semagia.com/
 :license:      BSD license
@@ -15,13 +22,15 @@ Utilities for lexers / parsers using `Ply <http://www.dabeaz.com/ply/>`_
 from __future__ import absolute_import
 import os
 import sys
+import copy
+import threading
+from contextlib import contextmanager
 import tm.ply.yacc as yacc
 import tm.ply.lex as lex
 # Work-around for parsers which create a big parsetab file
 # Import would result in:
 #   java.lang.ClassFormatError: Invalid method Code length <number-here>
 _yacc_pickle = sys.platform[:4] == 'java'
-del sys
 
 
 def make_lexer(module, debug=False, optimize=True):
@@ -57,6 +66,76 @@ if _yacc_pickle:
     make_parser = make_parser_pickled
 
 
+# (factory, module name, debug) -> (prototype, state of the prototype)
+_prototypes = {}
+_prototypes_lock = threading.Lock()
+# Per-thread free lists
+_local = threading.local()
+# Attributes of parsers and lexers which are mutated in-place
+_STACKS = ('statestack', 'symstack', 'lexstatestack')
+
+
+def _get_prototype(key, factory, module, debug):
+    proto = _prototypes.get(key)
+    if proto is None:
+        with _prototypes_lock:
+            proto = _prototypes.get(key)
+            if proto is None:
+                obj = factory(module, debug=debug)
+                proto = _prototypes[key] = obj, dict(obj.__dict__)
+    return proto
+
+
+def _reset(obj, state):
+    d = obj.__dict__
+    d.clear()
+    d.update(state)
+    for name in _STACKS:
+        if name in d:
+            d[name] = []
+
+
+@contextmanager
+def _pooled(factory, module, debug):
+    key = factory, module.__name__, debug
+    pools = getattr(_local, 'pools', None)
+    if pools is None:
+        pools = _local.pools = {}
+    pool = pools.setdefault(key, [])
+    proto, state = _get_prototype(key, factory, module, debug)
+    # A free instance or a new one if all instances are in use (i.e. if a 
+    # document includes another document)
+    obj = pool.pop() if pool else copy.copy(proto)
+    _reset(obj, state)
+    try:
+        yield obj
+    finally:
+        _reset(obj, state)
+        pool.append(obj)
+
+
+def pooled_parser(module, debug=False):
+    """\
+    Returns a context manager which provides a parser (c.f. `make_parser`).
+
+    The parser is taken from a per-thread pool and is returned into the 
+    pool (with its initial state) at the end of the ``with`` block. The 
+    parser must not be used outside of the ``with`` block.
+    """
+    return _pooled(make_parser, module, debug)
+
+
+def pooled_lexer(module, debug=False):
+    """\
+    Returns a context manager which provides a lexer (c.f. `make_lexer`).
+
+    The lexer is taken from a per-thread pool and is returned into the 
+    pool (with its initial state) at the end of the ``with`` block. The 
+    lexer must not be used outside of the ``with`` block.
+    """
+    return _pooled(make_lexer, module, debug)
+
+
 def _make_parser_for_sdist(module):
     """\
     Prepare PLY parser modules for source distribution.
@@ -37,13 +37,21 @@ def as_inputsource(source):
     return input_source
 
 
+# Number of buffered fragments which triggers writing to the output
+_CHUNK_SIZE = 4096
+
+
 class XMLWriter(object):
     """\
     Simple SAX alike XML writer
+
+    The writer buffers the XML fragments and writes them in chunks to the 
+    output; `flush` writes the buffered fragments immediately.
     """
-    __slots__ = ['_out', '_encoding', '_depth', 'prettify']
+    __slots__ = ['_out', '_encoding', '_depth', 'prettify', '_buf', '_gzip',
+                 '_start_tags', '_end_tags', '_empty_tags']
     
-    def __init__(self, out, encoding='utf-8', prettify=False):
+    def __init__(self, out, encoding='utf-8', prettify=False, compress=False):
         """\
 
         `out`
@@ -52,17 +60,28 @@ class XMLWriter(object):
             An encoding (default: UTF-8)
         `prettify`
             Indicates if the XML should be prettified (default: False)
+        `compress`
+            Indicates if the output should be gzip compressed (default: False)
         """
+        self._gzip = None
+        if compress:
+            import gzip
+            out = self._gzip = gzip.GzipFile(fileobj=out, mode='wb')
         self._out = codecs.getwriter(encoding)(out)
         self._encoding = encoding
         self._depth = 0
         self.prettify = prettify
+        self._buf = []
+        # Caches of the tags without attributes
+        self._start_tags = {}
+        self._end_tags = {}
+        self._empty_tags = {}
 
     def startDocument(self):
         """\
         Writes the <?xml version="1.0" ... ?> declaration.
         """
-        self._out.write(unicode('<?xml version="1.0" encoding="%s" standalone="yes"?>' % self._encoding))
+        self._write(unicode('<?xml version="1.0" encoding="%s" standalone="yes"?>' % self._encoding))
         if not self.prettify:
             self._newline()
         self._depth = 0
@@ -72,6 +91,37 @@ class XMLWriter(object):
         Flushes to the output.
         """
         self._newline()
+        self.flush()
+        if self._gzip:
+            # Writes the gzip trailer, the underlying file object is not closed
+            self._gzip.close()
+            self._gzip = None
+
+    def startFragment(self, depth=0):
+        """\
+        Indicates the start of a document fragment which is written without
+        the XML declaration.
+
+        `depth`
+            The nesting depth of the fragment within the document (used to 
+            indent the fragment).
+        """
+        self._depth = depth
+
+    def writeFragment(self, fragment):
+        """\
+        Writes the serialized XML `fragment` (a string) unchanged.
+        """
+        self._write(fragment)
+
+    def flush(self):
+        """\
+        Writes the buffered fragments to the output.
+        """
+        buf = self._buf
+        if buf:
+            self._out.write(u''.join(buf))
+            del buf[:]
         self._out.flush()
 
     def startPrefixMapping(self, prefix, uri):
@@ -87,9 +137,17 @@ class XMLWriter(object):
         Writes a start tag with the optional attributes (a dict).
         """
         self._indent()
-        self._out.write(u'<%s' % name)
-        self._write_attributes(attrs)
-        self._out.write(u'>')
+        if attrs:
+            write = self._write
+            write(u'<')
+            write(name)
+            self._write_attributes(attrs)
+            write(u'>')
+        else:
+            tag = self._start_tags.get(name)
+            if tag is None:
+                tag = self._start_tags[name] = u'<%s>' % name
+            self._write(tag)
         self._depth+=1
     
     def endElement(self, name, indent=True):
@@ -104,7 +162,10 @@ class XMLWriter(object):
         self._depth-=1
         if indent:
             self._indent()
-        self._out.write(u'</%s>' % name)
+        tag = self._end_tags.get(name)
+        if tag is None:
+            tag = self._end_tags[name] = u'</%s>' % name
+        self._write(tag)
     
     def dataElement(self, name, data, attrs=None):
         """\
@@ -119,22 +180,29 @@ class XMLWriter(object):
         Writes ``<name att1="attr-val1" attr2="attr-val2"/>``
         """
         self._indent()
-        out = self._out
-        out.write(u'<%s' % name)
-        self._write_attributes(attrs)
-        out.write(u'/>')
+        if attrs:
+            write = self._write
+            write(u'<')
+            write(name)
+            self._write_attributes(attrs)
+            write(u'/>')
+        else:
+            tag = self._empty_tags.get(name)
+            if tag is None:
+                tag = self._empty_tags[name] = u'<%s/>' % name
+            self._write(tag)
     
     def characters(self, content):
         """\
         Writes an escaped value.
         """
-        self._out.write(escape(content))
+        self._write(escape(content))
 
     def processingInstruction(self, target, data):
         """\
         Writes a processing instruction.
         """
-        write = self._out.write
+        write = self._write
         write(u'<?')
         write(target)
         write(u' ')
@@ -145,7 +213,7 @@ class XMLWriter(object):
         """\
         Writes a comment.
         """
-        write = self._out.write
+        write = self._write
         self._indent()
         write(u'<!-- ')
         self.characters(comment.replace(u'--', u'- -'))
@@ -153,12 +221,23 @@ class XMLWriter(object):
         if not self.prettify:
             self._newline()
 
+    def _write(self, fragment):
+        """\
+        Buffers the `fragment` and writes the buffer to the output if it is
+        large enough.
+        """
+        buf = self._buf
+        buf.append(fragment)
+        if len(buf) >= _CHUNK_SIZE:
+            self._out.write(u''.join(buf))
+            del buf[:]
+
     def _write_attributes(self, attrs):
         """\
         Serializes the attributes (a ``dict`` or ``None``), if any.
         """
         if attrs:
-            write = self._out.write
+            write = self._write
             for k, v in attrs.items():
                 write(u' %s=%s' % (k, quoteattr(v)))
 
@@ -168,13 +247,13 @@ class XMLWriter(object):
         """
         if self.prettify:
             self._newline()
-            self._out.write(u' ' * self._depth * 2)
+            self._write(u' ' * self._depth * 2)
 
     def _newline(self):
         """\
         Writes a newline character.
         """
-        self._out.write(u'\n')
+        self._write(u'\n')
 
 
 class SimpleXMLWriter(XMLWriter):
@@ -182,7 +261,7 @@ class SimpleXMLWriter(XMLWriter):
     XMLWriter which remembers the names of started elements and provides
     a simple `pop` method to close the last element.
     """
-    def __init__(self, out, encoding='utf-8', prettify=False):
+    def __init__(self, out, encoding='utf-8', prettify=False, compress=False):
         """\
 
         `out`
@@ -191,8 +270,10 @@ class SimpleXMLWriter(XMLWriter):
             An encoding (default: UTF-8)
         `prettify`
             Indicates if the XML should be prettified (default: False)
+        `compress`
+            Indicates if the output should be gzip compressed (default: False)
         """
-        super(SimpleXMLWriter, self).__init__(out, encoding=encoding, prettify=prettify)
+        super(SimpleXMLWriter, self).__init__(out, encoding=encoding, prettify=prettify, compress=compress)
         self._elements = []
 
     def startElement(self, name, attrs=None):
@@ -425,11 +506,13 @@ def xmlwriter_as_contenthandler(writer):
     Returns a ContentHandler which serializes the events.
     
     All events are serialized to the ``_out`` property of the `writer` using 
-    the ``writer._encoding``.
+    the ``writer._encoding``. The buffered fragments of the `writer` are
+    written to the output before the handler is returned.
 
     `writer`
         `XMLWriter` instance.
     """
+    writer.flush()
     return XMLGenerator(writer._out, writer._encoding)
 
 #